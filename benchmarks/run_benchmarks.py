@@ -0,0 +1,355 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.models.nav_graph import NavGraph
+from src.controllers.fleet_manager import FleetManager
+from src.controllers.traffic_manager import TrafficManager
+from src.controllers.simulator import Simulator
+from src.replay import JournalReplay
+from src.sim import BatchRunner, ShardedRunner
+from src.utils.graph_generators import make_graph
+from src.utils.telemetry import Telemetry
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+LOG_FILE = os.path.join(tempfile.gettempdir(), 'fleet_bench_log.txt')
+JOURNAL_FILE = os.path.join(tempfile.gettempdir(), 'fleet_bench_journal.bin')
+GRAPH_KINDS = ("grid", "random", "warehouse")
+
+
+class FakeRobot:
+    def __init__(self, robot_id):
+        self.id = robot_id
+
+
+def timed(function, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def record(results, name, seconds, unit="s"):
+    results[name] = {"value": seconds, "unit": unit}
+    if unit == "s":
+        print(f"{name:70s} {seconds * 1000:12.3f} ms")
+    else:
+        print(f"{name:70s} {seconds:12.3f} {unit}")
+
+
+def bench_pathfinding(results, sizes, queries=30):
+    for kind in GRAPH_KINDS:
+        for size in sizes:
+            graph_data = make_graph(kind, size, seed=1)
+            started = time.perf_counter()
+            nav_graph = NavGraph(graph_data)
+            record(results, f"graph_build/{kind}/{size}", time.perf_counter() - started)
+
+            rng = random.Random(size)
+            vertex_count = len(nav_graph.vertices)
+            pairs = [(rng.randrange(vertex_count), rng.randrange(vertex_count)) for _ in range(queries)]
+
+            for mode in ("bfs", "dijkstra", "astar"):
+                def run():
+                    for start_id, end_id in pairs:
+                        nav_graph.find_path(start_id, end_id, mode)
+                record(results, f"find_path/{mode}/{kind}/{size}", timed(run, repeat=3) / queries)
+
+
+def bench_lane_contention(results, thread_counts, lanes=4, operations=2000):
+    for thread_count in thread_counts:
+        traffic_manager = TrafficManager()
+
+        def worker(robot_id):
+            robot = FakeRobot(robot_id)
+            rng = random.Random(robot_id)
+            for _ in range(operations):
+                lane = (rng.randrange(lanes), lanes + rng.randrange(lanes))
+                # Every thread holds at most one lane at a time, so each wait ends with a hand-over
+                traffic_manager.acquire_lane(robot, lane)
+                traffic_manager.release_lane(robot, lane)
+
+        def run():
+            threads = [threading.Thread(target=worker, args=(idx,)) for idx in range(thread_count)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        total = thread_count * operations
+        record(results, f"lane_acquire_release/threads_{thread_count}", timed(run, repeat=3) / total)
+
+
+def bench_dispatch(results, size, robot_count=100, rounds=5):
+    nav_graph = NavGraph(make_graph("grid", size, seed=2))
+    simulator = Simulator(realtime=False)
+    fleet_manager = FleetManager(nav_graph, TrafficManager(), simulator, log_file=LOG_FILE)
+    rng = random.Random(3)
+    vertex_count = len(nav_graph.vertices)
+    robots = [fleet_manager.spawn_robot(nav_graph.vertices[rng.randrange(vertex_count)]) for _ in range(robot_count)]
+    targets = [nav_graph.vertices[rng.randrange(vertex_count)] for _ in range(8)]
+
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for robot in robots:
+            fleet_manager.assign_task(robot, targets[robot.id % len(targets)])
+        samples.append((time.perf_counter() - started) / robot_count)
+        simulator.run()
+
+    fleet_manager.close()
+    record(results, f"assign_task/cold/grid/{size}", samples[0])
+    record(results, f"assign_task/warm/grid/{size}", statistics.median(samples[1:]))
+
+
+def bench_batch_dispatch(results, size, robot_count=100, task_count=1000):
+    # Robot-less orders go through the batch dispatcher; times the assignment rounds and the queueing they cause
+    graph_data = make_graph("warehouse", size)
+    vertex_count = len(graph_data["vertices"])
+    rng = random.Random(robot_count)
+    spawns = rng.sample(range(vertex_count), robot_count)
+    tasks = [
+        {"time": rng.uniform(0, 60), "pickup": rng.randrange(vertex_count), "dropoff": rng.randrange(vertex_count)}
+        for _ in range(task_count)
+    ]
+    name = f"batch_dispatch/warehouse/{size}/robots_{robot_count}"
+    runner = BatchRunner(graph_data, spawns, tasks, log_file=LOG_FILE, max_chain=1)
+    stats = runner.run()["dispatcher"]
+    record(results, f"{name}/assignment", stats["dispatch_time"] / max(stats["assigned"], 1))
+    record(results, f"{name}/queue_latency", stats["mean_queue_latency"], unit="sim_s")
+
+
+def bench_fleet(results, robot_counts, size=2000, tasks_per_robot=5):
+    graph_data = make_graph("warehouse", size)
+    vertex_count = len(graph_data["vertices"])
+
+    for robot_count in robot_counts:
+        rng = random.Random(robot_count)
+        spawns = rng.sample(range(vertex_count), robot_count)
+        tasks = [
+            {"time": step * 5.0, "robot": robot_id, "target": rng.randrange(vertex_count)}
+            for robot_id in range(1, robot_count + 1)
+            for step in range(tasks_per_robot)
+        ]
+        for reservations in (False, True):
+            name = f"fleet_simulation/warehouse/{size}/robots_{robot_count}"
+            if reservations:
+                name += "/reservations"
+            runner = BatchRunner(graph_data, spawns, tasks, log_file=LOG_FILE, reservations=reservations)
+            report = runner.run()
+            record(results, name, report["wall_time"])
+            # Simulated outcomes, so routing changes that slow the fleet down also show up as regressions
+            record(results, f"{name}/makespan", report["makespan"], unit="sim_s")
+            record(results, f"{name}/total_wait", report["total_wait_time"], unit="sim_s")
+
+        # Same run with every hot-path metric recording, to keep the instrumentation overhead visible
+        runner = BatchRunner(graph_data, spawns, tasks, log_file=LOG_FILE, telemetry=Telemetry())
+        report = runner.run()
+        record(results, f"fleet_simulation/warehouse/{size}/robots_{robot_count}/telemetry", report["wall_time"])
+
+
+def bench_kinematics(results, robot_counts, size=10000, frames=30):
+    # One GUI/real-time frame of position updates with most of the fleet on a lane
+    nav_graph = NavGraph(make_graph("grid", size, seed=6))
+    vertex_count = len(nav_graph.vertices)
+    for robot_count in robot_counts:
+        simulator = Simulator(realtime=False)
+        fleet_manager = FleetManager(nav_graph, TrafficManager(), simulator, log_file=LOG_FILE)
+        rng = random.Random(robot_count)
+        for _ in range(robot_count):
+            robot = fleet_manager.spawn_robot(nav_graph.vertices[rng.randrange(vertex_count)])
+            fleet_manager.assign_task(robot, nav_graph.vertices[rng.randrange(vertex_count)])
+        simulator.run(10.0)
+
+        frame = [10.0]
+
+        def run():
+            frame[0] += simulator.frame_interval
+            fleet_manager.update_positions(frame[0])
+        record(results, f"update_positions/grid/{size}/robots_{robot_count}", timed(run, repeat=frames))
+        fleet_manager.close()
+
+
+def bench_map_edit(results, robot_counts, size=2000, edits=50):
+    # Blocking a lane while the fleet is on the move: the edit, the cache invalidation and every route repair
+    graph_data = make_graph("warehouse", size)
+    for robot_count in robot_counts:
+        nav_graph = NavGraph(graph_data)
+        simulator = Simulator(realtime=False)
+        fleet_manager = FleetManager(nav_graph, TrafficManager(), simulator, log_file=LOG_FILE)
+        rng = random.Random(robot_count)
+        vertex_count = len(nav_graph.vertices)
+        for vertex_id in rng.sample(range(vertex_count), robot_count):
+            robot = fleet_manager.spawn_robot(nav_graph.vertices[vertex_id])
+            fleet_manager.assign_task(robot, nav_graph.vertices[rng.randrange(vertex_count)])
+        simulator.run(5.0)
+
+        lanes = list(nav_graph.lane_index)
+        samples = []
+        for _ in range(edits):
+            lane = rng.choice(lanes)
+            started = time.perf_counter()
+            fleet_manager.block_lane(*lane)
+            samples.append(time.perf_counter() - started)
+            fleet_manager.unblock_lane(*lane)
+        fleet_manager.close()
+        record(results, f"block_lane/warehouse/{size}/robots_{robot_count}", statistics.median(samples))
+
+
+def bench_sharded_fleet(results, robot_counts, worker_counts, size=2000, tasks_per_robot=5):
+    # Same scripts as bench_fleet, split across worker processes; scaling depends on the cores available
+    graph_data = make_graph("warehouse", size)
+    vertex_count = len(graph_data["vertices"])
+
+    for robot_count in robot_counts:
+        rng = random.Random(robot_count)
+        spawns = rng.sample(range(vertex_count), robot_count)
+        tasks = [
+            {"time": step * 5.0, "robot": robot_id, "target": rng.randrange(vertex_count)}
+            for robot_id in range(1, robot_count + 1)
+            for step in range(tasks_per_robot)
+        ]
+        for workers in worker_counts:
+            name = f"sharded_simulation/warehouse/{size}/robots_{robot_count}/workers_{workers}"
+            report = ShardedRunner(graph_data, spawns, tasks, workers, log_file=LOG_FILE).run()
+            record(results, name, report["wall_time"])
+            record(results, f"{name}/makespan", report["makespan"], unit="sim_s")
+
+
+def bench_replay(results, robot_counts, size=2000, tasks_per_robot=5):
+    # The bench_fleet scripts with the event journal on, then replayed and verified from the journal alone
+    graph_data = make_graph("warehouse", size)
+    vertex_count = len(graph_data["vertices"])
+
+    for robot_count in robot_counts:
+        rng = random.Random(robot_count)
+        spawns = rng.sample(range(vertex_count), robot_count)
+        tasks = [
+            {"time": step * 5.0, "robot": robot_id, "target": rng.randrange(vertex_count)}
+            for robot_id in range(1, robot_count + 1)
+            for step in range(tasks_per_robot)
+        ]
+        name = f"journal/warehouse/{size}/robots_{robot_count}"
+        runner = BatchRunner(graph_data, spawns, tasks, log_file=LOG_FILE)
+        runner.start_journal(JOURNAL_FILE)
+        record(results, f"{name}/record", runner.run()["wall_time"])
+        record(results, f"{name}/size", os.path.getsize(JOURNAL_FILE) / 1024, unit="KiB")
+
+        replay = JournalReplay(JOURNAL_FILE, NavGraph(graph_data), log_file=LOG_FILE)
+        report = replay.run()
+        replay.close()
+        if report["diverged"]:
+            print(f"{name}: replay diverged at {report['actual']}")
+        record(results, f"{name}/replay", report["wall_time"])
+
+
+def bench_gui_frame(results, size, robot_count=100, frames=20):
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as error:
+        print(f"skipping GUI benchmark: {error}")
+        return
+
+    from src.gui.fleet_gui import FleetGUI
+
+    root.withdraw()
+    nav_graph = NavGraph(make_graph("grid", size, seed=4))
+    fleet_manager = FleetManager(nav_graph, TrafficManager(), Simulator(realtime=False), log_file=LOG_FILE)
+    rng = random.Random(5)
+    for _ in range(robot_count):
+        fleet_manager.spawn_robot(nav_graph.vertices[rng.randrange(len(nav_graph.vertices))])
+
+    fleet_manager.publish_snapshot()
+    gui = FleetGUI(root, fleet_manager, nav_graph)
+    record(results, f"gui_update_display/grid/{size}/robots_{robot_count}", timed(gui.update_display, repeat=frames))
+    root.destroy()
+    fleet_manager.close()
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, entry in sorted(results.items()):
+        reference = baseline.get("results", {}).get(name)
+        if reference is None or reference["value"] <= 0:
+            continue
+        ratio = entry["value"] / reference["value"]
+        if ratio > 1 + tolerance:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pathfinding, lane reservation, dispatch and rendering.")
+    parser.add_argument("--full", action="store_true", help="include the 100k-vertex graphs and 1000-robot fleets")
+    parser.add_argument("--output", default=None, help="write results JSON here")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="overwrite the baseline with these results")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    sizes = [1000, 10000, 100000] if args.full else [1000, 10000]
+    results = {}
+    bench_pathfinding(results, sizes)
+    bench_lane_contention(results, [1, 4, 16])
+    bench_dispatch(results, 10000)
+    bench_batch_dispatch(results, 2000, task_count=5000 if args.full else 1000)
+    bench_fleet(results, [10, 100, 1000] if args.full else [10, 100])
+    bench_kinematics(results, [1000, 10000] if args.full else [1000])
+    bench_map_edit(results, [100, 1000] if args.full else [100])
+    bench_replay(results, [100, 1000] if args.full else [100])
+    bench_sharded_fleet(results, [100, 1000] if args.full else [100], [1, 4, 16] if args.full else [1, 4])
+    bench_gui_frame(results, 10000 if args.full else 1000)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "full": args.full,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline, 'r') as file:
+        baseline = json.load(file)
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name, ratio in regressions:
+        print(f"REGRESSION {name}: {ratio:.2f}x baseline")
+    if not regressions:
+        print("No regressions against baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
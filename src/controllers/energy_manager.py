@@ -0,0 +1,339 @@
+import heapq
+import math
+from collections import deque
+
+
+class EnergyManager:
+    # Battery levels are percentages of a full charge
+    BATTERY_CAPACITY = 100.0
+    # Percent drained per unit of distance travelled, and recharged per second on a charger
+    DRAIN_PER_UNIT = 0.005
+    CHARGE_RATE = 1.0
+    # Below LOW_BATTERY an idle robot goes to charge; it takes work again once back at RESUME_BATTERY
+    LOW_BATTERY = 30.0
+    RESUME_BATTERY = 90.0
+    # Always left in hand on arrival at the nearest charger after a task
+    RESERVE = 5.0
+
+    def __init__(self, fleet_manager, drain_per_unit=DRAIN_PER_UNIT, charge_rate=CHARGE_RATE,
+                 low_battery=LOW_BATTERY, resume_battery=RESUME_BATTERY, reserve=RESERVE):
+        self.fleet_manager = fleet_manager
+        self.simulator = fleet_manager.simulator
+        self.nav_graph = fleet_manager.nav_graph
+        self.drain_per_unit = drain_per_unit
+        self.charge_rate = charge_rate
+        self.low_battery = low_battery
+        self.resume_battery = resume_battery
+        self.reserve = reserve
+        self.charge_listeners = []
+
+        # A session books a charger slot from the moment a robot is sent there until it is charged
+        self.sessions = {}
+        self.charger_load = {}
+        self.queues = {}
+        self.queued = {}
+        self.charging_since = {}
+        self.full_events = {}
+        self.stranded = set()
+        self.field = None
+        self.field_version = None
+        self.has_chargers = False
+
+        self.energy_used = 0.0
+        self.energy_charged = 0.0
+        self.sessions_started = 0
+        self.queue_wait_total = 0.0
+        self.max_queue_length = 0
+
+        fleet_manager.task_listeners.append(self.on_task_completed)
+        fleet_manager.stop_listeners.append(self.on_robot_stopped)
+
+    def charger_field(self):
+        # Distance from every vertex to its nearest charger, rebuilt whenever the graph changes; batteries drain
+        # by distance, so custom lane costs do not count here
+        if self.field_version != self.nav_graph.version:
+            charger_ids = self.nav_graph.get_charger_ids()
+            self.field = self.nav_graph.planner.distance_field(charger_ids, by_length=True)
+            self.field_version = self.nav_graph.version
+            self.has_chargers = bool(charger_ids)
+        return self.field
+
+    def distance_to_charger(self, vertex_id):
+        distances, _ = self.charger_field()
+        # On a site without chargers the battery only limits how far a single task may go
+        return distances[vertex_id] if self.has_chargers else 0.0
+
+    def level(self, robot):
+        since = self.charging_since.get(robot.id)
+        if since is None:
+            return robot.battery
+        return min(robot.battery + (self.simulator.now - since) * self.charge_rate, self.BATTERY_CAPACITY)
+
+    def drain(self, robot, distance):
+        energy = distance * self.drain_per_unit
+        self.energy_used += energy
+        robot.battery = max(robot.battery - energy, 0.0)
+
+    def can_travel(self, robot, lane):
+        return robot.battery >= self.nav_graph.get_lane_length(lane[0], lane[1]) * self.drain_per_unit
+
+    def needs_charge(self, robot, vertex_id=None, distance=0.0):
+        if robot.id in self.sessions:
+            return self.level(robot) < self.resume_battery
+        if vertex_id is None:
+            vertex_id = robot.current_vertex["id"]
+        level = self.level(robot) - distance * self.drain_per_unit
+        return (level < self.low_battery
+                or level - self.reserve < self.distance_to_charger(vertex_id) * self.drain_per_unit)
+
+    def can_complete(self, robot, path):
+        # Robots in line for a charger stay put, so they do not burn what little they have left
+        if robot.id in self.queued:
+            return False
+        charger_id = self.sessions.get(robot.id)
+        if charger_id is not None:
+            if path[-1] == charger_id:
+                return True
+            if self.level(robot) < self.resume_battery:
+                return False
+        need = (self.nav_graph.get_path_length(path) + self.distance_to_charger(path[-1])) * self.drain_per_unit
+        return self.level(robot) >= need + self.reserve
+
+    def strand(self, robot):
+        # Last resort when planning fell short: the robot stops where it is and never moves again
+        self.stranded.add(robot.id)
+        self.fleet_manager.log(f"Robot {robot.id} is stranded at {robot.current_vertex['name']} with "
+                               f"{robot.battery:.0f}% battery", "battery_depleted", robot.id, robot.current_vertex["id"])
+        robot.stop_movement()
+
+    def request_charge(self, robot):
+        if robot.id in self.sessions or robot.id in self.queued or robot.id in self.stranded:
+            return
+        vertex_id = robot.current_vertex["id"]
+        distances, nearest = self.charger_field()
+        if nearest[vertex_id] == -1 or robot.battery < distances[vertex_id] * self.drain_per_unit:
+            # No charger in reach, so heading off would only leave the robot stuck somewhere less convenient
+            self.strand(robot)
+            return
+
+        # The nearest charger comes straight from the field; only a busy one needs a search
+        charger_id = nearest[vertex_id]
+        if not self._has_slot(charger_id):
+            charger_id = self._pick_charger(robot)
+        if self._has_slot(charger_id):
+            self._send(robot, charger_id)
+        else:
+            self._enqueue(robot, charger_id)
+
+    def _capacity(self, charger_id):
+        return self.nav_graph.get_vertex_capacity(charger_id)
+
+    def _has_slot(self, charger_id):
+        return self.charger_load.get(charger_id, 0) < self._capacity(charger_id)
+
+    def _expected_wait(self, charger_id):
+        capacity = self._capacity(charger_id)
+        ahead = self.charger_load.get(charger_id, 0) + len(self.queues.get(charger_id, ())) - capacity + 1
+        if ahead <= 0:
+            return 0.0
+        return ahead / capacity * (self.resume_battery - self.low_battery) / self.charge_rate
+
+    def _pick_charger(self, robot):
+        # Chargers are scored by travel time plus the expected wait for a slot; the search stops once
+        # travel time alone exceeds the best score, so it rarely looks beyond a few nearby chargers
+        adjacency = self.nav_graph.adjacency
+        get_lane_length = self.nav_graph.get_lane_length
+        chargers = self.nav_graph.vertex_store.chargers
+        speed = robot.move_speed
+        start_id = robot.current_vertex["id"]
+        best_id = None
+        best_score = math.inf
+        distances = {start_id: 0.0}
+        frontier = [(0.0, start_id)]
+
+        while frontier:
+            cost, node = heapq.heappop(frontier)
+            if cost > distances[node]:
+                continue
+            if cost / speed >= best_score:
+                break
+            # Only chargers the robot can still reach on what it has left
+            if chargers[node] and cost * self.drain_per_unit <= robot.battery:
+                score = cost / speed + self._expected_wait(node)
+                if score < best_score:
+                    best_score = score
+                    best_id = node
+            for neighbor in adjacency[node]:
+                new_cost = cost + get_lane_length(node, neighbor)
+                if new_cost < distances.get(neighbor, math.inf):
+                    distances[neighbor] = new_cost
+                    heapq.heappush(frontier, (new_cost, neighbor))
+
+        return best_id
+
+    def _enqueue(self, robot, charger_id):
+        queue = self.queues.setdefault(charger_id, deque())
+        queue.append((robot, self.simulator.now))
+        self.queued[robot.id] = charger_id
+        self.max_queue_length = max(self.max_queue_length, len(queue))
+        name = self.nav_graph.vertex_store.name_of(charger_id)
+        self.fleet_manager.log(f"Robot {robot.id} queues for charger {name}", "charge_queued", robot.id, charger_id)
+
+    def _dequeue(self, robot):
+        charger_id = self.queued.pop(robot.id, None)
+        if charger_id is None:
+            return
+        queue = self.queues[charger_id]
+        for index, (queued_robot, _) in enumerate(queue):
+            if queued_robot is robot:
+                del queue[index]
+                break
+        if not queue:
+            del self.queues[charger_id]
+
+    def _send(self, robot, charger_id):
+        self.sessions[robot.id] = charger_id
+        self.charger_load[charger_id] = self.charger_load.get(charger_id, 0) + 1
+        self.sessions_started += 1
+        if robot.current_vertex["id"] == charger_id:
+            robot.status = "charging"
+            self._start_charging(robot)
+            return True
+
+        charger = self.nav_graph.get_vertex_by_id(charger_id)
+        self.fleet_manager.log(f"Robot {robot.id} heads to charger {charger['name']} at {robot.battery:.0f}%",
+                               "charge_requested", robot.id, charger_id)
+        success, message = self.fleet_manager.assign_task(robot, charger)
+        if not success and message == "Target vertex is full" and self._make_room(charger_id):
+            success, message = self.fleet_manager.assign_task(robot, charger)
+        if not success:
+            self._end_session(robot)
+            if message == "Target vertex is full":
+                self._enqueue(robot, charger_id)
+        return success
+
+    def _make_room(self, charger_id):
+        # Robots parked on the charger without a session are done charging and can move aside
+        for robot_id in self.fleet_manager.traffic_manager.get_vertex_occupants(charger_id):
+            robot = self.fleet_manager.robots[robot_id]
+            if (robot_id not in self.sessions and robot.status in ("idle", "charging")
+                    and self._vacate(robot, charger_id)):
+                return True
+        return False
+
+    def _end_session(self, robot):
+        charger_id = self.sessions.pop(robot.id, None)
+        if charger_id is None:
+            return
+        load = self.charger_load[charger_id] - 1
+        if load:
+            self.charger_load[charger_id] = load
+        else:
+            del self.charger_load[charger_id]
+        # Deferred: the robot giving up the slot is usually still in the middle of being handed its next task
+        if charger_id in self.queues:
+            self.simulator.schedule(0, self._serve_queue, charger_id)
+
+    def _serve_queue(self, charger_id):
+        queue = self.queues.get(charger_id)
+        while queue and self._has_slot(charger_id):
+            robot, queued_at = queue.popleft()
+            del self.queued[robot.id]
+            if not queue:
+                del self.queues[charger_id]
+            if robot.status not in ("idle", "charging"):
+                continue
+            self.queue_wait_total += self.simulator.now - queued_at
+            if self._send(robot, charger_id):
+                return
+
+    def _start_charging(self, robot):
+        if robot.id in self.charging_since:
+            return
+        self.charging_since[robot.id] = self.simulator.now
+        time_to_full = (self.BATTERY_CAPACITY - robot.battery) / self.charge_rate
+        self.full_events[robot.id] = self.simulator.schedule(time_to_full, self._charged, robot)
+
+    def _stop_charging(self, robot):
+        if robot.id not in self.charging_since:
+            return
+        level = self.level(robot)
+        del self.charging_since[robot.id]
+        self.simulator.cancel(self.full_events.pop(robot.id, None))
+        self.energy_charged += level - robot.battery
+        robot.battery = level
+
+    def _charged(self, robot):
+        self.full_events.pop(robot.id, None)
+        since = self.charging_since.pop(robot.id)
+        self.energy_charged += self.BATTERY_CAPACITY - robot.battery
+        robot.battery = self.BATTERY_CAPACITY
+        self.fleet_manager.log(f"Robot {robot.id} is fully charged after {self.simulator.now - since:.1f}s",
+                               "charged", robot.id, robot.current_vertex["id"])
+
+        charger_id = robot.current_vertex["id"]
+        # A charged robot parked in a full bay would keep the next robot in the queue out
+        if self.fleet_manager.vertex_occupancy and self.queues.get(charger_id):
+            self._vacate(robot, charger_id)
+        self._end_session(robot)
+        for listener in self.charge_listeners:
+            listener(robot)
+
+    def _vacate(self, robot, charger_id):
+        traffic_manager = self.fleet_manager.traffic_manager
+        chargers = self.nav_graph.vertex_store.chargers
+        for neighbor in self.nav_graph.get_connected_vertices(charger_id):
+            if not chargers[neighbor] and traffic_manager.has_vertex_space(neighbor):
+                success, _ = self.fleet_manager.assign_task(robot, self.nav_graph.get_vertex_by_id(neighbor))
+                return success
+        return False
+
+    def leave_charger(self, robot, target_id):
+        # The robot accepted a task elsewhere; settle the charge it gathered and give up its slot or place in line
+        self._stop_charging(robot)
+        self._dequeue(robot)
+        if self.sessions.get(robot.id) not in (None, target_id):
+            self._end_session(robot)
+
+    def on_task_completed(self, robot):
+        vertex_id = robot.current_vertex["id"]
+        if self.sessions.get(robot.id) not in (None, vertex_id):
+            # Ended up somewhere other than the booked charger
+            self._end_session(robot)
+
+        if robot.status == "charging":
+            # Any robot left on a charger charges; a low one also books the slot so it is not sent off early
+            if robot.id not in self.sessions and robot.battery < self.low_battery:
+                self.sessions[robot.id] = vertex_id
+                self.charger_load[vertex_id] = self.charger_load.get(vertex_id, 0) + 1
+                self.sessions_started += 1
+            self._start_charging(robot)
+        else:
+            # Deferred so the robot's next task, if it has one, is handed out first
+            self.simulator.schedule(0, self.check, robot)
+
+    def on_robot_stopped(self, robot):
+        self._stop_charging(robot)
+        self._dequeue(robot)
+        self._end_session(robot)
+        if robot.id not in self.stranded:
+            self.simulator.schedule(0, self.check, robot)
+
+    def check(self, robot):
+        if robot.status == "idle" and robot.id not in self.stranded and self.needs_charge(robot):
+            self.request_charge(robot)
+
+    def stats(self):
+        with self.simulator.lock:
+            return {
+                "energy_used": self.energy_used,
+                "energy_charged": self.energy_charged,
+                "charge_sessions": self.sessions_started,
+                "charging": len(self.charging_since),
+                "queued": len(self.queued),
+                "max_queue_length": self.max_queue_length,
+                "queue_wait_time": self.queue_wait_total,
+                "stranded": len(self.stranded),
+                "mean_battery": (sum(self.level(robot) for robot in self.fleet_manager.robots.values())
+                                 / len(self.fleet_manager.robots)) if self.fleet_manager.robots else 0.0
+            }
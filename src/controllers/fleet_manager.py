@@ -1,74 +1,555 @@
-import json
-import time
-from datetime import datetime
+import math
+import os
+
+from src.controllers.energy_manager import EnergyManager
+from src.controllers.reservation_planner import ReservationPlanner
+from src.controllers.route_cache import RouteCache
+from src.controllers.simulator import Simulator
+from src.models.fleet_snapshot import FleetSnapshot
+from src.models.motion_table import MotionTable
+from src.utils.fleet_logger import FleetLogger
+from src.utils.spatial_index import GridIndex
 
 class FleetManager:
-    def __init__(self, nav_graph, traffic_manager):
+    ROBOT_CELL_SIZE = 30
+    DEADLOCK_POLICIES = ("backoff", "replan", "detour")
+    # Seconds before a backed-off robot retries; doubles on each consecutive back-off
+    DEADLOCK_BACKOFF = 1.0
+    MAX_BACKOFFS = 3
+    # Times one cycle is handled before its victim gives up its task; enough for the back-off ladder to run its course
+    MAX_DEADLOCK_ATTEMPTS = 6
+    DEFAULT_LOG_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'logs', 'fleet_logs.txt')
+
+    def __init__(self, nav_graph, traffic_manager, simulator=None, eager_routes=False,
+                 log_file=None, structured_logs=False, reservations=False, deadlock_policy="replan",
+                 vertex_occupancy=False, battery=False, telemetry=None):
+        if deadlock_policy not in self.DEADLOCK_POLICIES:
+            raise ValueError(f"Unknown deadlock policy: {deadlock_policy}")
         self.nav_graph = nav_graph
         self.traffic_manager = traffic_manager
+        self.traffic_manager.deadlock_listeners.append(self.on_deadlock)
+        self.deadlock_policy = deadlock_policy
+        self.backoff_counts = {}
+        # Cycles being worked on, as sets of robot ids. A cycle only counts as resolved once one of its robots is
+        # granted a lane
+        self.open_deadlocks = set()
+        self.deadlock_attempts = {}
+        self.deadlocks_detected = 0
+        self.deadlocks_resolved = 0
+        # With vertex occupancy on, robots hold a slot on the vertex they stand on or are heading to, and a
+        # vertex takes as many robots as its "capacity" attribute allows
+        self.vertex_occupancy = vertex_occupancy
+        if vertex_occupancy:
+            self.traffic_manager.vertex_capacity = nav_graph.get_vertex_capacity
+        self.simulator = simulator if simulator is not None else Simulator()
+        self.simulator.frame_callbacks.append(self.update_positions)
+        self.simulator.frame_callbacks.append(self.publish_snapshot)
+        self.snapshot = FleetSnapshot.empty()
+        self.route_cache = RouteCache(nav_graph, eager=eager_routes)
+        # Map edits repair only the routes they touch
+        nav_graph.change_listeners.append(self.on_graph_changed)
+        self.routes_repaired = 0
+        # With reservations on, tasks are planned in space-time around every other robot's booked route
+        self.reservation_planner = ReservationPlanner(nav_graph) if reservations else None
         self.robots = {}
+        self.task_listeners = []
+        self.stop_listeners = []
+        self.lane_busy_time = {}
+        # With the battery model on, travel drains each robot and an energy manager sends them to charge
+        self.energy_manager = EnergyManager(self) if battery else None
+        # Optional metrics sink shared with the planner and traffic manager; None keeps the hot paths untouched
+        self.telemetry = telemetry
+        self.traffic_manager.telemetry = telemetry
+        nav_graph.planner.telemetry = telemetry
+        # Set by a ZoneWorker in sharded runs; robots hand themselves off before entering a lane it does not own
+        self.zone = None
+        # Optional event journal (or a replay's verifier) that records every input and lane hand-over
+        self.journal = None
+        self.robot_index = GridIndex(self.ROBOT_CELL_SIZE)
+        self.motion_table = MotionTable(self.ROBOT_CELL_SIZE)
         self.robot_colors = ["#FF0000", "#00FF00", "#0000FF", "#FFFF00", "#FF00FF", "#00FFFF", 
                            "#FFA500", "#800080", "#008000", "#000080", "#800000", "#008080"]
         self.color_index = 0
-        self.log_file = "logs/fleet_logs.txt"
+        self.log_file = log_file if log_file is not None else self.DEFAULT_LOG_FILE
         self.selected_robot = None
-        self.initialize_log_file()
+        self.structured_logs = structured_logs
+        self.logger = FleetLogger(self.log_file, structured=structured_logs)
+    
+    def __getstate__(self):
+        # A checkpoint holds the fleet's state, not its log, metrics or journal; the graph is shared, not copied
+        state = self.__dict__.copy()
+        for name in ("logger", "snapshot"):
+            del state[name]
+        state["telemetry"] = None
+        state["journal"] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.snapshot = FleetSnapshot.empty()
+        self.nav_graph.change_listeners.append(self.on_graph_changed)
+        self.logger = FleetLogger(self.log_file, structured=self.structured_logs, append=True)
     
-    def initialize_log_file(self):
-        with open(self.log_file, 'w') as f:
-            f.write(f"=== Fleet Management System Log - {datetime.now()} ===\n")
+    def open_log(self, log_file, append=False):
+        self.logger.close()
+        self.log_file = log_file
+        self.logger = FleetLogger(log_file, structured=self.structured_logs, append=append)
     
-    def log(self, message):
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        log_message = f"[{timestamp}] {message}"
-        with open(self.log_file, 'a') as f:
-            f.write(log_message + "\n")
+    def log(self, message, event=None, robot=None, vertex=None, lane=None):
+        self.logger.log(message, event, robot, vertex, lane)
     
-    def spawn_robot(self, vertex):
-        robot_id = len(self.robots) + 1
-        color = self.robot_colors[self.color_index % len(self.robot_colors)]
-        self.color_index += 1
+    def record_event(self, kind, robot=-1, a=-1, b=-1, value=0.0):
+        if self.journal is not None:
+            self.journal.record(kind, robot, a, b, value)
+    
+    def close(self):
+        if self.on_graph_changed in self.nav_graph.change_listeners:
+            self.nav_graph.change_listeners.remove(self.on_graph_changed)
+        if self.telemetry is not None:
+            self.telemetry.stop_export()
+        if self.journal is not None:
+            self.journal.close()
+        self.logger.close()
+    
+    def spawn_robot(self, vertex, robot_id=None):
+        with self.simulator.lock:
+            return self._spawn_robot(vertex, robot_id)
+    
+    def _spawn_robot(self, vertex, robot_id=None):
+        if self.vertex_occupancy and not self.traffic_manager.has_vertex_space(vertex["id"]):
+            self.log(f"Cannot spawn a robot at vertex {vertex['name']}: it is full", "spawn_rejected",
+                     vertex=vertex["id"])
+            self.record_event("spawn", a=vertex["id"])
+            return None
+        
+        # Sharded runs number robots fleet-wide, so a robot keeps its id and colour as it moves between zones
+        if robot_id is None:
+            robot_id = len(self.robots) + 1
+            color = self.robot_colors[self.color_index % len(self.robot_colors)]
+            self.color_index += 1
+        else:
+            color = self.robot_colors[(robot_id - 1) % len(self.robot_colors)]
         
         from src.models.robot import Robot
         new_robot = Robot(robot_id, vertex, color, self)
         self.robots[robot_id] = new_robot
+        self.robot_index.insert(robot_id, new_robot.x, new_robot.y)
+        if self.vertex_occupancy:
+            self.traffic_manager.place_robot(new_robot, vertex["id"])
         
-        self.log(f"Robot {robot_id} spawned at vertex {vertex['name']}")
+        self.log(f"Robot {robot_id} spawned at vertex {vertex['name']}", "spawn", robot_id, vertex["id"])
+        self.record_event("spawn", robot_id, vertex["id"])
         return new_robot
     
+    def remove_robot(self, robot):
+        # Drops a robot standing on a vertex, e.g. one handed off to another zone; it must hold no lane
+        with self.simulator.lock:
+            self.simulator.cancel(robot.pending_event)
+            robot.pending_event = None
+            self.traffic_manager.cancel_requests(robot)
+            if self.vertex_occupancy:
+                self.traffic_manager.remove_robot(robot)
+            if self.reservation_planner is not None:
+                self.reservation_planner.release(robot.id)
+            self.robots.pop(robot.id, None)
+            self.motion_table.end(robot)
+            self.robot_index.remove(robot.id)
+            self.backoff_counts.pop(robot.id, None)
+            self._drop_deadlocks(robot)
+            if self.selected_robot is robot:
+                self.selected_robot = None
+    
     def assign_task(self, robot, target_vertex):
+        with self.simulator.lock:
+            return self._assign_task(robot, target_vertex)
+    
+    def _assign_task(self, robot, target_vertex):
+        self.record_event("assign", robot.id, target_vertex["id"])
         if robot.status == "moving" or robot.status == "waiting":
-            self.log(f"Robot {robot.id} is already moving or waiting. Cannot assign new task.")
+            self.log(f"Robot {robot.id} is already moving or waiting. Cannot assign new task.", "task_rejected", robot.id)
             return False, "Robot is already moving or waiting"
         
         start_id = robot.current_vertex["id"]
         end_id = target_vertex["id"]
         
-        path = self.nav_graph.find_path(start_id, end_id)
+        blocked = None
+        if self.vertex_occupancy:
+            if end_id != start_id and self._is_parked_full(end_id):
+                self.log(f"Vertex {target_vertex['name']} is full. Cannot assign task to Robot {robot.id}.",
+                         "task_rejected", robot.id, end_id)
+                return False, "Target vertex is full"
+            # Parked robots will not make room, so plan around the vertices they fill
+            blocked = self._parked_vertices()
+            blocked.discard(start_id)
+        
+        departures = None
+        if self.reservation_planner is not None:
+            path, departures = self.reservation_planner.plan(robot.id, start_id, end_id, self.simulator.now,
+                                                             robot.move_speed, blocked)
+            if path is None:
+                # Fall back to an unreserved route; lane locking still keeps the robot safe
+                self.log(f"No conflict-free reservation for Robot {robot.id}, using an unreserved route",
+                         "reservation_failed", robot.id, end_id)
+                path = self._route(start_id, end_id, blocked)
+        else:
+            path = self._route(start_id, end_id, blocked)
         
         if not path:
-            self.log(f"No path found from {robot.current_vertex['name']} to {target_vertex['name']}")
+            self.log(f"No path found from {robot.current_vertex['name']} to {target_vertex['name']}", "no_path", robot.id, target_vertex["id"])
             return False, "No path found"
         
-        self.log(f"Assigning task to Robot {robot.id}: Move from {robot.current_vertex['name']} to {target_vertex['name']}")
-        success = robot.assign_task(target_vertex, path)
+        energy_manager = self.energy_manager
+        if energy_manager is not None:
+            if not energy_manager.can_complete(robot, path):
+                self.log(f"Robot {robot.id} lacks the battery to reach {target_vertex['name']} and a charger after",
+                         "task_rejected", robot.id, end_id)
+                if self.reservation_planner is not None:
+                    self.reservation_planner.release(robot.id)
+                energy_manager.request_charge(robot)
+                return False, "Battery too low"
+            energy_manager.leave_charger(robot, end_id)
+        
+        self.log(f"Assigning task to Robot {robot.id}: Move from {robot.current_vertex['name']} to {target_vertex['name']}",
+                 "task_assigned", robot.id, target_vertex["id"])
+        success = robot.assign_task(target_vertex, path, departures)
         
         return success, "Task assigned successfully" if success else "Failed to assign task"
     
+    def _route(self, start_id, end_id, blocked=None):
+        path = self.route_cache.get_path(start_id, end_id)
+        if path and blocked and any(vertex_id in blocked for vertex_id in path[1:-1]):
+            path = self.nav_graph.find_path(start_id, end_id, avoid_vertices=blocked)
+        return path
+    
+    def _is_parked_full(self, vertex_id):
+        occupants = self.traffic_manager.get_vertex_occupants(vertex_id)
+        if len(occupants) < self.nav_graph.get_vertex_capacity(vertex_id):
+            return False
+        return all(self.robots[robot_id].status in ("idle", "charging") for robot_id in occupants)
+    
+    def _parked_vertices(self):
+        return {vertex_id for vertex_id in self.traffic_manager.get_full_vertices() if self._is_parked_full(vertex_id)}
+    
+    def task_completed(self, robot):
+        self.backoff_counts.pop(robot.id, None)
+        self._drop_deadlocks(robot)
+        self.record_event("task_completed", robot.id, robot.current_vertex["id"])
+        if self.telemetry is not None and self.telemetry.enabled:
+            self.telemetry.tasks_completed.inc()
+        if self.reservation_planner is not None:
+            self.reservation_planner.release(robot.id)
+        if self.vertex_occupancy:
+            self._check_parked(robot.current_vertex["id"])
+        for listener in self.task_listeners:
+            listener(robot)
+    
+    def robot_blocked(self, robot, lane):
+        if self.vertex_occupancy and self._is_parked_full(lane[1]):
+            self.simulator.schedule(0, self.resolve_parked_block, robot, lane[1])
+    
+    def _check_parked(self, vertex_id):
+        # A robot just parked here; anyone queued to enter would otherwise wait for it indefinitely
+        if not self._is_parked_full(vertex_id):
+            return
+        for waiting_robot in self.traffic_manager.get_vertex_waiters(vertex_id):
+            self.simulator.schedule(0, self.resolve_parked_block, waiting_robot, vertex_id)
+    
+    def resolve_parked_block(self, robot, vertex_id):
+        waiter = self.traffic_manager.waiting.get(robot.id)
+        # The robot may have moved on, or the vertex freed up, while this was queued
+        if waiter is None or waiter.lane[1] != vertex_id or not self._is_parked_full(vertex_id):
+            return
+        
+        vertex = self.nav_graph.get_vertex_by_id(vertex_id)
+        if robot.target_vertex is not None and robot.target_vertex["id"] != vertex_id:
+            blocked = self._parked_vertices()
+            blocked.discard(robot.current_vertex["id"])
+            path = self.nav_graph.find_path(robot.current_vertex["id"], robot.target_vertex["id"],
+                                            avoid_vertices=blocked)
+            if path:
+                self.log(f"Vertex {vertex['name']} is full; Robot {robot.id} routes around it", "vertex_blocked",
+                         robot.id, vertex_id, waiter.lane)
+                self._reroute(robot, path)
+                return
+        
+        self.log(f"Vertex {vertex['name']} is full; Robot {robot.id} abandons its task", "task_abandoned",
+                 robot.id, vertex_id, waiter.lane)
+        robot.stop_movement()
+    
+    def on_deadlock(self, robots):
+        # Raised from inside a lane request; resolve once the requesting robot has finished its own step
+        self.simulator.schedule(0, self.resolve_deadlock, robots)
+    
+    def resolve_deadlock(self, robots):
+        waiting = self.traffic_manager.waiting
+        # The cycle may already have broken up while the resolution was queued
+        if any(robot.id not in waiting for robot in robots):
+            return
+        
+        # Robots spawned later yield to earlier ones
+        candidates = sorted(robots, key=lambda robot: robot.id, reverse=True)
+        victim = candidates[0]
+        waiter = waiting[victim.id]
+        blocked_lane = waiter.lane_key
+        # A free lane means the robot is held up by the full vertex at its far end
+        blocked_vertex = None
+        if self.vertex_occupancy and not self.traffic_manager.is_lane_occupied(waiter.lane):
+            blocked_vertex = waiter.lane[1]
+        policy = self.deadlock_policy
+        cycle_key = frozenset(robot.id for robot in robots)
+        if cycle_key not in self.open_deadlocks:
+            self.open_deadlocks.add(cycle_key)
+            self.deadlocks_detected += 1
+        # A cycle that keeps forming again between the same robots counts against them until one of them finishes
+        attempts = self.deadlock_attempts.get(cycle_key, 0)
+        self.deadlock_attempts[cycle_key] = attempts + 1
+        if attempts >= self.MAX_DEADLOCK_ATTEMPTS:
+            # Nothing has broken the cycle up for good, e.g. head-on in an aisle with robots queued behind both
+            # ends, so the victim parks where it is and the others route around it
+            self.log(f"Deadlock between robots {', '.join(str(robot.id) for robot in robots)} could not be resolved; "
+                     f"Robot {victim.id} abandons its task", "deadlock_unresolved", victim.id,
+                     victim.current_vertex["id"], blocked_lane)
+            victim.stop_movement()
+            return
+        self.log(f"Deadlock between robots {', '.join(str(robot.id) for robot in robots)}; "
+                 f"Robot {victim.id} yields ({policy})", "deadlock", victim.id, victim.current_vertex["id"], blocked_lane)
+        
+        count = self.backoff_counts.get(victim.id, 0)
+        self.backoff_counts[victim.id] = count + 1
+        if policy == "backoff":
+            if count < self.MAX_BACKOFFS:
+                victim.back_off(self.DEADLOCK_BACKOFF * 2 ** count)
+                return
+            # The same robots keep meeting, so waiting longer will not help
+            policy = "replan"
+        
+        # Replanning takes no time, so a robot that keeps replanning into new cycles has to step aside instead
+        if policy == "replan" and count <= self.MAX_BACKOFFS and self._replan_around(victim, blocked_lane,
+                                                                                    blocked_vertex):
+            return
+        # A boxed-in victim cannot step aside, but another robot in the cycle may be able to make room
+        in_the_way = {vertex_id for robot in robots for vertex_id in robot.path[robot.path_index:]}
+        for robot in candidates:
+            if self._detour(robot, waiting[robot.id].lane_key, in_the_way):
+                return
+        # Everyone in the cycle is boxed in; a robot queued behind it stepping aside opens up space next to it,
+        # and the victim's retry finds the cycle again once there is room to move
+        cycle_ids = {robot.id for robot in robots}
+        for robot_id, blocker in sorted(self.traffic_manager.wait_for.items(), reverse=True):
+            if blocker in cycle_ids and robot_id not in cycle_ids and robot_id in waiting:
+                if self._detour(self.robots[robot_id], waiting[robot_id].lane_key, in_the_way):
+                    break
+        victim.back_off(self.DEADLOCK_BACKOFF)
+    
+    def lane_granted(self, robot):
+        # Any robot in a cycle moving on breaks that cycle up
+        for cycle_key in [cycle_key for cycle_key in self.open_deadlocks if robot.id in cycle_key]:
+            self.open_deadlocks.discard(cycle_key)
+            self.deadlocks_resolved += 1
+            if self.telemetry is not None and self.telemetry.enabled:
+                self.telemetry.deadlocks.inc()
+    
+    def _drop_deadlocks(self, robot):
+        # A robot that finishes, stops or leaves takes its cycles with it; any still open stay unresolved
+        for cycle_key in [cycle_key for cycle_key in self.open_deadlocks if robot.id in cycle_key]:
+            self.open_deadlocks.discard(cycle_key)
+        for cycle_key in [cycle_key for cycle_key in self.deadlock_attempts if robot.id in cycle_key]:
+            del self.deadlock_attempts[cycle_key]
+    
+    def _replan_around(self, robot, blocked_lane, blocked_vertex=None):
+        if robot.target_vertex is None:
+            return False
+        avoid_vertices = None
+        if blocked_vertex is not None:
+            # No route around the target itself; only stepping aside can let its occupant out
+            if blocked_vertex == robot.target_vertex["id"]:
+                return False
+            avoid_vertices = {blocked_vertex}
+        path = self.nav_graph.find_path(robot.current_vertex["id"], robot.target_vertex["id"], avoid={blocked_lane},
+                                        avoid_vertices=avoid_vertices)
+        if not path:
+            return False
+        self._reroute(robot, path)
+        return True
+    
+    def _detour(self, robot, blocked_lane, in_the_way=()):
+        # Step aside onto a free neighbouring lane, then head for the target from there. Neighbours off the
+        # routes in in_the_way are preferred so the other robots can actually get past
+        if robot.target_vertex is None:
+            return False
+        start_id = robot.current_vertex["id"]
+        target_id = robot.target_vertex["id"]
+        best_path = None
+        best_cost = (True, math.inf)
+        for neighbor in self.nav_graph.get_connected_vertices(start_id):
+            lane = (start_id, neighbor)
+            if self.traffic_manager.get_lane_key(lane) == blocked_lane or self.traffic_manager.is_lane_occupied(lane):
+                continue
+            if self.vertex_occupancy and not self.traffic_manager.has_vertex_space(neighbor):
+                continue
+            cost = (neighbor in in_the_way,
+                    self.nav_graph.get_lane_cost(start_id, neighbor) + self.route_cache.get_cost(neighbor, target_id))
+            if cost < best_cost:
+                best_cost = cost
+                best_path = [start_id] + self.route_cache.get_path(neighbor, target_id)
+        if best_path is None:
+            return False
+        self._reroute(robot, best_path)
+        return True
+    
+    def _reroute(self, robot, path):
+        if self.reservation_planner is not None:
+            self.reservation_planner.release(robot.id)
+        robot.reroute(path)
+    
+    def block_lane(self, start_id, end_id):
+        return self._edit_map("block_lane", f"Lane {self.lane_name(start_id, end_id)} blocked",
+                              self.nav_graph.block_lane, start_id, end_id)
+    
+    def unblock_lane(self, start_id, end_id):
+        return self._edit_map("unblock_lane", f"Lane {self.lane_name(start_id, end_id)} unblocked",
+                              self.nav_graph.unblock_lane, start_id, end_id)
+    
+    def block_vertex(self, vertex_id):
+        return self._edit_map("block_vertex", f"Vertex {self.nav_graph.get_vertex_by_id(vertex_id)['name']} blocked",
+                              self.nav_graph.block_vertex, vertex_id)
+    
+    def unblock_vertex(self, vertex_id):
+        return self._edit_map("unblock_vertex",
+                              f"Vertex {self.nav_graph.get_vertex_by_id(vertex_id)['name']} unblocked",
+                              self.nav_graph.unblock_vertex, vertex_id)
+    
+    def set_lane_cost(self, start_id, end_id, cost):
+        return self._edit_map("set_lane_cost", f"Lane {self.lane_name(start_id, end_id)} now costs {cost}",
+                              self.nav_graph.set_lane_cost, start_id, end_id, cost)
+    
+    def lane_name(self, start_id, end_id):
+        return f"{self.nav_graph.get_vertex_by_id(start_id)['name']}-{self.nav_graph.get_vertex_by_id(end_id)['name']}"
+    
+    def _edit_map(self, kind, message, edit, *args):
+        # Edits go through the simulator lock so no robot plans against a half-applied change
+        with self.simulator.lock:
+            self.record_event(kind, -1, *args)
+            if not edit(*args):
+                return False
+            self.log(message, "map_edit")
+            return True
+    
+    def on_graph_changed(self, change):
+        # Nothing got worse for anyone when a lane or vertex reopens or gets cheaper, so every route stays valid
+        if not change.worse:
+            return
+        with self.simulator.lock:
+            for robot in list(self.robots.values()):
+                if (robot.status in ("moving", "waiting") and robot.target_vertex is not None
+                        and self._route_touches(robot, change)):
+                    self._repair_route(robot)
+    
+    def _replan_start(self, robot):
+        # A robot already on a lane has to finish it, so its route can only change from the lane's far end
+        return robot.path_index + 1 if robot.current_lane is not None else robot.path_index
+    
+    def _route_touches(self, robot, change):
+        path = robot.path
+        start = self._replan_start(robot)
+        for vertex_id in change.vertices:
+            if vertex_id in path[start:]:
+                return True
+        for start_id, end_id in change.lanes:
+            for i in range(start, len(path) - 1):
+                if (path[i] == start_id and path[i + 1] == end_id) or (path[i] == end_id and path[i + 1] == start_id):
+                    return True
+        return False
+    
+    def _repair_route(self, robot):
+        start = self._replan_start(robot)
+        from_id = robot.path[start]
+        target = robot.target_vertex
+        blocked = None
+        if self.vertex_occupancy:
+            blocked = self._parked_vertices()
+            blocked.discard(from_id)
+        path = self._route(from_id, target["id"], blocked)
+        if not path:
+            self.log(f"Map change leaves Robot {robot.id} no route to {target['name']}; it abandons its task",
+                     "task_abandoned", robot.id, target["id"])
+            robot.stop_movement()
+            return
+        
+        self.routes_repaired += 1
+        self.log(f"Robot {robot.id} replans to {target['name']} around a map change", "route_repaired", robot.id,
+                 from_id)
+        if start > robot.path_index or (len(path) > 1 and robot.path[start + 1] == path[1]):
+            # The next move is unchanged, so only the tail is swapped; a queued lane request or a lane already
+            # granted stays as it is
+            if self.reservation_planner is not None:
+                self.reservation_planner.release(robot.id)
+            robot.path = robot.path[:start] + path
+            robot.departures = None
+        else:
+            self._reroute(robot, path)
+    
+    def robot_stopped(self, robot):
+        self.backoff_counts.pop(robot.id, None)
+        self._drop_deadlocks(robot)
+        if self.reservation_planner is not None:
+            self.reservation_planner.release(robot.id)
+        if self.vertex_occupancy:
+            self._check_parked(robot.current_vertex["id"])
+        for listener in self.stop_listeners:
+            listener(robot)
+    
+    def record_lane_usage(self, lane, duration):
+        lane_key = self.traffic_manager.get_lane_key(lane)
+        self.lane_busy_time[lane_key] = self.lane_busy_time.get(lane_key, 0.0) + duration
+    
     def select_robot(self, robot_id):
         if robot_id in self.robots:
             self.selected_robot = self.robots[robot_id]
-            self.log(f"Selected Robot {robot_id}")
+            self.log(f"Selected Robot {robot_id}", "select", robot_id)
             return True
         return False
     
+    def update_positions(self, now):
+        # One vectorised step places every robot on a lane; only the write-back loops in Python, and only robots
+        # that changed cell touch the index buckets
+        robots, xs, ys, moved = self.motion_table.advance(now)
+        for robot, x, y in zip(robots, xs, ys):
+            robot.x = x
+            robot.y = y
+        self.robot_index.update_many([robot.id for robot in robots], xs, ys, moved)
+
+    def publish_snapshot(self, now=None):
+        with self.simulator.lock:
+            battery_level = self.energy_manager.level if self.energy_manager is not None else None
+            snapshot = FleetSnapshot.capture(self.snapshot.version + 1, self.simulator.now, self.robots.values(),
+                                             self.traffic_manager.snapshot(), battery_level)
+            # Keep the old version when nothing changed so readers can skip the redraw
+            if snapshot.same_state(self.snapshot):
+                return self.snapshot
+            self.snapshot = snapshot
+            return snapshot
+
+    def update_robot_position(self, robot):
+        self.robot_index.update(robot.id, robot.x, robot.y)
+
     def get_robot_at_position(self, x, y, tolerance=15):
-        for robot_id, robot in self.robots.items():
-            if abs(robot.x - x) <= tolerance and abs(robot.y - y) <= tolerance:
-                return robot
-        return None
+        candidates = self.robot_index.query_box(x - tolerance, y - tolerance, x + tolerance, y + tolerance)
+        if not candidates:
+            return None
+        robot_id = min(candidates, key=lambda rid: (self.robots[rid].x - x) ** 2 + (self.robots[rid].y - y) ** 2)
+        return self.robots[robot_id]
+
+    def get_robots_near(self, x, y, radius):
+        return [self.robots[robot_id] for robot_id in self.robot_index.query_radius(x, y, radius)]
+
+    def get_nearest_robot(self, x, y, max_distance=math.inf):
+        robot_id = self.robot_index.nearest(x, y, max_distance)
+        return self.robots.get(robot_id)
     
     def stop_all_robots(self):
-        for robot in self.robots.values():
-            robot.stop_movement()
-        self.log("All robots stopped")
\ No newline at end of file
+        with self.simulator.lock:
+            self.record_event("stop_all")
+            for robot in self.robots.values():
+                robot.stop_movement()
+        self.log("All robots stopped", "stop_all")
\ No newline at end of file
@@ -0,0 +1,199 @@
+import heapq
+import math
+from bisect import bisect_right, insort
+
+
+class ReservationTable:
+    def __init__(self):
+        # Per lane / vertex, reservations are kept sorted by start time as [start, end, robot_id]
+        self.lane_slots = {}
+        self.vertex_slots = {}
+        self.robot_slots = {}
+
+    def reserve_lane(self, robot_id, lane_key, start, end):
+        self._reserve(self.lane_slots, "lane", robot_id, lane_key, start, end)
+
+    def reserve_vertex(self, robot_id, vertex_id, start, end):
+        self._reserve(self.vertex_slots, "vertex", robot_id, vertex_id, start, end)
+
+    def _reserve(self, table, kind, robot_id, key, start, end):
+        slot = [start, end, robot_id]
+        insort(table.setdefault(key, []), slot)
+        self.robot_slots.setdefault(robot_id, []).append((kind, key, slot))
+
+    def release(self, robot_id):
+        for kind, key, slot in self.robot_slots.pop(robot_id, ()):
+            table = self.lane_slots if kind == "lane" else self.vertex_slots
+            slots = table[key]
+            slots.remove(slot)
+            if not slots:
+                del table[key]
+
+    def safe_intervals(self, vertex_id):
+        # Gaps between bookings; a robot may only stand on the vertex inside one of these
+        intervals = []
+        start = -math.inf
+        for slot_start, slot_end, _ in self.vertex_slots.get(vertex_id, ()):
+            if slot_start > start:
+                intervals.append((start, slot_start))
+            start = max(start, slot_end)
+        if start < math.inf:
+            intervals.append((start, math.inf))
+        return intervals
+
+    def lane_free_from(self, lane_key, earliest, duration):
+        # Earliest departure >= earliest that keeps the lane to ourselves for the whole traversal
+        slots = self.lane_slots.get(lane_key)
+        if not slots:
+            return earliest
+        depart = earliest
+        # Lane bookings never overlap, so a slot starting before us is the only earlier one that can still be active
+        position = max(bisect_right(slots, [depart]) - 1, 0)
+        for slot_start, slot_end, _ in slots[position:]:
+            if slot_end <= depart:
+                continue
+            if slot_start >= depart + duration:
+                break
+            depart = slot_end
+        return depart
+
+
+class ReservationPlanner:
+    # Seconds of separation kept around every vertex visit
+    DEFAULT_CLEARANCE = 0.5
+
+    def __init__(self, nav_graph, clearance=DEFAULT_CLEARANCE, reserve_vertices=False):
+        self.nav_graph = nav_graph
+        self.clearance = clearance
+        # TrafficManager only locks lanes, so by default only lanes are booked; vertex bookings are stricter
+        self.reserve_vertices = reserve_vertices
+        self.table = ReservationTable()
+        self.plans = 0
+        self.failures = 0
+
+    def release(self, robot_id):
+        self.table.release(robot_id)
+
+    def plan(self, robot_id, start_id, goal_id, now, speed, avoid_vertices=None):
+        # Returns the vertex path and the departure time from each vertex but the last, or (None, None)
+        self.table.release(robot_id)
+        self.plans += 1
+
+        result = self._search(start_id, goal_id, now, speed, avoid_vertices)
+        if result is None:
+            self.failures += 1
+            return None, None
+
+        path, departures = result
+        self._book(robot_id, path, departures, now, speed)
+        return path, departures
+
+    def _search(self, start_id, goal_id, now, speed, avoid_vertices=None):
+        # Safe-interval path planning: states are (vertex, safe interval) and g is the lane cost plus waiting, in
+        # seconds; arrival times still follow lane length, so costs steer the route without skewing the bookings
+        graph = self.nav_graph
+        if start_id not in graph.vertex_index or goal_id not in graph.vertex_index:
+            return None
+
+        table = self.table
+        adjacency = graph.adjacency
+        adjacency_costs = graph.adjacency_costs
+        xs, ys = graph.vertex_store.xs, graph.vertex_store.ys
+        goal_x, goal_y = xs[goal_id], ys[goal_id]
+        interval_cache = {}
+
+        def intervals(vertex_id):
+            cached = interval_cache.get(vertex_id)
+            if cached is None:
+                cached = interval_cache[vertex_id] = table.safe_intervals(vertex_id)
+            return cached
+
+        # Scale the heuristic so lanes with a cost below their length keep it admissible
+        scale = graph.min_cost_ratio / speed
+
+        def heuristic(vertex_id):
+            return scale * math.hypot(goal_x - xs[vertex_id], goal_y - ys[vertex_id])
+
+        # The robot is already standing on its start vertex, so it may stay until the next booking there begins
+        start_end = math.inf
+        for slot_start, _, _ in table.vertex_slots.get(start_id, ()):
+            if slot_start > now:
+                start_end = slot_start
+                break
+
+        start_state = (start_id, -1)
+        # Ties on cost go to the earlier arrival, which leaves the most room in the next safe intervals
+        best = {start_state: (0.0, now)}
+        parents = {start_state: None}
+        frontier = [(heuristic(start_id), 0.0, now, start_id, -1, start_end)]
+
+        while frontier:
+            _, cost, arrival, vertex_id, index, interval_end = heapq.heappop(frontier)
+            state = (vertex_id, index)
+            if (cost, arrival) > best[state]:
+                continue
+
+            # The goal only counts once we can wait out any later bookings there
+            if vertex_id == goal_id and interval_end == math.inf:
+                return self._reconstruct(parents, state)
+
+            for neighbor, lane_cost in zip(adjacency[vertex_id], adjacency_costs[vertex_id]):
+                # Vertices taken up by parked robots are out of bounds for the whole plan
+                if avoid_vertices and neighbor in avoid_vertices and neighbor != goal_id:
+                    continue
+                duration = math.hypot(xs[neighbor] - xs[vertex_id], ys[neighbor] - ys[vertex_id]) / speed
+                lane_key = (vertex_id, neighbor) if vertex_id <= neighbor else (neighbor, vertex_id)
+
+                for neighbor_index, (safe_start, safe_end) in enumerate(intervals(neighbor)):
+                    if safe_start - duration > interval_end:
+                        break
+                    if safe_end <= arrival + duration:
+                        continue
+
+                    depart = table.lane_free_from(lane_key, max(arrival, safe_start - duration), duration)
+                    if depart > interval_end or depart + duration >= safe_end:
+                        continue
+
+                    neighbor_arrival = depart + duration
+                    neighbor_cost = cost + (depart - arrival) + lane_cost / speed
+                    neighbor_state = (neighbor, neighbor_index)
+                    key = (neighbor_cost, neighbor_arrival)
+                    if key < best.get(neighbor_state, (math.inf, math.inf)):
+                        best[neighbor_state] = key
+                        parents[neighbor_state] = (state, depart)
+                        heapq.heappush(frontier, (neighbor_cost + heuristic(neighbor), neighbor_cost,
+                                                  neighbor_arrival, neighbor, neighbor_index, safe_end))
+
+        return None
+
+    def _reconstruct(self, parents, state):
+        path = [state[0]]
+        departures = []
+        step = parents[state]
+        while step is not None:
+            previous_state, depart = step
+            path.append(previous_state[0])
+            departures.append(depart)
+            step = parents[previous_state]
+        path.reverse()
+        departures.reverse()
+        return path, departures
+
+    def _book(self, robot_id, path, departures, now, speed):
+        table = self.table
+        clearance = self.clearance
+        graph = self.nav_graph
+        arrival = now
+
+        for index, depart in enumerate(departures):
+            start_id, end_id = path[index], path[index + 1]
+            if self.reserve_vertices:
+                table.reserve_vertex(robot_id, start_id, arrival - clearance, depart + clearance)
+            lane_key = (start_id, end_id) if start_id <= end_id else (end_id, start_id)
+            arrival = depart + graph.get_lane_length(start_id, end_id) / speed
+            table.reserve_lane(robot_id, lane_key, depart, arrival)
+
+        # Bookings only cover robots on the move; an idle robot does not claim its vertex
+        if self.reserve_vertices:
+            table.reserve_vertex(robot_id, path[-1], arrival - clearance, arrival + clearance)
+        return arrival
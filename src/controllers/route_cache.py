@@ -0,0 +1,233 @@
+import math
+import threading
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class RouteCache:
+    # Floyd-Warshall is O(V^3); above this size repeated Dijkstra is cheaper
+    FLOYD_WARSHALL_LIMIT = 1500
+
+    def __init__(self, nav_graph, max_size=4096, eager=False):
+        self.nav_graph = nav_graph
+        self.max_size = max_size
+        self.eager = eager
+        self.routes = OrderedDict()
+        # Cached route keys by the vertices their paths visit, so a map edit drops only the routes it touches
+        self.vertex_routes = {}
+        self.next_hop = None
+        self.distances = None
+        self.graph_version = nav_graph.version
+        self.hits = 0
+        self.misses = 0
+        self.precomputed_hits = 0
+        self.invalidations = 0
+        self.partial_invalidations = 0
+        self.routes_dropped = 0
+        self.lock = threading.Lock()
+
+        if eager:
+            self._build_tables()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def get_path(self, start_id, end_id):
+        path, _ = self.get_route(start_id, end_id)
+        return list(path) if path else None
+
+    def get_cost(self, start_id, end_id):
+        _, cost = self.get_route(start_id, end_id)
+        return cost
+
+    def get_costs(self, source_id, target_ids):
+        # Lanes are undirected, so a single search from the source prices a whole batch of targets
+        with self.lock:
+            self._check_version()
+            if self.distances is not None:
+                return [self.distances.get(target_id, {}).get(source_id, math.inf) for target_id in target_ids]
+        return self.nav_graph.planner.distances_to(source_id, target_ids)
+
+    def get_route(self, start_id, end_id):
+        key = (start_id, end_id)
+
+        with self.lock:
+            self._check_version()
+
+            route = self.routes.get(key)
+            if route is not None:
+                self.routes.move_to_end(key)
+                self.hits += 1
+                return route
+
+            if self.next_hop is not None:
+                route = self._route_from_tables(start_id, end_id)
+                self.precomputed_hits += 1
+            else:
+                path, cost = self.nav_graph.planner.plan(start_id, end_id)
+                route = (tuple(path) if path else None, cost)
+                self.misses += 1
+
+            self._store(key, route)
+            return route
+
+    def invalidate(self):
+        with self.lock:
+            self._clear()
+
+    def precompute(self):
+        with self.lock:
+            self._clear()
+            self._build_tables()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses + self.precomputed_hits
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "precomputed_hits": self.precomputed_hits,
+                "invalidations": self.invalidations,
+                "partial_invalidations": self.partial_invalidations,
+                "routes_dropped": self.routes_dropped,
+                "size": len(self.routes),
+                "hit_rate": (self.hits + self.precomputed_hits) / lookups if lookups else 0.0
+            }
+
+    def _check_version(self):
+        if self.graph_version == self.nav_graph.version:
+            return
+
+        # Blocks and cost rises leave every route that avoids them optimal, so only the routes through them go.
+        # Anything that may have made some route cheaper, and the precomputed tables, need a full rebuild
+        if self.next_hop is None:
+            changes = self.nav_graph.changes_since(self.graph_version)
+            if changes is not None and all(change.worse for change in changes):
+                for change in changes:
+                    self._drop_routes(change)
+                self.graph_version = self.nav_graph.version
+                self.partial_invalidations += 1
+                return
+
+        self._clear()
+        if self.eager:
+            self._build_tables()
+
+    def _store(self, key, route):
+        self.routes[key] = route
+        vertex_routes = self.vertex_routes
+        for vertex_id in route[0] or ():
+            routes = vertex_routes.get(vertex_id)
+            if routes is None:
+                vertex_routes[vertex_id] = {key}
+            else:
+                routes.add(key)
+        if len(self.routes) > self.max_size:
+            self._unindex(*self.routes.popitem(last=False))
+
+    def _unindex(self, key, route):
+        vertex_routes = self.vertex_routes
+        for vertex_id in route[0] or ():
+            routes = vertex_routes.get(vertex_id)
+            if routes is not None:
+                routes.discard(key)
+                if not routes:
+                    del vertex_routes[vertex_id]
+
+    def _drop_routes(self, change):
+        vertex_routes = self.vertex_routes
+        doomed = set()
+        for vertex_id in change.vertices:
+            doomed.update(vertex_routes.get(vertex_id, ()))
+        for start_id, end_id in change.lanes:
+            # Routes visiting both ends are candidates; the lane has to be one of their hops
+            for key in vertex_routes.get(start_id, set()) & vertex_routes.get(end_id, set()):
+                path = self.routes[key][0]
+                for a, b in zip(path, path[1:]):
+                    if (a == start_id and b == end_id) or (a == end_id and b == start_id):
+                        doomed.add(key)
+                        break
+        for key in doomed:
+            self._unindex(key, self.routes.pop(key))
+        self.routes_dropped += len(doomed)
+
+    def _clear(self):
+        self.routes.clear()
+        self.vertex_routes.clear()
+        self.next_hop = None
+        self.distances = None
+        self.graph_version = self.nav_graph.version
+        self.invalidations += 1
+
+    def _build_tables(self):
+        if np is not None and len(self.nav_graph.vertices) <= self.FLOYD_WARSHALL_LIMIT:
+            self._build_tables_floyd_warshall()
+        else:
+            self._build_tables_dijkstra()
+
+    def _build_tables_dijkstra(self):
+        # Lanes are undirected, so the shortest path tree rooted at a target
+        # gives every vertex its next hop towards that target
+        self.next_hop = {}
+        self.distances = {}
+        for vertex_id in self.nav_graph.vertex_index:
+            distances, parents = self.nav_graph.planner.shortest_path_tree(vertex_id)
+            self.next_hop[vertex_id] = parents
+            self.distances[vertex_id] = distances
+
+    def _build_tables_floyd_warshall(self):
+        vertex_ids = list(self.nav_graph.vertex_index)
+        position = {vertex_id: idx for idx, vertex_id in enumerate(vertex_ids)}
+        count = len(vertex_ids)
+
+        dist = np.full((count, count), np.inf)
+        nxt = np.full((count, count), -1, dtype=np.int64)
+        np.fill_diagonal(dist, 0.0)
+        np.fill_diagonal(nxt, np.arange(count))
+
+        for vertex_id in vertex_ids:
+            i = position[vertex_id]
+            for neighbor, cost in zip(self.nav_graph.adjacency[vertex_id], self.nav_graph.adjacency_costs[vertex_id]):
+                j = position[neighbor]
+                if cost < dist[i, j]:
+                    dist[i, j] = cost
+                    nxt[i, j] = j
+
+        for k in range(count):
+            candidate = dist[:, k, None] + dist[None, k, :]
+            improved = candidate < dist
+            dist = np.where(improved, candidate, dist)
+            nxt = np.where(improved, nxt[:, k, None], nxt)
+
+        # Store per-target tables in the same shape the Dijkstra builder uses
+        self.next_hop = {}
+        self.distances = {}
+        for target_id in vertex_ids:
+            j = position[target_id]
+            reachable = np.nonzero(nxt[:, j] >= 0)[0]
+            self.next_hop[target_id] = {
+                vertex_ids[i]: (vertex_ids[nxt[i, j]] if i != j else None) for i in reachable
+            }
+            self.distances[target_id] = {vertex_ids[i]: float(dist[i, j]) for i in reachable}
+
+    def _route_from_tables(self, start_id, end_id):
+        hops = self.next_hop.get(end_id)
+        if hops is None or start_id not in hops:
+            return None, math.inf
+
+        path = [start_id]
+        node = start_id
+        while node != end_id:
+            node = hops[node]
+            path.append(node)
+        return tuple(path), self.distances[end_id][start_id]
\ No newline at end of file
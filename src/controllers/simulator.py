@@ -0,0 +1,159 @@
+import heapq
+import threading
+import time
+
+
+class SimEvent:
+    def __init__(self, time, sequence, callback, args):
+        self.time = time
+        self.sequence = sequence
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.time, self.sequence) < (other.time, other.sequence)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Simulator:
+    def __init__(self, realtime=True, time_scale=1.0, frame_interval=1 / 30):
+        self.realtime = realtime
+        self.time_scale = time_scale
+        self.frame_interval = frame_interval
+        self.now = 0.0
+        self.events = []
+        self.next_sequence = 0
+        self.frame_callbacks = []
+        self.events_processed = 0
+        # True while event callbacks run; anything the fleet is asked to do outside them is an outside input
+        self.dispatching = False
+        # Callbacks run while holding this lock, so it also serialises fleet state changes
+        self.lock = threading.RLock()
+        self.wakeup = threading.Condition(self.lock)
+        self.running = False
+        self.thread = None
+        self.wall_start = None
+
+    def __getstate__(self):
+        # Checkpoints keep the clock and the pending events; a restored simulator starts out stopped
+        state = self.__dict__.copy()
+        for name in ("lock", "wakeup", "thread", "wall_start"):
+            del state[name]
+        state["running"] = False
+        state["dispatching"] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+        self.wakeup = threading.Condition(self.lock)
+        self.thread = None
+        self.wall_start = None
+
+    def schedule(self, delay, callback, *args):
+        return self.schedule_at(self.now + max(delay, 0.0), callback, *args)
+
+    def schedule_at(self, event_time, callback, *args):
+        with self.lock:
+            event = SimEvent(max(event_time, self.now), self.next_sequence, callback, args)
+            self.next_sequence += 1
+            heapq.heappush(self.events, event)
+            self.wakeup.notify()
+            return event
+
+    def cancel(self, event):
+        if event is not None:
+            event.cancel()
+
+    def pending(self):
+        with self.lock:
+            return sum(1 for event in self.events if not event.cancelled)
+
+    def next_time(self):
+        with self.lock:
+            while self.events and self.events[0].cancelled:
+                heapq.heappop(self.events)
+            return self.events[0].time if self.events else None
+
+    def step(self):
+        with self.lock:
+            while self.events:
+                event = heapq.heappop(self.events)
+                if event.cancelled:
+                    continue
+                self.now = event.time
+                self.events_processed += 1
+                self.dispatching = True
+                try:
+                    event.callback(*event.args)
+                finally:
+                    self.dispatching = False
+                return True
+            return False
+
+    def run(self, until=None):
+        with self.lock:
+            self._process_until(until)
+            if until is not None:
+                self.now = max(self.now, until)
+            return self.now
+
+    def start(self):
+        if not self.realtime:
+            raise RuntimeError("Only a real-time simulator runs on its own thread")
+        if self.thread is not None and self.thread.is_alive():
+            return
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run_realtime)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            self.wakeup.notify()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
+
+    def _process_until(self, until):
+        self.dispatching = True
+        try:
+            while self.events:
+                event = self.events[0]
+                if until is not None and event.time > until:
+                    break
+                heapq.heappop(self.events)
+                if event.cancelled:
+                    continue
+                self.now = event.time
+                self.events_processed += 1
+                event.callback(*event.args)
+        finally:
+            self.dispatching = False
+
+    def _wall_to_sim(self):
+        return (time.monotonic() - self.wall_start) * self.time_scale
+
+    def _run_realtime(self):
+        with self.lock:
+            self.wall_start = time.monotonic() - self.now / self.time_scale
+
+            while self.running:
+                target = self._wall_to_sim()
+                self._process_until(target)
+                self.now = max(self.now, target)
+
+                for callback in self.frame_callbacks:
+                    callback(self.now)
+
+                next_time = self.now + self.frame_interval
+                while self.events and self.events[0].cancelled:
+                    heapq.heappop(self.events)
+                if self.events:
+                    next_time = min(next_time, self.events[0].time)
+
+                self.wakeup.wait(max(next_time - self._wall_to_sim(), 0.0) / self.time_scale)
\ No newline at end of file
@@ -0,0 +1,316 @@
+import math
+import time
+from collections import deque
+
+from src.utils.assignment import solve_assignment
+
+
+class Task:
+    # stage moves pending -> (chained ->) to_pickup -> to_dropoff -> done, or ends as failed
+    __slots__ = ("id", "pickup", "dropoff", "stage", "robot_id", "submitted_at", "assigned_at", "completed_at",
+                 "attempts")
+
+    def __init__(self, task_id, pickup, dropoff=None, submitted_at=0.0):
+        self.id = task_id
+        self.pickup = pickup
+        self.dropoff = dropoff
+        self.stage = "pending"
+        self.robot_id = None
+        self.submitted_at = submitted_at
+        self.assigned_at = None
+        self.completed_at = None
+        self.attempts = 0
+
+    @property
+    def final_vertex(self):
+        return self.pickup if self.dropoff is None else self.dropoff
+
+
+class TaskDispatcher:
+    # Seconds of simulated time between batch assignments
+    DEFAULT_INTERVAL = 1.0
+    # Oldest pending tasks considered per round
+    DEFAULT_BATCH_SIZE = 128
+    # A task that cannot be started this many times (no route, full target vertex) is dropped
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, fleet_manager, interval=DEFAULT_INTERVAL, batch_size=DEFAULT_BATCH_SIZE, max_chain=1):
+        self.fleet_manager = fleet_manager
+        self.simulator = fleet_manager.simulator
+        self.nav_graph = fleet_manager.nav_graph
+        self.route_cache = fleet_manager.route_cache
+        self.interval = interval
+        self.batch_size = batch_size
+        # How many tasks a busy robot may have lined up behind the one it is working on
+        self.max_chain = max_chain
+        self.tasks = {}
+        self.pending = deque()
+        self.active = {}
+        self.chains = {}
+        self.tick_event = None
+        self.next_task_id = 1
+
+        self.submitted = 0
+        self.assigned = 0
+        self.chained = 0
+        self.completed = 0
+        self.failed = 0
+        self.rounds = 0
+        self.dispatch_time = 0.0
+        self.queue_latency_total = 0.0
+        self.queue_latency_max = 0.0
+        self.completion_latency_total = 0.0
+
+        fleet_manager.task_listeners.append(self.on_task_completed)
+        fleet_manager.stop_listeners.append(self.on_robot_stopped)
+        self.energy_manager = fleet_manager.energy_manager
+        if self.energy_manager is not None:
+            self.energy_manager.charge_listeners.append(self.on_robot_charged)
+
+    def submit(self, pickup, dropoff=None):
+        return self.submit_many([(pickup, dropoff)])[0]
+
+    def submit_many(self, orders):
+        # orders are (pickup, dropoff) vertex pairs; dropoff may be None for a plain "go to" task
+        with self.simulator.lock:
+            tasks = []
+            for pickup, dropoff in orders:
+                task = Task(self.next_task_id, pickup["id"], None if dropoff is None else dropoff["id"],
+                            self.simulator.now)
+                self.fleet_manager.record_event("order", -1, task.pickup, -1 if task.dropoff is None else task.dropoff)
+                self.next_task_id += 1
+                self.tasks[task.id] = task
+                self.pending.append(task)
+                tasks.append(task)
+            self.submitted += len(tasks)
+            self._schedule_tick()
+            return tasks
+
+    def _schedule_tick(self):
+        # Ticks only run while there is work queued, so a headless simulation still runs dry and ends
+        if self.tick_event is None and self.pending:
+            self.tick_event = self.simulator.schedule(self.interval, self.dispatch)
+
+    def dispatch(self):
+        with self.simulator.lock:
+            self.tick_event = None
+            started = time.perf_counter()
+            count, unreachable = self._dispatch_round()
+            self.dispatch_time += time.perf_counter() - started
+            self.rounds += 1
+            if count:
+                self.fleet_manager.log(f"Dispatched {count} tasks, {len(self.pending)} still pending", "dispatch")
+            # Tasks set aside as unreachable let the next round look further down the queue
+            if count or unreachable:
+                self._schedule_tick()
+            # Otherwise nothing can change until a robot finishes, stops or charges, and each of those re-arms the tick
+            return count
+
+    def _dispatch_round(self):
+        robots, origins, offsets = self._available_robots()
+        if not robots or not self.pending:
+            return 0, 0
+
+        # Looking at more tasks than robots gives the assignment room to pick, without starving old tasks
+        limit = min(self.batch_size, 2 * len(robots), len(self.pending))
+        batch = [self.pending[index] for index in range(limit)]
+        costs = self._cost_matrix(batch, origins, offsets)
+
+        assignments = [(batch[row], robots[column])
+                       for row, column in enumerate(solve_assignment(costs)) if column is not None]
+        # A pickup no available robot has a route to counts as a failed attempt and moves to the back of the
+        # queue, so it cannot hold the head of the queue and keep reachable tasks out of every batch
+        unreachable = [task for task, row in zip(batch, costs) if all(cost == math.inf for cost in row)]
+        if not assignments and not unreachable:
+            return 0, 0
+
+        taken = {task.id for task, _ in assignments}
+        taken.update(task.id for task in unreachable)
+        self.pending = deque(task for task in self.pending if task.id not in taken)
+        for task in unreachable:
+            task.attempts += 1
+            if task.attempts >= self.MAX_ATTEMPTS:
+                self._fail(task, "No path found")
+            else:
+                self.pending.append(task)
+        for task, robot in assignments:
+            if robot.id in self.active:
+                task.stage = "chained"
+                task.robot_id = robot.id
+                self.chains.setdefault(robot.id, deque()).append(task)
+                self.chained += 1
+                self._record_assignment(task)
+            else:
+                self._start(robot, task)
+        return len(assignments), len(unreachable)
+
+    def _available_robots(self):
+        # Idle robots start from where they stand; busy robots with room in their chain from where they will end
+        # Robots that are low, or would be by the time they got round to another task, are left to charge
+        energy_manager = self.energy_manager
+        robots = []
+        origins = []
+        offsets = []
+        for robot in self.fleet_manager.robots.values():
+            task = self.active.get(robot.id)
+            if task is None:
+                if robot.status in ("idle", "charging") and (energy_manager is None
+                                                             or not energy_manager.needs_charge(robot)):
+                    robots.append(robot)
+                    origins.append(robot.current_vertex["id"])
+                    offsets.append(0.0)
+            elif len(self.chains.get(robot.id, ())) < self.max_chain:
+                origin, offset = self._planned_end(robot, task)
+                if energy_manager is not None and energy_manager.needs_charge(robot, origin, offset):
+                    continue
+                robots.append(robot)
+                origins.append(origin)
+                offsets.append(offset)
+        return robots, origins, offsets
+
+    def _planned_end(self, robot, task):
+        route_cache = self.route_cache
+        offset = self.nav_graph.get_path_cost(robot.path[robot.path_index:])
+        position = robot.path[-1] if robot.path else robot.current_vertex["id"]
+        if task.stage == "to_pickup" and task.dropoff is not None:
+            offset += route_cache.get_cost(position, task.dropoff)
+            position = task.dropoff
+        for chained in self.chains.get(robot.id, ()):
+            offset += route_cache.get_cost(position, chained.pickup)
+            if chained.dropoff is not None:
+                offset += route_cache.get_cost(chained.pickup, chained.dropoff)
+            position = chained.final_vertex
+        return position, offset
+
+    def _cost_matrix(self, batch, origins, offsets):
+        route_cache = self.route_cache
+        pickups = [task.pickup for task in batch]
+        unique_pickups = list(dict.fromkeys(pickups))
+        unique_origins = list(dict.fromkeys(origins))
+
+        # Search from whichever side has fewer distinct vertices
+        distance = {}
+        if len(unique_pickups) <= len(unique_origins):
+            for pickup in unique_pickups:
+                for origin, cost in zip(unique_origins, route_cache.get_costs(pickup, unique_origins)):
+                    distance[origin, pickup] = cost
+        else:
+            for origin in unique_origins:
+                for pickup, cost in zip(unique_pickups, route_cache.get_costs(origin, unique_pickups)):
+                    distance[origin, pickup] = cost
+
+        return [[offset + distance[origin, pickup] for origin, offset in zip(origins, offsets)] for pickup in pickups]
+
+    def _record_assignment(self, task):
+        # Queue latency runs from submission to the first assignment; requeued tasks are not counted twice
+        if task.assigned_at is not None:
+            return
+        task.assigned_at = self.simulator.now
+        latency = task.assigned_at - task.submitted_at
+        self.assigned += 1
+        self.queue_latency_total += latency
+        self.queue_latency_max = max(self.queue_latency_max, latency)
+
+    def _start(self, robot, task):
+        task.robot_id = robot.id
+        self._record_assignment(task)
+        task.stage = "to_pickup"
+        self.active[robot.id] = task
+        self._drive(robot, task, task.pickup)
+
+    def _drive(self, robot, task, vertex_id):
+        success, message = self.fleet_manager.assign_task(robot, self.nav_graph.get_vertex_by_id(vertex_id))
+        if success:
+            return
+        # A robot that has already made the pickup keeps the task and finishes it once it has charged
+        if message == "Battery too low" and task.stage == "to_dropoff":
+            return
+        self._retry(robot, task, message)
+
+    def _retry(self, robot, task, reason):
+        if self.active.get(robot.id) is task:
+            del self.active[robot.id]
+        # Running low is the robot's problem, not the task's
+        if reason != "Battery too low":
+            task.attempts += 1
+        if task.stage == "to_dropoff" or task.attempts >= self.MAX_ATTEMPTS:
+            self._fail(task, reason)
+        else:
+            self._requeue(task)
+        # Anything lined up behind the task goes back to the queue; this robot may be badly placed for it
+        for chained in self.chains.pop(robot.id, ()):
+            self._requeue(chained)
+        self._schedule_tick()
+
+    def _requeue(self, task):
+        task.stage = "pending"
+        task.robot_id = None
+        self.pending.appendleft(task)
+
+    def _fail(self, task, reason):
+        task.stage = "failed"
+        self.failed += 1
+        self.fleet_manager.log(f"Task {task.id} failed: {reason}", "task_failed", task.robot_id, task.pickup)
+
+    def on_task_completed(self, robot):
+        task = self.active.get(robot.id)
+        if task is None:
+            self._schedule_tick()
+            return
+        # Some other trip, such as a run to a charger, ended first; a robot parked on a charger resumes once charged
+        leg_end = task.pickup if task.stage == "to_pickup" else task.final_vertex
+        if robot.current_vertex["id"] != leg_end:
+            if robot.status == "idle":
+                self._drive(robot, task, leg_end)
+            return
+
+        if task.stage == "to_pickup" and task.dropoff is not None:
+            task.stage = "to_dropoff"
+            self._drive(robot, task, task.dropoff)
+            return
+
+        task.stage = "done"
+        task.completed_at = self.simulator.now
+        self.completed += 1
+        self.completion_latency_total += task.completed_at - task.submitted_at
+        del self.active[robot.id]
+
+        # Chained tasks start straight away, so the robot never waits for the next round
+        chain = self.chains.get(robot.id)
+        if chain:
+            next_task = chain.popleft()
+            if not chain:
+                del self.chains[robot.id]
+            self._start(robot, next_task)
+        self._schedule_tick()
+
+    def on_robot_charged(self, robot):
+        task = self.active.get(robot.id)
+        if task is not None and task.stage == "to_dropoff" and robot.status in ("idle", "charging"):
+            self._drive(robot, task, task.dropoff)
+        self._schedule_tick()
+
+    def on_robot_stopped(self, robot):
+        task = self.active.get(robot.id)
+        if task is not None:
+            self._retry(robot, task, "robot stopped")
+        else:
+            self._schedule_tick()
+
+    def stats(self):
+        with self.simulator.lock:
+            return {
+                "submitted": self.submitted,
+                "pending": len(self.pending),
+                "in_progress": len(self.active),
+                "assigned": self.assigned,
+                "chained": self.chained,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rounds": self.rounds,
+                "dispatch_time": self.dispatch_time,
+                "assignments_per_second": self.assigned / self.dispatch_time if self.dispatch_time > 0 else 0.0,
+                "mean_queue_latency": self.queue_latency_total / self.assigned if self.assigned else 0.0,
+                "max_queue_latency": self.queue_latency_max,
+                "mean_completion_latency": self.completion_latency_total / self.completed if self.completed else 0.0
+            }
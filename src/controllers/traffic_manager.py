@@ -1,55 +1,443 @@
+import threading
+from collections import deque
+
+
+class LaneWaiter:
+    def __init__(self, robot, lane, lane_key, on_grant=None):
+        self.robot = robot
+        self.lane = lane
+        self.lane_key = lane_key
+        self.on_grant = on_grant
+        self.granted = False
+        self.event = threading.Event()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["event"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.event = threading.Event()
+        if self.granted:
+            self.event.set()
+
+
 class TrafficManager:
-    def __init__(self):
-        self.occupied_lanes = {}
-        self.lane_queue = {}
-    
+    def __init__(self, stripe_count=16):
+        self.stripe_count = stripe_count
+        self.stripe_locks = [threading.Lock() for _ in range(stripe_count)]
+        # Each stripe owns the reservations and queues for the lane keys hashed to it
+        self.stripe_lanes = [{} for _ in range(stripe_count)]
+        self.stripe_queues = [{} for _ in range(stripe_count)]
+        self.waiting = {}
+        # Wait-for graph: a queued robot points at the robot holding the lane it wants, or at a robot standing
+        # on the full vertex behind it. A robot only ever waits on one lane, so every node has at most one
+        # outgoing edge and a cycle check is a short walk
+        self.wait_lock = threading.Lock()
+        self.wait_for = {}
+        self.pending_cycles = []
+        self.deadlock_listeners = []
+        self.deadlocks_detected = 0
+        # Vertex occupancy for robots registered with place_robot: a lane is only granted together with a free
+        # slot on the vertex it leads to. Lock order is stripe lock, then wait_lock, then vertex_lock
+        self.vertex_lock = threading.Lock()
+        self.vertex_capacity = self._single_slot
+        self.vertex_occupants = {}
+        self.robot_vertex = {}
+        self.vertex_waiters = {}
+        self.freed_vertices = []
+        self.telemetry = None
+
+    def __getstate__(self):
+        # Locks are rebuilt on restore; telemetry belongs to the process, not to the checkpoint
+        state = self.__dict__.copy()
+        for name in ("stripe_locks", "wait_lock", "vertex_lock"):
+            del state[name]
+        state["telemetry"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.stripe_locks = [threading.Lock() for _ in range(self.stripe_count)]
+        self.wait_lock = threading.Lock()
+        self.vertex_lock = threading.Lock()
+
+    def _single_slot(self, vertex_id):
+        return 1
+
+    @property
+    def occupied_lanes(self):
+        return self.snapshot()
+
+    @property
+    def lane_queue(self):
+        queues = {}
+        for stripe in range(self.stripe_count):
+            with self.stripe_locks[stripe]:
+                for lane_key, queue in self.stripe_queues[stripe].items():
+                    queues[lane_key] = [waiter.robot for waiter in queue]
+        return queues
+
     def request_lane(self, robot, lane):
-        lane_id = self._get_lane_id(lane)
-        reverse_lane_id = self._get_lane_id((lane[1], lane[0]))
-        
-        if lane_id in self.occupied_lanes or reverse_lane_id in self.occupied_lanes:
-            self._add_to_queue(robot, lane_id)
+        lane_key = self.get_lane_key(lane)
+        stripe = self._stripe(lane_key)
+
+        with self.stripe_locks[stripe]:
+            granted = self._try_reserve(robot, lane, lane_key, stripe)
+        self._settle()
+        return granted
+
+    def acquire_lane(self, robot, lane, timeout=None):
+        lane_key = self.get_lane_key(lane)
+        stripe = self._stripe(lane_key)
+
+        with self.stripe_locks[stripe]:
+            if self.stripe_lanes[stripe].get(lane_key) == robot.id:
+                return True
+            granted = self._try_reserve(robot, lane, lane_key, stripe)
+            if not granted:
+                waiter = self._add_to_queue(robot, lane, lane_key, stripe)
+        self._settle()
+        if granted:
+            return True
+
+        if waiter.event.wait(timeout):
+            return waiter.granted
+        # A timed-out caller leaves the queue, so the lane is never handed to a robot that has stopped waiting;
+        # a grant that raced the timeout still counts
+        with self.stripe_locks[stripe]:
+            if not waiter.granted:
+                self._remove_waiter(waiter, stripe)
+        return waiter.granted
+
+    def request_lane_async(self, robot, lane, on_grant):
+        lane_key = self.get_lane_key(lane)
+        stripe = self._stripe(lane_key)
+
+        with self.stripe_locks[stripe]:
+            granted = self._try_reserve(robot, lane, lane_key, stripe)
+            if not granted:
+                waiter = self._add_to_queue(robot, lane, lane_key, stripe)
+                waiter.on_grant = on_grant
+        self._settle()
+        return granted
+
+    def release_lane(self, robot, lane):
+        lane_key = self.get_lane_key(lane)
+        stripe = self._stripe(lane_key)
+
+        with self.stripe_locks[stripe]:
+            lanes = self.stripe_lanes[stripe]
+            if lanes.get(lane_key) != robot.id:
+                return False
+            del lanes[lane_key]
+            waiter = self._process_queue(lane_key, stripe)
+
+        # Grant callbacks run outside the stripe lock so they are free to take other locks
+        self._notify_grant(waiter)
+        self._settle()
+        return True
+
+    def cancel_requests(self, robot):
+        waiter = self.waiting.get(robot.id)
+        if waiter is None:
+            return
+
+        stripe = self._stripe(waiter.lane_key)
+        with self.stripe_locks[stripe]:
+            if not waiter.granted:
+                self._remove_waiter(waiter, stripe)
+        waiter.event.set()
+
+    def place_robot(self, robot, vertex_id):
+        # Registers a robot standing on a vertex; False when the vertex has no free slot
+        with self.vertex_lock:
+            current = self.robot_vertex.get(robot.id)
+            if current == vertex_id:
+                return True
+            occupants = self.vertex_occupants.get(vertex_id)
+            if occupants is not None and len(occupants) >= self.vertex_capacity(vertex_id):
+                return False
+            self._move_occupant(robot.id, current, vertex_id)
+        self._settle()
+        return True
+
+    def remove_robot(self, robot):
+        # Frees the vertex slot of a robot leaving the fleet
+        with self.vertex_lock:
+            vertex_id = self.robot_vertex.pop(robot.id, None)
+            if vertex_id is not None:
+                occupants = self.vertex_occupants[vertex_id]
+                occupants.discard(robot.id)
+                if not occupants:
+                    del self.vertex_occupants[vertex_id]
+                self.freed_vertices.append(vertex_id)
+        self._settle()
+
+    def has_vertex_space(self, vertex_id):
+        occupants = self.vertex_occupants.get(vertex_id)
+        return occupants is None or len(occupants) < self.vertex_capacity(vertex_id)
+
+    def get_vertex_occupants(self, vertex_id):
+        with self.vertex_lock:
+            return frozenset(self.vertex_occupants.get(vertex_id, ()))
+
+    def get_robot_vertex(self, robot):
+        return self.robot_vertex.get(robot.id)
+
+    def get_vertex_waiters(self, vertex_id):
+        with self.vertex_lock:
+            return [waiter.robot for waiter in self.vertex_waiters.get(vertex_id, ())]
+
+    def get_full_vertices(self):
+        with self.vertex_lock:
+            return [vertex_id for vertex_id, occupants in self.vertex_occupants.items()
+                    if len(occupants) >= self.vertex_capacity(vertex_id)]
+
+    def snapshot(self):
+        # Taking every stripe in index order gives a consistent view without deadlocking writers
+        for lock in self.stripe_locks:
+            lock.acquire()
+        try:
+            occupied = {}
+            for lanes in self.stripe_lanes:
+                occupied.update(lanes)
+            return occupied
+        finally:
+            for lock in reversed(self.stripe_locks):
+                lock.release()
+
+    def get_lane_key(self, lane):
+        start_id, end_id = lane
+        return (start_id, end_id) if start_id <= end_id else (end_id, start_id)
+
+    def _stripe(self, lane_key):
+        return hash(lane_key) % self.stripe_count
+
+    def _try_reserve(self, robot, lane, lane_key, stripe):
+        lanes = self.stripe_lanes[stripe]
+        if lane_key in lanes:
             return False
-            
-        self.occupied_lanes[lane_id] = robot.id
+
+        # Do not overtake robots already queued for this lane in the same direction. A free lane can only have
+        # a queue when its waiters are held up by a full vertex, so robots heading the other way may pass
+        queue = self.stripe_queues[stripe].get(lane_key)
+        if queue and any(waiter.lane[1] == lane[1] for waiter in queue):
+            return False
+
+        if not self._claim_vertex(robot, lane[1]):
+            return False
+        lanes[lane_key] = robot.id
         return True
-    
-    def release_lane(self, robot, lane):
-        lane_id = self._get_lane_id(lane)
-        
-        if lane_id in self.occupied_lanes and self.occupied_lanes[lane_id] == robot.id:
-            del self.occupied_lanes[lane_id]
-            self._process_queue(lane_id)
+
+    def _claim_vertex(self, robot, vertex_id):
+        # Moves a placed robot's slot onto the vertex at the far end of the lane it is about to enter
+        if robot.id not in self.robot_vertex:
+            return True
+        with self.vertex_lock:
+            current = self.robot_vertex.get(robot.id)
+            if current is None or current == vertex_id:
+                return True
+            occupants = self.vertex_occupants.get(vertex_id)
+            if occupants is not None and len(occupants) >= self.vertex_capacity(vertex_id):
+                return False
+            self._move_occupant(robot.id, current, vertex_id)
             return True
-        
-        return False
-    
-    def _get_lane_id(self, lane):
-        return f"{lane[0]}-{lane[1]}"
-    
-    def _add_to_queue(self, robot, lane_id):
-        if lane_id not in self.lane_queue:
-            self.lane_queue[lane_id] = []
-        
-        if robot.id not in [r.id for r in self.lane_queue[lane_id]]:
-            self.lane_queue[lane_id].append(robot)
-    
-    def _process_queue(self, lane_id):
-        if lane_id in self.lane_queue and self.lane_queue[lane_id]:
-            next_robot = self.lane_queue[lane_id].pop(0)
-            lane = tuple(map(int, lane_id.split('-')))
-            self.request_lane(next_robot, lane)
-    
+
+    def _move_occupant(self, robot_id, from_id, to_id):
+        if from_id is not None:
+            occupants = self.vertex_occupants[from_id]
+            occupants.discard(robot_id)
+            if not occupants:
+                del self.vertex_occupants[from_id]
+            self.freed_vertices.append(from_id)
+        self.vertex_occupants.setdefault(to_id, set()).add(robot_id)
+        self.robot_vertex[robot_id] = to_id
+
+    def _settle(self):
+        # Work deferred until every lock is released: wake robots held up by vertices that just freed a slot,
+        # then tell listeners about any wait-for cycles
+        while self.freed_vertices:
+            with self.vertex_lock:
+                if not self.freed_vertices:
+                    break
+                vertex_id = self.freed_vertices.pop()
+            self._retry_vertex_waiters(vertex_id)
+        self._report_deadlocks()
+
+    def _retry_vertex_waiters(self, vertex_id):
+        with self.vertex_lock:
+            waiters = list(self.vertex_waiters.get(vertex_id, ()))
+
+        for waiter in waiters:
+            stripe = self._stripe(waiter.lane_key)
+            with self.stripe_locks[stripe]:
+                if waiter.granted or self.waiting.get(waiter.robot.id) is not waiter:
+                    continue
+                # Robots still behind a lane holder are handed the lane by release_lane instead
+                if waiter.lane_key in self.stripe_lanes[stripe]:
+                    continue
+                if not self._claim_vertex(waiter.robot, vertex_id):
+                    # Full again; the rest of the waiters now wait on whoever took the slot
+                    self._update_wait_edge(waiter, stripe)
+                    continue
+                self._grant(waiter, stripe)
+            self._notify_grant(waiter)
+
+    def _notify_grant(self, waiter):
+        if waiter is not None and waiter.on_grant is not None:
+            waiter.on_grant(waiter.lane)
+
+    def _add_to_queue(self, robot, lane, lane_key, stripe):
+        queues = self.stripe_queues[stripe]
+        if lane_key not in queues:
+            queues[lane_key] = deque()
+
+        for waiter in queues[lane_key]:
+            if waiter.robot.id == robot.id:
+                return waiter
+
+        waiter = LaneWaiter(robot, lane, lane_key)
+        queues[lane_key].append(waiter)
+        telemetry = self.telemetry
+        if telemetry is not None and telemetry.enabled:
+            depth = len(queues[lane_key])
+            telemetry.lane_queue_depth.observe(depth)
+            telemetry.max_lane_queue.set_max(depth)
+        self.waiting[robot.id] = waiter
+        if robot.id in self.robot_vertex:
+            with self.vertex_lock:
+                self.vertex_waiters.setdefault(lane[1], []).append(waiter)
+
+        self._update_wait_edge(waiter, stripe)
+        return waiter
+
+    def _update_wait_edge(self, waiter, stripe):
+        robot_id = waiter.robot.id
+        with self.wait_lock:
+            blocker = self.stripe_lanes[stripe].get(waiter.lane_key)
+            if blocker is None:
+                blocker = self._vertex_blocker(waiter.lane[1])
+            if robot_id in self.wait_for and self.wait_for[robot_id] == blocker:
+                return
+            self.wait_for[robot_id] = blocker
+            cycle = self._find_cycle(robot_id)
+            if cycle is not None:
+                self.pending_cycles.append(cycle)
+
+    def _vertex_blocker(self, vertex_id):
+        # Any occupant of a full vertex blocks us; prefer one that is itself waiting so cycles through it show up
+        with self.vertex_lock:
+            occupants = sorted(self.vertex_occupants.get(vertex_id, ()))
+        for occupant in occupants:
+            if self.wait_for.get(occupant) is not None:
+                return occupant
+        return occupants[0] if occupants else None
+
+    def _find_cycle(self, robot_id):
+        # Only the new edge can close a cycle, so walk forward from it until the chain ends or comes back
+        cycle = [robot_id]
+        node = self.wait_for.get(robot_id)
+        while node is not None and len(cycle) <= len(self.wait_for):
+            if node == robot_id:
+                return cycle
+            cycle.append(node)
+            node = self.wait_for.get(node)
+        return None
+
+    def _report_deadlocks(self):
+        # Listeners run outside every lock; they get the robots in wait order, starting with the new waiter
+        if not self.pending_cycles:
+            return
+        with self.wait_lock:
+            cycles, self.pending_cycles = self.pending_cycles, []
+            self.deadlocks_detected += len(cycles)
+
+        for cycle in cycles:
+            robots = []
+            for robot_id in cycle:
+                waiter = self.waiting.get(robot_id)
+                if waiter is None:
+                    break
+                robots.append(waiter.robot)
+            else:
+                for listener in self.deadlock_listeners:
+                    listener(robots)
+
+    def get_wait_for(self, robot):
+        with self.wait_lock:
+            return self.wait_for.get(robot.id)
+
+    def _remove_waiter(self, waiter, stripe):
+        queues = self.stripe_queues[stripe]
+        queue = queues.get(waiter.lane_key)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+        if queue is not None and not queue:
+            del queues[waiter.lane_key]
+        if self.waiting.get(waiter.robot.id) is waiter:
+            del self.waiting[waiter.robot.id]
+            with self.wait_lock:
+                self.wait_for.pop(waiter.robot.id, None)
+        self._drop_vertex_waiter(waiter)
+
+    def _drop_vertex_waiter(self, waiter):
+        if waiter.robot.id not in self.robot_vertex:
+            return
+        with self.vertex_lock:
+            waiters = self.vertex_waiters.get(waiter.lane[1])
+            if waiters and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self.vertex_waiters[waiter.lane[1]]
+
+    def _process_queue(self, lane_key, stripe):
+        queue = self.stripe_queues[stripe].get(lane_key)
+        if not queue:
+            return None
+
+        # Hand the lane straight to the first robot in FIFO order with room at the far end, so nobody can grab
+        # it in between
+        for waiter in queue:
+            if self._claim_vertex(waiter.robot, waiter.lane[1]):
+                self._grant(waiter, stripe)
+                return waiter
+
+        # Everyone is held up by a full vertex now rather than by the lane
+        for waiter in queue:
+            self._update_wait_edge(waiter, stripe)
+        return None
+
+    def _grant(self, waiter, stripe):
+        queues = self.stripe_queues[stripe]
+        queue = queues[waiter.lane_key]
+        queue.remove(waiter)
+        if not queue:
+            del queues[waiter.lane_key]
+        if self.waiting.get(waiter.robot.id) is waiter:
+            del self.waiting[waiter.robot.id]
+        self._drop_vertex_waiter(waiter)
+
+        self.stripe_lanes[stripe][waiter.lane_key] = waiter.robot.id
+        waiter.granted = True
+        waiter.event.set()
+
+        # Everyone still queued now waits on the new holder, who is not waiting for anything
+        with self.wait_lock:
+            self.wait_for.pop(waiter.robot.id, None)
+            for queued in queue:
+                self.wait_for[queued.robot.id] = waiter.robot.id
+
     def is_lane_occupied(self, lane):
-        lane_id = self._get_lane_id(lane)
-        reverse_lane_id = self._get_lane_id((lane[1], lane[0]))
-        
-        return lane_id in self.occupied_lanes or reverse_lane_id in self.occupied_lanes
-    
+        lane_key = self.get_lane_key(lane)
+        return lane_key in self.stripe_lanes[self._stripe(lane_key)]
+
+    def get_lane_holder(self, lane):
+        lane_key = self.get_lane_key(lane)
+        return self.stripe_lanes[self._stripe(lane_key)].get(lane_key)
+
     def get_queue_length(self, lane):
-        lane_id = self._get_lane_id(lane)
-        
-        if lane_id in self.lane_queue:
-            return len(self.lane_queue[lane_id])
-        
-        return 0
\ No newline at end of file
+        lane_key = self.get_lane_key(lane)
+        queue = self.stripe_queues[self._stripe(lane_key)].get(lane_key)
+        return len(queue) if queue else 0
\ No newline at end of file
@@ -0,0 +1,148 @@
+from collections import deque
+
+from src.controllers.fleet_manager import FleetManager
+from src.controllers.simulator import Simulator
+from src.controllers.traffic_manager import TrafficManager
+from src.models.nav_graph import NavGraph
+from src.utils.graph_partition import lane_owner
+
+
+class ZoneWorker:
+    # Simulates the robots standing in or travelling through one zone of a partitioned graph. Every worker holds
+    # the whole graph for routing, but its traffic manager only ever reserves the lanes its zone owns
+    def __init__(self, zone_id, nav_graph, zones, log_file=None, structured_logs=False, deadlock_policy="replan"):
+        self.zone_id = zone_id
+        self.nav_graph = nav_graph
+        self.zones = zones
+        self.simulator = Simulator(realtime=False)
+        self.fleet_manager = FleetManager(nav_graph, TrafficManager(), self.simulator, log_file=log_file,
+                                          structured_logs=structured_logs, deadlock_policy=deadlock_policy)
+        self.fleet_manager.zone = self
+        self.fleet_manager.task_listeners.append(self.on_task_completed)
+        self.fleet_manager.stop_listeners.append(self.on_robot_stopped)
+
+        # Scripted (time, target id) tasks per robot; they travel with the robot when it changes zone
+        self.backlogs = {}
+        self.wakeups = {}
+        self.outbox = []
+        self.tasks_rejected = 0
+        self.last_completion = 0.0
+        self.handoffs_sent = 0
+        self.handoffs_received = 0
+
+    def owns_lane(self, lane):
+        return lane_owner(self.zones, lane[0], lane[1]) == self.zone_id
+
+    def add_robot(self, robot_id, vertex_id, backlog=()):
+        robot = self.fleet_manager.spawn_robot(self.nav_graph.get_vertex_by_id(vertex_id), robot_id)
+        self.backlogs[robot_id] = deque(backlog)
+        self.simulator.schedule(0, self.dispatch, robot)
+        return robot
+
+    def hand_off(self, robot):
+        # Called from Robot.start_movement at a vertex, before the robot asks for a lane, so it holds nothing
+        lane = (robot.path[robot.path_index], robot.path[robot.path_index + 1])
+        owner = lane_owner(self.zones, lane[0], lane[1])
+        wakeup = self.wakeups.pop(robot.id, None)
+        self.simulator.cancel(wakeup)
+        state = {
+            "robot": robot.id,
+            "vertex": robot.current_vertex["id"],
+            "target": robot.target_vertex["id"] if robot.target_vertex is not None else None,
+            "path": robot.path[robot.path_index:],
+            "time": self.simulator.now,
+            "wait_started": robot.wait_started,
+            "wait_time": robot.wait_time,
+            "tasks_completed": robot.tasks_completed,
+            "backlog": list(self.backlogs.pop(robot.id, ()))
+        }
+        self.fleet_manager.log(f"Robot {robot.id} handed off to zone {owner} at {robot.current_vertex['name']}",
+                               "handoff", robot.id, state["vertex"], lane)
+        self.fleet_manager.remove_robot(robot)
+        self.outbox.append((owner, state))
+        self.handoffs_sent += 1
+
+    def receive(self, state):
+        robot = self.fleet_manager.spawn_robot(self.nav_graph.get_vertex_by_id(state["vertex"]), state["robot"])
+        robot.wait_time = state["wait_time"]
+        robot.tasks_completed = state["tasks_completed"]
+        self.backlogs[robot.id] = deque(state["backlog"])
+        self.handoffs_received += 1
+        # Time spent in transit between workers counts as waiting at the boundary vertex
+        robot.wait_started = state["wait_started"] if state["wait_started"] is not None else state["time"]
+        robot.assign_task(self.nav_graph.get_vertex_by_id(state["target"]), state["path"])
+
+    def on_task_completed(self, robot):
+        self.last_completion = self.simulator.now
+        self.simulator.schedule(0, self.dispatch, robot)
+
+    def on_robot_stopped(self, robot):
+        self.simulator.schedule(0, self.dispatch, robot)
+
+    def dispatch(self, robot):
+        # The robot may have left the zone while this was queued
+        if self.fleet_manager.robots.get(robot.id) is not robot:
+            return
+        self.wakeups.pop(robot.id, None)
+        queue = self.backlogs.get(robot.id)
+        while queue and robot.status not in ("moving", "waiting"):
+            submit_time, target_id = queue[0]
+            if submit_time > self.simulator.now:
+                self.wakeups[robot.id] = self.simulator.schedule_at(submit_time, self.dispatch, robot)
+                return
+            queue.popleft()
+            success, _ = self.fleet_manager.assign_task(robot, self.nav_graph.get_vertex_by_id(target_id))
+            if not success:
+                self.tasks_rejected += 1
+
+    def advance(self, until, handoffs=()):
+        # One synchronisation window: take in the robots handed over, run to the window's end and return the
+        # robots leaving, plus the time of the next local event so idle stretches can be skipped
+        with self.simulator.lock:
+            for state in handoffs:
+                self.receive(state)
+            self.simulator.run(until)
+            outbox, self.outbox = self.outbox, []
+        return outbox, self.simulator.next_time()
+
+    def report(self):
+        return {
+            "robots": {robot.id: (robot.total_wait(self.simulator.now), robot.tasks_completed)
+                       for robot in self.fleet_manager.robots.values()},
+            "lane_busy_time": dict(self.fleet_manager.lane_busy_time),
+            "tasks_rejected": self.tasks_rejected,
+            "last_completion": self.last_completion,
+            "deadlocks": self.fleet_manager.deadlocks_resolved,
+            "deadlocks_detected": self.fleet_manager.deadlocks_detected,
+            "events_processed": self.simulator.events_processed,
+            "handoffs_sent": self.handoffs_sent,
+            "handoffs_received": self.handoffs_received
+        }
+
+    def close(self):
+        self.fleet_manager.close()
+
+
+def load_graph(graph_source):
+    # A filename is opened in the worker itself, so binary graphs are memory-mapped and shared between processes
+    if isinstance(graph_source, str):
+        return NavGraph.from_file(graph_source)
+    return NavGraph(graph_source)
+
+
+def run_zone_worker(connection, zone_id, graph_source, zones, robots, log_file, structured_logs, deadlock_policy):
+    worker = ZoneWorker(zone_id, load_graph(graph_source), zones, log_file, structured_logs, deadlock_policy)
+    try:
+        for robot_id, vertex_id, backlog in robots:
+            worker.add_robot(robot_id, vertex_id, backlog)
+        while True:
+            command, *args = connection.recv()
+            if command == "advance":
+                connection.send(worker.advance(*args))
+            elif command == "report":
+                connection.send(worker.report())
+            elif command == "stop":
+                break
+    finally:
+        worker.close()
+        connection.close()
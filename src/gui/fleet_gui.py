@@ -1,9 +1,20 @@
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import messagebox, simpledialog
 import json
 import math
+import time
 
 class FleetGUI:
+    # Level of detail, chosen from how many pixels a typical lane spans
+    LOD_MERGED = 0
+    LOD_SIMPLE = 1
+    LOD_FULL = 2
+    FULL_DETAIL_PIXELS = 40
+    SIMPLE_DETAIL_PIXELS = 8
+    MERGE_CELL_PIXELS = 10
+    # Seconds between re-reading lane waits for the congestion overlay
+    CONGESTION_REFRESH = 1.0
+    
     def __init__(self, root, fleet_manager, nav_graph):
         self.root = root
         self.fleet_manager = fleet_manager
@@ -17,11 +28,30 @@ class FleetGUI:
         self.canvas_offset_x = 0
         self.canvas_offset_y = 0
         self.scale_factor = 1.0
+        self.pan_anchor = None
+        
+        # Retained canvas items, keyed by lane key / vertex id / robot id
+        self.lane_items = {}
+        self.merged_lanes = {}
+        self.vertex_items = {}
+        self.robot_items = {}
+        self.robot_drawn = {}
+        self.drawn_occupied = set()
+        self.drawn_lod = None
+        self.drawn_version = None
+        self.drawn_selection = None
+        self.status_content = None
+        self.graph_version = None
+        self.transform_dirty = True
+        self.show_congestion = False
+        self.congestion = {}
+        self.congestion_read_at = 0.0
+        self.edit_mode = False
         
         self.setup_ui()
         self.setup_bindings()
         
-        self.update_interval = 50
+        self.update_interval = 16
         self.update_display()
     
     def setup_ui(self):
@@ -68,23 +98,33 @@ class FleetGUI:
         self.stop_btn = tk.Button(self.button_frame, text="Stop All Robots", command=self.fleet_manager.stop_all_robots)
         self.stop_btn.pack(fill=tk.X, pady=2)
         
+        # The heatmap reads lane waits from telemetry, so it is only offered when telemetry is on
+        self.congestion_btn = tk.Button(self.button_frame, text="Show Congestion", command=self.toggle_congestion,
+                                        state=tk.NORMAL if self.fleet_manager.telemetry is not None else tk.DISABLED)
+        self.congestion_btn.pack(fill=tk.X, pady=2)
+        
+        # In edit mode a click closes or reopens the vertex or lane under the cursor; right-click sets a lane's cost
+        self.edit_btn = tk.Button(self.button_frame, text="Edit Map", command=self.toggle_edit_mode)
+        self.edit_btn.pack(fill=tk.X, pady=2)
+        
         # Calculate the initial scaling and offset
         self.calculate_transform()
     
     def setup_bindings(self):
         self.canvas.bind("<Button-1>", self.on_canvas_click)
+        self.canvas.bind("<Button-3>", self.on_canvas_right_click)
         self.canvas.bind("<MouseWheel>", self.on_mousewheel)  # Windows
         self.canvas.bind("<Button-4>", self.on_mousewheel)    # Linux scroll up
         self.canvas.bind("<Button-5>", self.on_mousewheel)    # Linux scroll down
         self.canvas.bind("<ButtonPress-2>", self.start_pan)
         self.canvas.bind("<B2-Motion>", self.pan)
+        self.canvas.bind("<Configure>", self.on_canvas_resize)
         
     def calculate_transform(self):
         # Find bounds of the graph
-        min_x = min(v["x"] for v in self.nav_graph.vertices)
-        max_x = max(v["x"] for v in self.nav_graph.vertices)
-        min_y = min(v["y"] for v in self.nav_graph.vertices)
-        max_y = max(v["y"] for v in self.nav_graph.vertices)
+        vertex_store = self.nav_graph.vertex_store
+        min_x, max_x = min(vertex_store.xs), max(vertex_store.xs)
+        min_y, max_y = min(vertex_store.ys), max(vertex_store.ys)
         
         # Add padding
         padding = 50
@@ -113,6 +153,10 @@ class FleetGUI:
     def on_canvas_click(self, event):
         world_x, world_y = self.canvas_to_world(event.x, event.y)
         
+        if self.edit_mode:
+            self.edit_at(world_x, world_y)
+            return
+        
         # Check if clicked on a robot
         robot = self.fleet_manager.get_robot_at_position(world_x, world_y)
         if robot:
@@ -129,6 +173,54 @@ class FleetGUI:
             else:
                 self.spawn_robot(vertex)
     
+    def toggle_edit_mode(self):
+        self.edit_mode = not self.edit_mode
+        self.edit_btn.config(text="Done Editing" if self.edit_mode else "Edit Map")
+        if self.edit_mode:
+            self.update_status("Click a vertex or lane to block or unblock it; right-click a lane to set its cost")
+        else:
+            self.update_status("Map editing finished")
+    
+    def pick_tolerance(self):
+        # A few pixels around the cursor, whatever the zoom
+        return 6 / self.scale_factor
+    
+    def edit_at(self, world_x, world_y):
+        vertex = self.nav_graph.get_vertex_by_position(world_x, world_y, self.pick_tolerance())
+        if vertex:
+            if self.nav_graph.is_vertex_blocked(vertex["id"]):
+                self.fleet_manager.unblock_vertex(vertex["id"])
+                self.update_status(f"Vertex {vertex['name']} unblocked")
+            else:
+                self.fleet_manager.block_vertex(vertex["id"])
+                self.update_status(f"Vertex {vertex['name']} blocked")
+            return
+        
+        lane_key = self.nav_graph.get_lane_by_position(world_x, world_y, self.pick_tolerance())
+        if lane_key is None:
+            return
+        name = self.fleet_manager.lane_name(*lane_key)
+        if self.nav_graph.is_lane_blocked(*lane_key):
+            self.fleet_manager.unblock_lane(*lane_key)
+            self.update_status(f"Lane {name} unblocked")
+        else:
+            self.fleet_manager.block_lane(*lane_key)
+            self.update_status(f"Lane {name} blocked")
+    
+    def on_canvas_right_click(self, event):
+        if not self.edit_mode:
+            return
+        world_x, world_y = self.canvas_to_world(event.x, event.y)
+        lane_key = self.nav_graph.get_lane_by_position(world_x, world_y, self.pick_tolerance())
+        if lane_key is None:
+            return
+        name = self.fleet_manager.lane_name(*lane_key)
+        cost = simpledialog.askfloat("Lane Cost", f"Traversal cost of lane {name}:", parent=self.root,
+                                     initialvalue=self.nav_graph.get_lane_cost(*lane_key), minvalue=0.0)
+        if cost is not None:
+            self.fleet_manager.set_lane_cost(lane_key[0], lane_key[1], cost)
+            self.update_status(f"Lane {name} now costs {cost:g}")
+    
     def on_mousewheel(self, event):
         # Zoom in/out centered on mouse position
         world_x, world_y = self.canvas_to_world(event.x, event.y)
@@ -141,20 +233,35 @@ class FleetGUI:
         
         # Adjust offsets to zoom centered on mouse position
         new_world_x, new_world_y = self.canvas_to_world(event.x, event.y)
-        self.canvas_offset_x += (world_x - new_world_x)
-        self.canvas_offset_y += (world_y - new_world_y)
+        self.canvas_offset_x += (new_world_x - world_x)
+        self.canvas_offset_y += (new_world_y - world_y)
+        self.transform_dirty = True
+    
+    def on_canvas_resize(self, event):
+        # Culling works from the stored size, so a bigger window must widen it or the new area stays empty
+        if (event.width, event.height) == (self.canvas_width, self.canvas_height):
+            return
+        self.canvas_width = event.width
+        self.canvas_height = event.height
+        self.transform_dirty = True
     
     def start_pan(self, event):
-        self.canvas.scan_mark(event.x, event.y)
+        self.pan_anchor = (event.x, event.y)
     
     def pan(self, event):
-        self.canvas.scan_dragto(event.x, event.y, gain=1)
-        # Update the offsets based on the canvas scrolling
-        self.canvas_offset_x -= (self.canvas.canvasx(0) - self.canvas_width/2) / self.scale_factor
-        self.canvas_offset_y -= (self.canvas.canvasy(0) - self.canvas_height/2) / self.scale_factor
+        if self.pan_anchor is None:
+            self.pan_anchor = (event.x, event.y)
+        # Shift the world under the cursor by the distance dragged
+        self.canvas_offset_x += (event.x - self.pan_anchor[0]) / self.scale_factor
+        self.canvas_offset_y += (event.y - self.pan_anchor[1]) / self.scale_factor
+        self.pan_anchor = (event.x, event.y)
+        self.transform_dirty = True
     
     def spawn_robot(self, vertex):
         robot = self.fleet_manager.spawn_robot(vertex)
+        if robot is None:
+            self.update_status(f"Vertex {vertex['name']} is full")
+            return
         self.update_status(f"Spawned Robot {robot.id} at {vertex['name']}")
     
     def spawn_robot_ui(self):
@@ -166,82 +273,326 @@ class FleetGUI:
     
     def update_status(self, message):
         self.status_bar.config(text=message)
-        
-        # Update status text
-        self.status_text.delete(1.0, tk.END)
+        self.refresh_status_text(self.fleet_manager.snapshot)
+    
+    def refresh_status_text(self, snapshot):
+        vertex_index = self.nav_graph.vertex_index
+        show_battery = self.fleet_manager.energy_manager is not None
+        lines = []
         
         # Add robots status
-        for robot_id, robot in self.fleet_manager.robots.items():
-            status = robot.status
-            location = robot.current_vertex["name"] if robot.current_vertex else "Unknown"
+        for idx, robot_id in enumerate(snapshot.robot_ids):
+            status = snapshot.status(idx)
+            current_id = snapshot.current_vertices[idx]
+            target_id = snapshot.target_vertices[idx]
+            location = vertex_index[current_id]["name"] if current_id in vertex_index else "Unknown"
+            battery = f"Battery: {snapshot.batteries[idx]:.0f}%\n" if show_battery else ""
             
-            if robot.target_vertex:
-                destination = robot.target_vertex["name"]
-                self.status_text.insert(tk.END, f"Robot {robot_id}: {status}\nAt: {location}\nTo: {destination}\n\n")
+            if target_id in vertex_index:
+                destination = vertex_index[target_id]["name"]
+                lines.append(f"Robot {robot_id}: {status}\nAt: {location}\nTo: {destination}\n{battery}\n")
             else:
-                self.status_text.insert(tk.END, f"Robot {robot_id}: {status}\nAt: {location}\n\n")
+                lines.append(f"Robot {robot_id}: {status}\nAt: {location}\n{battery}\n")
+        
+        # Positions change every frame but the panel text rarely does
+        content = "".join(lines)
+        if content == self.status_content:
+            return
+        self.status_content = content
+        self.status_text.delete(1.0, tk.END)
+        self.status_text.insert(tk.END, content)
     
-    def update_display(self):
+    def current_lod(self):
+        pixels = self.nav_graph.get_mean_lane_length() * self.scale_factor
+        if pixels >= self.FULL_DETAIL_PIXELS:
+            return self.LOD_FULL
+        if pixels >= self.SIMPLE_DETAIL_PIXELS:
+            return self.LOD_SIMPLE
+        return self.LOD_MERGED
+    
+    def visible_world_box(self, margin=30):
+        min_x, min_y = self.canvas_to_world(-margin, -margin)
+        max_x, max_y = self.canvas_to_world(self.canvas_width + margin, self.canvas_height + margin)
+        return min_x, min_y, max_x, max_y
+    
+    def clear_layer(self):
         self.canvas.delete("all")
+        self.lane_items = {}
+        self.merged_lanes = {}
+        self.vertex_items = {}
+        self.robot_items = {}
+        self.robot_drawn = {}
+        self.drawn_occupied = set()
+    
+    def build_static_layer(self):
+        self.clear_layer()
+        self.drawn_lod = None
+        self.graph_version = self.nav_graph.version
+        self.transform_dirty = True
+    
+    def place_static_layer(self):
+        lod = self.current_lod()
+        if lod != self.drawn_lod:
+            self.clear_layer()
+            self.drawn_lod = lod
+        
+        box = self.visible_world_box()
+        if lod == self.LOD_MERGED:
+            self.place_merged_layer(box)
+        else:
+            self.place_detailed_layer(box, lod)
+        
+        # Lanes at the bottom, robots on top
+        self.canvas.tag_lower("lane")
+        self.canvas.tag_raise("robot")
+        
+        # Robots need new canvas coordinates too
+        self.robot_drawn = {}
+        self.transform_dirty = False
+    
+    def lane_color(self, lane_keys):
+        if any(key in self.drawn_occupied for key in lane_keys):
+            return "red"
+        if any(not self.nav_graph.is_lane_open(*key) for key in lane_keys):
+            return "black"
+        if self.show_congestion:
+            level = max((self.congestion.get(key, 0.0) for key in lane_keys), default=0.0)
+            if level > 0:
+                return self.heat_color(level)
+        return "gray"
+    
+    @staticmethod
+    def heat_color(level):
+        # Gray for idle lanes through orange to deep purple for the most waited-on one, kept clear of the
+        # red used for reserved lanes
+        if level < 0.5:
+            t = level * 2
+            red, green, blue = 190 + 65 * t, 190 - 50 * t, 190 - 190 * t
+        else:
+            t = (level - 0.5) * 2
+            red, green, blue = 255 - 135 * t, 140 - 140 * t, 120 * t
+        return f"#{int(red):02x}{int(green):02x}{int(blue):02x}"
+    
+    def toggle_congestion(self):
+        self.show_congestion = not self.show_congestion
+        self.congestion_btn.config(text="Hide Congestion" if self.show_congestion else "Show Congestion")
+        self.refresh_congestion()
+    
+    def refresh_congestion(self):
+        telemetry = self.fleet_manager.telemetry
+        self.congestion = telemetry.lane_congestion() if self.show_congestion and telemetry is not None else {}
+        self.congestion_read_at = time.monotonic()
+        for item, lane_keys in self.merged_lanes.items():
+            self.canvas.itemconfig(item, fill=self.lane_color(lane_keys))
+        for lane_key, item in self.lane_items.items():
+            if item not in self.merged_lanes:
+                self.canvas.itemconfig(item, fill=self.lane_color((lane_key,)))
+    
+    def place_detailed_layer(self, box, lod):
+        vertex_index = self.nav_graph.vertex_index
+        xs, ys = self.nav_graph.vertex_store.xs, self.nav_graph.vertex_store.ys
+        visible_lanes = set(self.nav_graph.get_lanes_in_box(*box))
+        visible_vertices = set(self.nav_graph.spatial_index.query_box(*box))
+        
+        # Drop items that scrolled out of view
+        for lane_key in [key for key in self.lane_items if key not in visible_lanes]:
+            self.canvas.delete(self.lane_items.pop(lane_key))
+        for vertex_id in [vid for vid in self.vertex_items if vid not in visible_vertices]:
+            for item in self.vertex_items.pop(vertex_id):
+                self.canvas.delete(item)
         
         # Draw lanes
-        for lane in self.nav_graph.lanes:
-            start = self.nav_graph.get_vertex_by_id(lane["start"])
-            end = self.nav_graph.get_vertex_by_id(lane["end"])
-            
-            start_x, start_y = self.world_to_canvas(start["x"], start["y"])
-            end_x, end_y = self.world_to_canvas(end["x"], end["y"])
-            
-            # Check if lane is occupied
-            lane_id = f"{lane['start']}-{lane['end']}"
-            reverse_id = f"{lane['end']}-{lane['start']}"
-            
-            line_color = "gray"
-            if lane_id in self.fleet_manager.traffic_manager.occupied_lanes or reverse_id in self.fleet_manager.traffic_manager.occupied_lanes:
-                line_color = "red"
+        for lane_key in visible_lanes:
+            start_x, start_y = self.world_to_canvas(xs[lane_key[0]], ys[lane_key[0]])
+            end_x, end_y = self.world_to_canvas(xs[lane_key[1]], ys[lane_key[1]])
             
-            self.canvas.create_line(start_x, start_y, end_x, end_y, fill=line_color, width=2)
+            item = self.lane_items.get(lane_key)
+            if item is None:
+                width = 2 if lod == self.LOD_FULL else 1
+                item = self.canvas.create_line(0, 0, 0, 0, fill=self.lane_color((lane_key,)), width=width, tags="lane")
+                self.lane_items[lane_key] = item
+            self.canvas.coords(item, start_x, start_y, end_x, end_y)
         
         # Draw vertices
-        for vertex in self.nav_graph.vertices:
+        for vertex_id in visible_vertices:
+            vertex = vertex_index[vertex_id]
             x, y = self.world_to_canvas(vertex["x"], vertex["y"])
+            is_charger = vertex.get("is_charger", False)
             
-            # Draw different shapes for different vertex types
-            if vertex.get("is_charger", False):
-                self.canvas.create_rectangle(x-10, y-10, x+10, y+10, fill="yellow", outline="black")
-            else:
-                self.canvas.create_oval(x-8, y-8, x+8, y+8, fill="lightblue", outline="black")
-            
-            # Draw vertex name
-            self.canvas.create_text(x, y-15, text=vertex["name"], font=("Arial", 8))
-        
-        # Draw robots
-        for robot_id, robot in self.fleet_manager.robots.items():
-            x, y = self.world_to_canvas(robot.x, robot.y)
+            items = self.vertex_items.get(vertex_id)
+            if items is None:
+                fill = "yellow" if is_charger else "lightblue"
+                if self.nav_graph.is_vertex_blocked(vertex_id):
+                    fill = "gray"
+                if lod == self.LOD_FULL:
+                    # Draw different shapes for different vertex types
+                    if is_charger:
+                        shape = self.canvas.create_rectangle(0, 0, 0, 0, fill=fill, outline="black", tags="vertex")
+                    else:
+                        shape = self.canvas.create_oval(0, 0, 0, 0, fill=fill, outline="black", tags="vertex")
+                    label = self.canvas.create_text(0, 0, text=vertex["name"], font=("Arial", 8), tags="vertex")
+                    items = (shape, label)
+                else:
+                    items = (self.canvas.create_oval(0, 0, 0, 0, fill=fill, outline="", tags="vertex"),)
+                self.vertex_items[vertex_id] = items
             
-            # Base color from robot
-            color = robot.color
+            if lod == self.LOD_FULL:
+                size = 10 if is_charger else 8
+                self.canvas.coords(items[0], x-size, y-size, x+size, y+size)
+                self.canvas.coords(items[1], x, y-15)
+            else:
+                self.canvas.coords(items[0], x-2, y-2, x+2, y+2)
+    
+    def place_merged_layer(self, box):
+        # Zoomed far out: collapse vertices sharing a few-pixel screen cell into one dot
+        self.canvas.delete("lane", "vertex")
+        self.lane_items = {}
+        self.merged_lanes = {}
+        self.vertex_items = {}
+        
+        vertex_store = self.nav_graph.vertex_store
+        xs, ys, chargers = vertex_store.xs, vertex_store.ys, vertex_store.chargers
+        cell_size = self.MERGE_CELL_PIXELS
+        clusters = {}
+        vertex_cells = {}
+        
+        for vertex_id in self.nav_graph.spatial_index.query_box(*box):
+            x, y = self.world_to_canvas(xs[vertex_id], ys[vertex_id])
+            cell = (int(x // cell_size), int(y // cell_size))
+            vertex_cells[vertex_id] = cell
+            if cell not in clusters:
+                clusters[cell] = [0.0, 0.0, 0, False]
+            cluster = clusters[cell]
+            cluster[0] += x
+            cluster[1] += y
+            cluster[2] += 1
+            cluster[3] = cluster[3] or bool(chargers[vertex_id])
+        
+        centers = {cell: (c[0] / c[2], c[1] / c[2]) for cell, c in clusters.items()}
+        
+        merged = {}
+        for lane_key in self.nav_graph.get_lanes_in_box(*box):
+            start_cell = vertex_cells.get(lane_key[0])
+            end_cell = vertex_cells.get(lane_key[1])
+            if start_cell is None or end_cell is None or start_cell == end_cell:
+                continue
+            merged.setdefault(tuple(sorted((start_cell, end_cell))), []).append(lane_key)
+        
+        for (start_cell, end_cell), lane_keys in merged.items():
+            start_x, start_y = centers[start_cell]
+            end_x, end_y = centers[end_cell]
+            item = self.canvas.create_line(start_x, start_y, end_x, end_y, fill=self.lane_color(lane_keys), tags="lane")
+            self.merged_lanes[item] = lane_keys
+            for lane_key in lane_keys:
+                self.lane_items[lane_key] = item
+        
+        for cell, (x, y) in centers.items():
+            fill = "yellow" if clusters[cell][3] else "lightblue"
+            item = self.canvas.create_rectangle(x-1, y-1, x+1, y+1, fill=fill, outline="", tags="vertex")
+            self.vertex_items[cell] = (item,)
+    
+    def update_lane_colors(self, snapshot):
+        occupied = snapshot.occupied_lanes
+        changed = occupied ^ self.drawn_occupied
+        self.drawn_occupied = occupied
+        
+        # Only recolour lanes whose reservation state flipped since the last frame
+        for lane_key in changed:
+            item = self.lane_items.get(lane_key)
+            if item is not None:
+                self.canvas.itemconfig(item, fill=self.lane_color(self.merged_lanes.get(item, (lane_key,))))
+    
+    def update_robots(self, snapshot, selected_id):
+        robots = self.fleet_manager.robots
+        detailed = self.drawn_lod == self.LOD_FULL
+        min_x, min_y, max_x, max_y = self.visible_world_box()
+        xs, ys = snapshot.xs, snapshot.ys
+        visible = {
+            robot_id: idx for idx, robot_id in enumerate(snapshot.robot_ids)
+            if min_x <= xs[idx] <= max_x and min_y <= ys[idx] <= max_y
+        }
+        
+        # Robots that left the viewport give their items back
+        for robot_id in [rid for rid in self.robot_items if rid not in visible]:
+            for item in self.robot_items.pop(robot_id):
+                self.canvas.delete(item)
+            self.robot_drawn.pop(robot_id, None)
+        
+        for robot_id, idx in visible.items():
+            color = robots[robot_id].color
+            x, y = self.world_to_canvas(xs[idx], ys[idx])
+            status = snapshot.status(idx)
             
             # Change border based on status
             outline = "black"
-            if robot.status == "waiting":
+            if status == "waiting":
                 outline = "red"
-            elif robot.status == "charging":
+            elif status == "charging":
                 outline = "yellow"
             
             # Highlight selected robot
             width = 1
-            if self.fleet_manager.selected_robot and self.fleet_manager.selected_robot.id == robot.id:
+            if selected_id == robot_id:
                 width = 3
                 outline = "blue"
             
-            # Draw robot
-            self.canvas.create_oval(x-12, y-12, x+12, y+12, fill=color, outline=outline, width=width)
-            self.canvas.create_text(x, y, text=str(robot_id), font=("Arial", 9, "bold"))
+            items = self.robot_items.get(robot_id)
+            if items is None:
+                if detailed:
+                    items = (
+                        self.canvas.create_oval(0, 0, 0, 0, fill=color, tags="robot"),
+                        self.canvas.create_text(0, 0, text=str(robot_id), font=("Arial", 9, "bold"), tags="robot"),
+                        self.canvas.create_text(0, 0, text=status, font=("Arial", 7), tags="robot")
+                    )
+                else:
+                    # Far zoom: a plain dot per robot
+                    items = (self.canvas.create_oval(0, 0, 0, 0, fill=color, tags="robot"),)
+                self.robot_items[robot_id] = items
+            
+            drawn = self.robot_drawn.get(robot_id)
+            radius = 12 if detailed else 4
+            
+            if drawn is None or drawn[0] != x or drawn[1] != y:
+                self.canvas.coords(items[0], x-radius, y-radius, x+radius, y+radius)
+                if detailed:
+                    self.canvas.coords(items[1], x, y)
+                    self.canvas.coords(items[2], x, y + 20)
+            
+            if drawn is None or drawn[2:] != (status, outline, width):
+                self.canvas.itemconfig(items[0], outline=outline, width=width)
+                if detailed:
+                    self.canvas.itemconfig(items[2], text=status)
+            
+            self.robot_drawn[robot_id] = (x, y, status, outline, width)
+    
+    def update_display(self):
+        snapshot = self.fleet_manager.snapshot
+        selected = self.fleet_manager.selected_robot
+        selected_id = selected.id if selected else None
+        
+        if self.graph_version != self.nav_graph.version:
+            self.build_static_layer()
+        
+        if self.show_congestion and time.monotonic() - self.congestion_read_at >= self.CONGESTION_REFRESH:
+            self.refresh_congestion()
+        
+        # Nothing moved, nothing was reserved and the view is unchanged: skip the frame
+        if (self.transform_dirty or snapshot.version != self.drawn_version
+                or selected_id != self.drawn_selection):
+            telemetry = self.fleet_manager.telemetry
+            started = time.perf_counter()
+            if self.transform_dirty:
+                self.place_static_layer()
+            
+            self.update_lane_colors(snapshot)
+            self.update_robots(snapshot, selected_id)
+            if snapshot.version != self.drawn_version:
+                self.refresh_status_text(snapshot)
             
-            # Draw status indicator
-            status_y = y + 20
-            self.canvas.create_text(x, status_y, text=robot.status, font=("Arial", 7))
+            self.drawn_version = snapshot.version
+            self.drawn_selection = selected_id
+            if telemetry is not None and telemetry.enabled:
+                telemetry.gui_frame.observe(time.perf_counter() - started)
         
         # Schedule next update
         self.root.after(self.update_interval, self.update_display)
\ No newline at end of file
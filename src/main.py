@@ -12,8 +12,10 @@ from src.models.nav_graph import NavGraph
 from src.models.robot import Robot
 from src.controllers.fleet_manager import FleetManager
 from src.controllers.traffic_manager import TrafficManager
+from src.controllers.simulator import Simulator
 from src.gui.fleet_gui import FleetGUI
-from src.utils.helpers import load_nav_graph
+from src.utils.event_journal import EventJournal
+from src.utils.telemetry import Telemetry
 
 def main():
     try:
@@ -27,12 +29,16 @@ def main():
             messagebox.showerror("Error", "Navigation graph file not found. Please ensure nav_graph.json is in the data directory.")
             return
         
-        graph_data = load_nav_graph(graph_file)
-        
         # Create navigation graph and managers
-        nav_graph = NavGraph(graph_data)
+        nav_graph = NavGraph.from_file(graph_file)
         traffic_manager = TrafficManager()
-        fleet_manager = FleetManager(nav_graph, traffic_manager)
+        simulator = Simulator(realtime=True)
+        fleet_manager = FleetManager(nav_graph, traffic_manager, simulator, reservations=True,
+                                     vertex_occupancy=True, battery=True, telemetry=Telemetry())
+        # Every session is journaled, so whatever happened in it can be replayed headless with src.replay
+        EventJournal(os.path.join(os.path.dirname(__file__), '..', 'logs', 'fleet_journal.bin'), fleet_manager,
+                     nav_graph)
+        simulator.start()
         
         # Set up GUI
         root = tk.Tk()
@@ -40,6 +46,8 @@ def main():
         
         # Start GUI main loop
         root.mainloop()
+        simulator.stop()
+        fleet_manager.close()
     
     except Exception as e:
         messagebox.showerror("Error", f"An error occurred: {str(e)}")
@@ -0,0 +1,64 @@
+from array import array
+
+STATUS_NAMES = ("idle", "moving", "waiting", "charging")
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+NO_VERTEX = -1
+
+
+class FleetSnapshot:
+    __slots__ = ("version", "time", "robot_ids", "xs", "ys", "status_codes", "current_vertices",
+                 "target_vertices", "batteries", "occupied_lanes", "positions", "_arrays")
+
+    def __init__(self, version, time, robot_ids, xs, ys, status_codes, current_vertices, target_vertices,
+                 batteries, occupied_lanes):
+        self.version = version
+        self.time = time
+        self._arrays = (robot_ids, xs, ys, status_codes, current_vertices, target_vertices, batteries)
+        # Readers only ever see read-only views, so a published snapshot cannot change underneath them
+        self.robot_ids = memoryview(robot_ids).toreadonly()
+        self.xs = memoryview(xs).toreadonly()
+        self.ys = memoryview(ys).toreadonly()
+        self.status_codes = memoryview(status_codes).toreadonly()
+        self.current_vertices = memoryview(current_vertices).toreadonly()
+        self.target_vertices = memoryview(target_vertices).toreadonly()
+        self.batteries = memoryview(batteries).toreadonly()
+        self.occupied_lanes = occupied_lanes
+        self.positions = {robot_id: idx for idx, robot_id in enumerate(robot_ids)}
+
+    @classmethod
+    def capture(cls, version, time, robots, occupied_lanes, battery_level=None):
+        robot_ids = array('i')
+        xs = array('d')
+        ys = array('d')
+        status_codes = array('b')
+        current_vertices = array('i')
+        target_vertices = array('i')
+        batteries = array('d')
+
+        for robot in robots:
+            robot_ids.append(robot.id)
+            xs.append(robot.x)
+            ys.append(robot.y)
+            status_codes.append(STATUS_CODES.get(robot.status, 0))
+            current_vertices.append(robot.current_vertex["id"] if robot.current_vertex else NO_VERTEX)
+            target_vertices.append(robot.target_vertex["id"] if robot.target_vertex else NO_VERTEX)
+            batteries.append(battery_level(robot) if battery_level is not None else robot.battery)
+
+        return cls(version, time, robot_ids, xs, ys, status_codes, current_vertices, target_vertices, batteries,
+                   frozenset(occupied_lanes))
+
+    @classmethod
+    def empty(cls):
+        return cls(0, 0.0, array('i'), array('d'), array('d'), array('b'), array('i'), array('i'), array('d'), frozenset())
+
+    def __len__(self):
+        return len(self.robot_ids)
+
+    def same_state(self, other):
+        return self._arrays == other._arrays and self.occupied_lanes == other.occupied_lanes
+
+    def index_of(self, robot_id):
+        return self.positions.get(robot_id)
+
+    def status(self, idx):
+        return STATUS_NAMES[self.status_codes[idx]]
\ No newline at end of file
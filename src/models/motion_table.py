@@ -0,0 +1,125 @@
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Rows of the column block; CELL_X and CELL_Y hold the grid cell each robot was last reported in
+START_X, START_Y, DELTA_X, DELTA_Y, START_TIME, RATE, CELL_X, CELL_Y = range(8)
+COLUMN_COUNT = 8
+
+
+class MotionTable:
+    # The segment of every robot on a lane as one row of parallel columns. Rows stay packed at the front, so a
+    # frame interpolates the whole moving fleet in a single vectorised step
+    def __init__(self, cell_size, capacity=64):
+        self.cell_size = float(cell_size)
+        self.robots = []
+        self.rows = {}
+        self.capacity = 0
+        self.columns = None
+        self._grow(max(capacity, 1))
+
+    def __len__(self):
+        return len(self.robots)
+
+    def __contains__(self, robot):
+        return robot.id in self.rows
+
+    def begin(self, robot, start_x, start_y, end_x, end_y, start_time, end_time):
+        row = self.rows.get(robot.id)
+        if row is None:
+            row = len(self.robots)
+            if row == self.capacity:
+                self._grow(self.capacity * 2)
+            self.robots.append(robot)
+            self.rows[robot.id] = row
+
+        duration = end_time - start_time
+        if duration <= 0:
+            # Zero-length lanes sit at their end point from the start
+            start_x, start_y = end_x, end_y
+        self._set_row(row, (start_x, start_y, end_x - start_x, end_y - start_y, start_time,
+                            1.0 / duration if duration > 0 else 0.0,
+                            math.floor(robot.x / self.cell_size), math.floor(robot.y / self.cell_size)))
+
+    def end(self, robot):
+        row = self.rows.pop(robot.id, None)
+        if row is None:
+            return False
+
+        # Fill the gap with the last row so the active rows stay contiguous
+        last = len(self.robots) - 1
+        if row != last:
+            moved = self.robots[last]
+            self.robots[row] = moved
+            self.rows[moved.id] = row
+            self._copy_row(last, row)
+        self.robots.pop()
+        return True
+
+    def advance(self, now):
+        # Positions of every robot on a lane at time now, as (robots, xs, ys, moved) in row order, where moved lists
+        # the rows that crossed into another grid cell since the last call
+        count = len(self.robots)
+        if not count:
+            return [], [], [], []
+
+        if np is not None:
+            columns = self.columns[:, :count]
+            progress = np.clip((now - columns[START_TIME]) * columns[RATE], 0.0, 1.0)
+            xs = columns[START_X] + columns[DELTA_X] * progress
+            ys = columns[START_Y] + columns[DELTA_Y] * progress
+            cell_xs = np.floor(xs / self.cell_size)
+            cell_ys = np.floor(ys / self.cell_size)
+            moved = np.flatnonzero((cell_xs != columns[CELL_X]) | (cell_ys != columns[CELL_Y]))
+            columns[CELL_X] = cell_xs
+            columns[CELL_Y] = cell_ys
+            return list(self.robots), xs.tolist(), ys.tolist(), moved.tolist()
+
+        xs = []
+        ys = []
+        moved = []
+        start_xs, start_ys, delta_xs, delta_ys, start_times, rates, cell_xs, cell_ys = self.columns
+        cell_size = self.cell_size
+        for row in range(count):
+            progress = min(max((now - start_times[row]) * rates[row], 0.0), 1.0)
+            x = start_xs[row] + delta_xs[row] * progress
+            y = start_ys[row] + delta_ys[row] * progress
+            cell_x = math.floor(x / cell_size)
+            cell_y = math.floor(y / cell_size)
+            if cell_x != cell_xs[row] or cell_y != cell_ys[row]:
+                cell_xs[row] = cell_x
+                cell_ys[row] = cell_y
+                moved.append(row)
+            xs.append(x)
+            ys.append(y)
+        return list(self.robots), xs, ys, moved
+
+    def _grow(self, capacity):
+        if np is not None:
+            columns = np.zeros((COLUMN_COUNT, capacity))
+            if self.columns is not None:
+                columns[:, :self.capacity] = self.columns
+        else:
+            columns = [[0.0] * capacity for _ in range(COLUMN_COUNT)]
+            if self.columns is not None:
+                for column, old in zip(columns, self.columns):
+                    column[:self.capacity] = old
+        self.columns = columns
+        self.capacity = capacity
+
+    def _set_row(self, row, values):
+        if np is not None:
+            self.columns[:, row] = values
+            return
+        for column, value in zip(self.columns, values):
+            column[row] = value
+
+    def _copy_row(self, source, target):
+        if np is not None:
+            self.columns[:, target] = self.columns[:, source]
+            return
+        for column in self.columns:
+            column[target] = column[source]
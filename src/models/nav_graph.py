@@ -1,76 +1,430 @@
+import math
+from collections import deque
+
+from src.models.path_planner import PathPlanner
+from src.models.vertex_store import VertexStore
+from src.utils import graph_io
+from src.utils.spatial_index import GridIndex
+
+
+class GraphChange:
+    # One runtime map edit. worse is True when no route can have become cheaper (blocks, removals, cost rises), so
+    # routes that avoid lanes and vertices stay optimal
+    __slots__ = ("version", "worse", "lanes", "vertices")
+
+    def __init__(self, version, worse, lanes=(), vertices=()):
+        self.version = version
+        self.worse = worse
+        self.lanes = lanes
+        self.vertices = vertices
+
+
 class NavGraph:
-    def __init__(self, graph_data):
-        self.vertices = []
+    # Runtime edits kept for incremental invalidation; a consumer further behind than this rebuilds from scratch
+    CHANGE_LOG_SIZE = 256
+
+    def __init__(self, graph_data, planner_mode="astar"):
+        self.vertex_store = VertexStore()
+        self.vertices = self.vertex_store
         self.lanes = []
+        self.vertex_index = self.vertex_store.index
+        self.adjacency = {}
+        self.adjacency_costs = {}
+        self.lane_index = {}
+        self._spatial_index = None
+        self._lane_spatial_index = None
+        self.max_lane_half_length = 0.0
+        self.total_lane_length = 0.0
+        self.min_cost_ratio = 1.0
+        # Blocked lanes and vertices keep their records but are left out of the adjacency lists every planner walks
+        self.blocked_lanes = set()
+        self.blocked_vertices = set()
+        self.changes = deque(maxlen=self.CHANGE_LOG_SIZE)
+        self.change_listeners = []
+        self.version = 0
+        self.planner = PathPlanner(self, planner_mode)
         self.parse_graph(graph_data)
-        
-    def parse_graph(self, graph_data):
-        self.vertices = []
+
+    @classmethod
+    def from_file(cls, filename, planner_mode="astar"):
+        # Binary graphs are memory-mapped; JSON graphs are streamed straight into the indexes
+        graph = cls({"vertices": [], "lanes": []}, planner_mode)
+        if graph_io.is_graph_binary(filename):
+            graph.load_binary(filename)
+        else:
+            graph.load_records(graph_io.iter_graph_json(filename))
+        return graph
+
+    def reset(self, vertex_store=None):
+        # Vertex fields live in parallel arrays; vertices and vertex_index hand out lightweight views
+        self.vertex_store = vertex_store if vertex_store is not None else VertexStore()
+        self.vertices = self.vertex_store
         self.lanes = []
-        
-        for idx, vertex in enumerate(graph_data["vertices"]):
-            x, y, attrs = vertex
-            name = attrs.get("name", f"V{idx}")
-            is_charger = attrs.get("is_charger", False)
-            
-            self.vertices.append({
-                "id": idx,
-                "x": x,
-                "y": y,
-                "name": name,
-                "is_charger": is_charger
-            })
-        
+        self.vertex_index = self.vertex_store.index
+        self.adjacency = {vertex_id: [] for vertex_id in range(len(self.vertex_store))}
+        self.adjacency_costs = {vertex_id: [] for vertex_id in range(len(self.vertex_store))}
+        self.lane_index = {}
+        self._spatial_index = None
+        self._lane_spatial_index = None
+        self.max_lane_half_length = 0.0
+        self.total_lane_length = 0.0
+        self.min_cost_ratio = 1.0
+        self.blocked_lanes = set()
+        self.blocked_vertices = set()
+        self.version += 1
+
+    def parse_graph(self, graph_data):
+        self.reset()
+        for vertex in graph_data["vertices"]:
+            self.add_vertex_record(vertex)
         for lane in graph_data["lanes"]:
-            start_idx, end_idx = lane
-            self.lanes.append({
-                "start": start_idx,
-                "end": end_idx
-            })
-    
+            self.add_lane_record(lane)
+
+    def load_records(self, records):
+        self.reset()
+        # Lanes listed ahead of the vertices they join are held back until the vertex block has been read
+        vertices_seen = False
+        pending_lanes = []
+        for kind, record in records:
+            if kind == "vertex":
+                self.add_vertex_record(record)
+                vertices_seen = True
+            elif vertices_seen:
+                self.add_lane_record(record)
+            else:
+                pending_lanes.append(record)
+        for lane in pending_lanes:
+            self.add_lane_record(lane)
+
+    def load_binary(self, filename):
+        vertex_store, lane_starts, lane_ends, lane_costs = graph_io.read_graph_binary(filename)
+        self.reset(vertex_store)
+        for start_id, end_id, cost in zip(lane_starts, lane_ends, lane_costs):
+            self.add_lane(start_id, end_id, None if math.isnan(cost) else cost)
+
+    def save_binary(self, filename):
+        graph_io.write_graph_binary(filename, self.vertex_store,
+                                    ((lane["start"], lane["end"], lane["cost"]) for lane in self.lanes))
+
+    def add_vertex_record(self, vertex):
+        x, y, attrs = vertex
+        vertex_id = self.vertex_store.append(x, y, attrs.get("name"), attrs.get("is_charger", False),
+                                             attrs.get("capacity", 1))
+        self.adjacency[vertex_id] = []
+        self.adjacency_costs[vertex_id] = []
+        if self._spatial_index is not None:
+            self._spatial_index.insert(vertex_id, x, y)
+        self.version += 1
+        return vertex_id
+
+    def add_lane_record(self, lane):
+        attrs = lane[2] if len(lane) > 2 else {}
+        return self.add_lane(lane[0], lane[1], attrs.get("cost"))
+
+    @property
+    def spatial_index(self):
+        # Built on first use so loading a graph does not pay for indexes a headless run may never query
+        if self._spatial_index is None:
+            xs, ys = self.vertex_store.xs, self.vertex_store.ys
+            self._spatial_index = GridIndex.from_points(zip(range(len(xs)), xs, ys))
+        return self._spatial_index
+
+    @property
+    def lane_spatial_index(self):
+        # Lanes are indexed by midpoint; box queries pad by the longest half-lane
+        if self._lane_spatial_index is None:
+            xs, ys = self.vertex_store.xs, self.vertex_store.ys
+            index = GridIndex(self.spatial_index.cell_size)
+            for start_id, end_id in self.lane_index:
+                index.insert((start_id, end_id), (xs[start_id] + xs[end_id]) / 2, (ys[start_id] + ys[end_id]) / 2)
+            self._lane_spatial_index = index
+        return self._lane_spatial_index
+
+    def _lane_key(self, start_id, end_id):
+        return (start_id, end_id) if start_id <= end_id else (end_id, start_id)
+
+    def add_lane(self, start_id, end_id, cost=None):
+        vertex_store = self.vertex_store
+        if not vertex_store.has(start_id) or not vertex_store.has(end_id):
+            return False
+
+        key = self._lane_key(start_id, end_id)
+        if key in self.lane_index:
+            return False
+
+        xs, ys = vertex_store.xs, vertex_store.ys
+        start_x, start_y, end_x, end_y = xs[start_id], ys[start_id], xs[end_id], ys[end_id]
+        length = math.hypot(end_x - start_x, end_y - start_y)
+        lane = {
+            "start": start_id,
+            "end": end_id,
+            "cost": cost
+        }
+        if cost is None:
+            cost = length
+        elif length > 0:
+            self.min_cost_ratio = min(self.min_cost_ratio, cost / length)
+
+        self.lanes.append(lane)
+        self.lane_index[key] = lane
+        if self.is_lane_open(start_id, end_id):
+            self._link(start_id, end_id, cost)
+
+        if self._lane_spatial_index is not None:
+            self._lane_spatial_index.insert(key, (start_x + end_x) / 2, (start_y + end_y) / 2)
+        if length / 2 > self.max_lane_half_length:
+            self.max_lane_half_length = length / 2
+        self.total_lane_length += length
+
+        self.version += 1
+        return True
+
+    def remove_lane(self, start_id, end_id):
+        key = self._lane_key(start_id, end_id)
+        lane = self.lane_index.pop(key, None)
+        if lane is None:
+            return False
+
+        self.lanes.remove(lane)
+        if self.is_lane_open(start_id, end_id):
+            self._unlink(start_id, end_id)
+        self.blocked_lanes.discard(key)
+        if self._lane_spatial_index is not None:
+            self._lane_spatial_index.remove(key)
+        self.total_lane_length -= self.get_lane_length(start_id, end_id)
+        self._record_change(True, lanes=(key,))
+        return True
+
+    def is_lane_open(self, start_id, end_id):
+        return (self._lane_key(start_id, end_id) not in self.blocked_lanes
+                and start_id not in self.blocked_vertices and end_id not in self.blocked_vertices)
+
+    def is_lane_blocked(self, start_id, end_id):
+        return self._lane_key(start_id, end_id) in self.blocked_lanes
+
+    def is_vertex_blocked(self, vertex_id):
+        return vertex_id in self.blocked_vertices
+
+    def block_lane(self, start_id, end_id):
+        key = self._lane_key(start_id, end_id)
+        if key not in self.lane_index or key in self.blocked_lanes:
+            return False
+        if self.is_lane_open(start_id, end_id):
+            self._unlink(start_id, end_id)
+        self.blocked_lanes.add(key)
+        self._record_change(True, lanes=(key,))
+        return True
+
+    def unblock_lane(self, start_id, end_id):
+        key = self._lane_key(start_id, end_id)
+        if key not in self.blocked_lanes:
+            return False
+        self.blocked_lanes.discard(key)
+        if self.is_lane_open(start_id, end_id):
+            self._link(start_id, end_id, self.get_lane_cost(start_id, end_id))
+        self._record_change(False, lanes=(key,))
+        return True
+
+    def block_vertex(self, vertex_id):
+        # Closes every lane into the vertex; a robot standing on it stays put until it is unblocked
+        if not self.vertex_store.has(vertex_id) or vertex_id in self.blocked_vertices:
+            return False
+        for neighbor in list(self.adjacency[vertex_id]):
+            self._unlink(vertex_id, neighbor)
+        self.blocked_vertices.add(vertex_id)
+        self._record_change(True, vertices=(vertex_id,))
+        return True
+
+    def unblock_vertex(self, vertex_id):
+        if vertex_id not in self.blocked_vertices:
+            return False
+        self.blocked_vertices.discard(vertex_id)
+        for start_id, end_id in self.lane_index:
+            if vertex_id in (start_id, end_id) and self.is_lane_open(start_id, end_id):
+                self._link(start_id, end_id, self.get_lane_cost(start_id, end_id))
+        self._record_change(False, vertices=(vertex_id,))
+        return True
+
+    def set_lane_cost(self, start_id, end_id, cost):
+        # cost None falls back to the lane's length
+        lane = self.get_lane(start_id, end_id)
+        if lane is None:
+            return False
+        old_cost = self.get_lane_cost(start_id, end_id)
+        lane["cost"] = cost
+        new_cost = self.get_lane_cost(start_id, end_id)
+        length = self.get_lane_length(start_id, end_id)
+        if length > 0:
+            # The A* heuristic scale only ever shrinks, so it stays admissible after the cost goes back up
+            self.min_cost_ratio = min(self.min_cost_ratio, new_cost / length)
+        if self.is_lane_open(start_id, end_id):
+            self._set_adjacency_cost(start_id, end_id, new_cost)
+            if end_id != start_id:
+                self._set_adjacency_cost(end_id, start_id, new_cost)
+        self._record_change(new_cost >= old_cost, lanes=(self._lane_key(start_id, end_id),))
+        return True
+
+    def changes_since(self, version):
+        # The edits after version in order, or None when something outside the log (a reload, an added lane or
+        # vertex) or too many edits happened in between
+        if version == self.version:
+            return []
+        changes = [change for change in self.changes if change.version > version]
+        if len(changes) != self.version - version or changes[0].version != version + 1:
+            return None
+        return changes
+
+    def runtime_state(self):
+        # Everything the map edits since loading have changed, for checkpoints; None while the graph is as loaded.
+        # The adjacency lists go in as they are, since their order decides between routes of equal cost
+        if not self.changes:
+            return None
+        return {
+            "version": self.version,
+            "lanes": self.lanes,
+            "adjacency": self.adjacency,
+            "adjacency_costs": self.adjacency_costs,
+            "blocked_lanes": self.blocked_lanes,
+            "blocked_vertices": self.blocked_vertices,
+            "min_cost_ratio": self.min_cost_ratio,
+            "total_lane_length": self.total_lane_length,
+            "changes": list(self.changes)
+        }
+
+    def restore_runtime_state(self, state):
+        # Applies runtime_state() from a checkpoint to this graph, freshly loaded from the same file
+        if state is None:
+            return
+        self.version = state["version"]
+        self.lanes = state["lanes"]
+        self.lane_index = {self._lane_key(lane["start"], lane["end"]): lane for lane in self.lanes}
+        self.adjacency = state["adjacency"]
+        self.adjacency_costs = state["adjacency_costs"]
+        self.blocked_lanes = state["blocked_lanes"]
+        self.blocked_vertices = state["blocked_vertices"]
+        self.min_cost_ratio = state["min_cost_ratio"]
+        self.total_lane_length = state["total_lane_length"]
+        self.changes = deque(state["changes"], maxlen=self.CHANGE_LOG_SIZE)
+        self._lane_spatial_index = None
+
+    def _record_change(self, worse, lanes=(), vertices=()):
+        self.version += 1
+        change = GraphChange(self.version, worse, lanes, vertices)
+        self.changes.append(change)
+        for listener in self.change_listeners:
+            listener(change)
+
+    def _link(self, start_id, end_id, cost):
+        self.adjacency[start_id].append(end_id)
+        self.adjacency_costs[start_id].append(cost)
+        if end_id != start_id:
+            self.adjacency[end_id].append(start_id)
+            self.adjacency_costs[end_id].append(cost)
+
+    def _unlink(self, start_id, end_id):
+        self._unlink_entry(start_id, end_id)
+        if end_id != start_id:
+            self._unlink_entry(end_id, start_id)
+
+    def _unlink_entry(self, from_id, to_id):
+        position = self.adjacency[from_id].index(to_id)
+        del self.adjacency[from_id][position]
+        del self.adjacency_costs[from_id][position]
+
+    def _set_adjacency_cost(self, from_id, to_id, cost):
+        self.adjacency_costs[from_id][self.adjacency[from_id].index(to_id)] = cost
+
+    def get_lane(self, start_id, end_id):
+        return self.lane_index.get(self._lane_key(start_id, end_id))
+
+    def get_lane_length(self, start_id, end_id):
+        xs, ys = self.vertex_store.xs, self.vertex_store.ys
+        return math.hypot(xs[end_id] - xs[start_id], ys[end_id] - ys[start_id])
+
+    def get_lane_cost(self, start_id, end_id):
+        lane = self.get_lane(start_id, end_id)
+        if lane is None:
+            return math.inf
+        if lane["cost"] is not None:
+            return lane["cost"]
+        return self.get_lane_length(start_id, end_id)
+
+    def get_path_cost(self, path):
+        return sum(self.get_lane_cost(path[i], path[i + 1]) for i in range(len(path) - 1))
+
+    def get_path_length(self, path):
+        return sum(self.get_lane_length(path[i], path[i + 1]) for i in range(len(path) - 1))
+
+    def get_charger_ids(self):
+        blocked = self.blocked_vertices
+        return [vertex_id for vertex_id, is_charger in enumerate(self.vertex_store.chargers)
+                if is_charger and vertex_id not in blocked]
+
     def get_vertex_by_id(self, vertex_id):
-        for vertex in self.vertices:
-            if vertex["id"] == vertex_id:
-                return vertex
-        return None
-    
+        return self.vertex_index.get(vertex_id)
+
+    def get_vertex_by_name(self, name):
+        vertex_id = self.vertex_store.find_by_name(name)
+        return None if vertex_id is None else self.vertex_index[vertex_id]
+
+    def get_vertex_capacity(self, vertex_id):
+        return self.vertex_store.capacities[vertex_id]
+
     def get_vertex_by_position(self, x, y, tolerance=5):
-        for vertex in self.vertices:
-            if abs(vertex["x"] - x) <= tolerance and abs(vertex["y"] - y) <= tolerance:
-                return vertex
-        return None
-    
+        candidates = self.spatial_index.query_box(x - tolerance, y - tolerance, x + tolerance, y + tolerance)
+        if not candidates:
+            return None
+        return self.vertex_index[self.get_nearest_vertex_id(x, y, candidates)]
+
+    def get_nearest_vertex_id(self, x, y, candidates=None):
+        if candidates is None:
+            return self.spatial_index.nearest(x, y)
+        xs, ys = self.vertex_store.xs, self.vertex_store.ys
+        return min(candidates, key=lambda vid: (xs[vid] - x) ** 2 + (ys[vid] - y) ** 2)
+
+    def get_mean_lane_length(self):
+        if not self.lane_index:
+            return self.spatial_index.cell_size
+        return self.total_lane_length / len(self.lane_index)
+
+    def get_lanes_in_box(self, min_x, min_y, max_x, max_y):
+        pad = self.max_lane_half_length
+        xs, ys = self.vertex_store.xs, self.vertex_store.ys
+        lanes = []
+        for key in self.lane_spatial_index.query_box(min_x - pad, min_y - pad, max_x + pad, max_y + pad):
+            start_x, end_x = xs[key[0]], xs[key[1]]
+            start_y, end_y = ys[key[0]], ys[key[1]]
+            if (max(start_x, end_x) >= min_x and min(start_x, end_x) <= max_x
+                    and max(start_y, end_y) >= min_y and min(start_y, end_y) <= max_y):
+                lanes.append(key)
+        return lanes
+
+    def get_lane_by_position(self, x, y, tolerance=5):
+        # The lane key whose segment passes closest to (x, y), within tolerance
+        xs, ys = self.vertex_store.xs, self.vertex_store.ys
+        best_key = None
+        best_distance = tolerance
+        for key in self.get_lanes_in_box(x - tolerance, y - tolerance, x + tolerance, y + tolerance):
+            start_x, start_y, end_x, end_y = xs[key[0]], ys[key[0]], xs[key[1]], ys[key[1]]
+            dx, dy = end_x - start_x, end_y - start_y
+            length_sq = dx * dx + dy * dy
+            t = 0.0
+            if length_sq > 0:
+                t = min(max(((x - start_x) * dx + (y - start_y) * dy) / length_sq, 0.0), 1.0)
+            distance = math.hypot(start_x + dx * t - x, start_y + dy * t - y)
+            if distance <= best_distance:
+                best_key = key
+                best_distance = distance
+        return best_key
+
+    def get_vertices_in_radius(self, x, y, radius):
+        return [self.vertex_index[vid] for vid in self.spatial_index.query_radius(x, y, radius)]
+
+    def get_vertices_in_box(self, min_x, min_y, max_x, max_y):
+        return [self.vertex_index[vid] for vid in self.spatial_index.query_box(min_x, min_y, max_x, max_y)]
+
     def get_connected_vertices(self, vertex_id):
-        connected = []
-        for lane in self.lanes:
-            if lane["start"] == vertex_id:
-                connected.append(lane["end"])
-            elif lane["end"] == vertex_id:
-                connected.append(lane["start"])
-        return connected
-    
-    def find_path(self, start_id, end_id):
-        visited = set()
-        queue = [[start_id]]
-        
-        if start_id == end_id:
-            return [start_id]
-            
-        while queue:
-            path = queue.pop(0)
-            node = path[-1]
-            
-            if node not in visited:
-                neighbors = self.get_connected_vertices(node)
-                
-                for neighbor in neighbors:
-                    new_path = list(path)
-                    new_path.append(neighbor)
-                    queue.append(new_path)
-                    
-                    if neighbor == end_id:
-                        return new_path
-                        
-                visited.add(node)
-                
-        return None
\ No newline at end of file
+        return self.adjacency.get(vertex_id, [])
+
+    def find_path(self, start_id, end_id, mode=None, avoid=None, avoid_vertices=None):
+        return self.planner.find_path(start_id, end_id, mode, avoid, avoid_vertices)
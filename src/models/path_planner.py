@@ -0,0 +1,210 @@
+import heapq
+import math
+import time
+from array import array
+from collections import deque
+
+
+class PathPlanner:
+    MODES = ("bfs", "dijkstra", "astar")
+
+    def __init__(self, nav_graph, mode="astar"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown planner mode: {mode}")
+        self.nav_graph = nav_graph
+        self.mode = mode
+        self.telemetry = None
+
+    def find_path(self, start_id, end_id, mode=None, avoid=None, avoid_vertices=None):
+        path, _ = self.plan(start_id, end_id, mode, avoid, avoid_vertices)
+        return path
+
+    def plan(self, start_id, end_id, mode=None, avoid=None, avoid_vertices=None):
+        telemetry = self.telemetry
+        if telemetry is None or not telemetry.enabled:
+            return self._plan(start_id, end_id, mode, avoid, avoid_vertices)
+        started = time.perf_counter()
+        result = self._plan(start_id, end_id, mode, avoid, avoid_vertices)
+        telemetry.path_search.observe(time.perf_counter() - started)
+        return result
+
+    def _plan(self, start_id, end_id, mode=None, avoid=None, avoid_vertices=None):
+        # avoid is an optional set of (min_id, max_id) lane keys the route must not use; avoid_vertices an
+        # optional set of vertices it must not pass through (the goal itself is always allowed)
+        mode = mode or self.mode
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown planner mode: {mode}")
+
+        graph = self.nav_graph
+        if start_id not in graph.vertex_index or end_id not in graph.vertex_index:
+            return None, math.inf
+
+        if start_id == end_id:
+            return [start_id], 0.0
+
+        if mode == "bfs":
+            parents = self._search_bfs(start_id, end_id, avoid, avoid_vertices)
+        else:
+            parents = self._search_weighted(start_id, end_id, mode == "astar", avoid, avoid_vertices)
+
+        if parents is None:
+            return None, math.inf
+
+        path = self._reconstruct(parents, end_id)
+        return path, graph.get_path_cost(path)
+
+    def shortest_path_tree(self, source_id):
+        adjacency = self.nav_graph.adjacency
+        adjacency_costs = self.nav_graph.adjacency_costs
+        distances = {source_id: 0.0}
+        parents = {source_id: None}
+        closed = set()
+        frontier = [(0.0, source_id)]
+
+        while frontier:
+            cost, node = heapq.heappop(frontier)
+            if node in closed:
+                continue
+            closed.add(node)
+
+            for neighbor, lane_cost in zip(adjacency[node], adjacency_costs[node]):
+                new_cost = cost + lane_cost
+                if new_cost < distances.get(neighbor, math.inf):
+                    distances[neighbor] = new_cost
+                    parents[neighbor] = node
+                    heapq.heappush(frontier, (new_cost, neighbor))
+
+        return distances, parents
+
+    def distances_to(self, source_id, target_ids):
+        # One Dijkstra search pricing every target, stopping as soon as the last one is settled
+        adjacency = self.nav_graph.adjacency
+        adjacency_costs = self.nav_graph.adjacency_costs
+        remaining = set(target_ids)
+        found = {}
+        distances = {source_id: 0.0}
+        frontier = [(0.0, source_id)]
+
+        while frontier and remaining:
+            cost, node = heapq.heappop(frontier)
+            if node in found or cost > distances[node]:
+                continue
+            found[node] = cost
+            remaining.discard(node)
+
+            for neighbor, lane_cost in zip(adjacency[node], adjacency_costs[node]):
+                new_cost = cost + lane_cost
+                if new_cost < distances.get(neighbor, math.inf):
+                    distances[neighbor] = new_cost
+                    heapq.heappush(frontier, (new_cost, neighbor))
+
+        return [found.get(target_id, math.inf) for target_id in target_ids]
+
+    def distance_field(self, source_ids, by_length=False):
+        # Multi-source Dijkstra: cost from every vertex to its nearest source, and which source that is.
+        # by_length measures lanes by their geometric length instead of their routing cost
+        adjacency = self.nav_graph.adjacency
+        if by_length:
+            get_lane_length = self.nav_graph.get_lane_length
+            adjacency_costs = {node: [get_lane_length(node, neighbor) for neighbor in neighbors]
+                               for node, neighbors in adjacency.items()}
+        else:
+            adjacency_costs = self.nav_graph.adjacency_costs
+        vertex_count = len(self.nav_graph.vertex_store)
+        distances = array('d', [math.inf]) * vertex_count
+        nearest = array('i', [-1]) * vertex_count
+        frontier = []
+        for source_id in source_ids:
+            distances[source_id] = 0.0
+            nearest[source_id] = source_id
+            frontier.append((0.0, source_id))
+        heapq.heapify(frontier)
+
+        while frontier:
+            cost, node = heapq.heappop(frontier)
+            if cost > distances[node]:
+                continue
+            source_id = nearest[node]
+            for neighbor, lane_cost in zip(adjacency[node], adjacency_costs[node]):
+                new_cost = cost + lane_cost
+                if new_cost < distances[neighbor]:
+                    distances[neighbor] = new_cost
+                    nearest[neighbor] = source_id
+                    heapq.heappush(frontier, (new_cost, neighbor))
+
+        return distances, nearest
+
+    def _search_bfs(self, start_id, end_id, avoid=None, avoid_vertices=None):
+        adjacency = self.nav_graph.adjacency
+        parents = {start_id: None}
+        queue = deque([start_id])
+
+        while queue:
+            node = queue.popleft()
+            for neighbor in adjacency[node]:
+                if neighbor in parents:
+                    continue
+                if avoid and ((node, neighbor) if node <= neighbor else (neighbor, node)) in avoid:
+                    continue
+                if avoid_vertices and neighbor in avoid_vertices and neighbor != end_id:
+                    continue
+                parents[neighbor] = node
+                if neighbor == end_id:
+                    return parents
+                queue.append(neighbor)
+
+        return None
+
+    def _search_weighted(self, start_id, end_id, use_heuristic, avoid=None, avoid_vertices=None):
+        graph = self.nav_graph
+        adjacency = graph.adjacency
+        adjacency_costs = graph.adjacency_costs
+
+        if use_heuristic:
+            xs, ys = graph.vertex_store.xs, graph.vertex_store.ys
+            goal_x, goal_y = xs[end_id], ys[end_id]
+            # Scale the heuristic so lanes with a cost below their length keep it admissible
+            scale = graph.min_cost_ratio
+
+            def heuristic(node):
+                return scale * math.hypot(goal_x - xs[node], goal_y - ys[node])
+        else:
+            def heuristic(node):
+                return 0.0
+
+        parents = {start_id: None}
+        g_score = {start_id: 0.0}
+        closed = set()
+        frontier = [(heuristic(start_id), 0.0, start_id)]
+
+        while frontier:
+            _, cost, node = heapq.heappop(frontier)
+            if node == end_id:
+                return parents
+            if node in closed:
+                continue
+            closed.add(node)
+
+            for neighbor, lane_cost in zip(adjacency[node], adjacency_costs[node]):
+                if neighbor in closed:
+                    continue
+                if avoid and ((node, neighbor) if node <= neighbor else (neighbor, node)) in avoid:
+                    continue
+                if avoid_vertices and neighbor in avoid_vertices and neighbor != end_id:
+                    continue
+                new_cost = cost + lane_cost
+                if new_cost < g_score.get(neighbor, math.inf):
+                    g_score[neighbor] = new_cost
+                    parents[neighbor] = node
+                    heapq.heappush(frontier, (new_cost + heuristic(neighbor), new_cost, neighbor))
+
+        return None
+
+    def _reconstruct(self, parents, end_id):
+        path = []
+        node = end_id
+        while node is not None:
+            path.append(node)
+            node = parents[node]
+        path.reverse()
+        return path
\ No newline at end of file
@@ -1,13 +1,17 @@
-import time
-import threading
 import math
 
 class Robot:
+    # Fixed slots keep per-robot memory small for fleets of thousands
+    __slots__ = ("id", "current_vertex", "target_vertex", "path", "path_index", "current_lane", "status", "color",
+                 "fleet_manager", "x", "y", "move_speed", "segment", "pending_event", "wait_started", "wait_time",
+                 "lane_granted_at", "tasks_completed", "departures", "battery")
+
     def __init__(self, robot_id, start_vertex, color, fleet_manager):
         self.id = robot_id
         self.current_vertex = start_vertex
         self.target_vertex = None
         self.path = []
+        self.path_index = 0
         self.current_lane = None
         self.status = "idle"
         self.color = color
@@ -15,84 +19,198 @@ class Robot:
         self.x = start_vertex["x"]
         self.y = start_vertex["y"]
         self.move_speed = 50
-        self.move_thread = None
-        self.stop_thread = False
-    
-    def assign_task(self, target_vertex, path):
+        self.segment = None
+        self.pending_event = None
+        self.wait_started = None
+        self.wait_time = 0.0
+        self.lane_granted_at = None
+        self.tasks_completed = 0
+        self.departures = None
+        self.battery = 100.0
+
+    def assign_task(self, target_vertex, path, departures=None):
         self.target_vertex = target_vertex
         self.path = path
+        self.departures = departures
+        self.path_index = 0
         self.status = "moving"
-        
-        if self.move_thread is None or not self.move_thread.is_alive():
-            self.stop_thread = False
-            self.move_thread = threading.Thread(target=self.start_movement)
-            self.move_thread.daemon = True
-            self.move_thread.start()
-        
+
+        self.start_movement()
         return True
-    
+
     def start_movement(self):
-        current_path_index = 0
-        
-        while current_path_index < len(self.path) - 1 and not self.stop_thread:
-            current_vertex_id = self.path[current_path_index]
-            next_vertex_id = self.path[current_path_index + 1]
-            
-            lane = (current_vertex_id, next_vertex_id)
-            reserved = self.fleet_manager.traffic_manager.request_lane(self, lane)
-            
-            if not reserved:
-                self.status = "waiting"
-                time.sleep(0.5)
-                continue
-            
-            self.status = "moving"
-            self.current_lane = lane
-            
-            current_vertex = self.fleet_manager.nav_graph.get_vertex_by_id(current_vertex_id)
-            next_vertex = self.fleet_manager.nav_graph.get_vertex_by_id(next_vertex_id)
-            
-            self.move_between_vertices(current_vertex, next_vertex)
-            
-            self.fleet_manager.traffic_manager.release_lane(self, lane)
-            
-            self.current_vertex = next_vertex
-            self.x = next_vertex["x"]
-            self.y = next_vertex["y"]
-            current_path_index += 1
-            
-            self.fleet_manager.log(f"Robot {self.id} moved to {next_vertex['name']}")
-        
-        if not self.stop_thread:
-            self.status = "idle"
-            if self.current_vertex.get("is_charger", False):
-                self.status = "charging"
-            
-            self.target_vertex = None
-            self.current_lane = None
-            self.fleet_manager.log(f"Robot {self.id} completed task at {self.current_vertex['name']}")
-    
+        if self.path_index >= len(self.path) - 1:
+            self.complete_task()
+            return
+
+        simulator = self.fleet_manager.simulator
+        # A reserved route holds at the vertex until its booked departure so it never meets other bookings
+        if self.departures is not None and self.departures[self.path_index] > simulator.now:
+            self.status = "waiting"
+            if self.wait_started is None:
+                self.wait_started = simulator.now
+            self.pending_event = simulator.schedule_at(self.departures[self.path_index], self.start_movement)
+            return
+
+        lane = (self.path[self.path_index], self.path[self.path_index + 1])
+        zone = self.fleet_manager.zone
+        if zone is not None and not zone.owns_lane(lane):
+            # The next lane is reserved in another worker's table; that worker carries on from this vertex
+            zone.hand_off(self)
+            return
+
+        traffic_manager = self.fleet_manager.traffic_manager
+        energy_manager = self.fleet_manager.energy_manager
+        if energy_manager is not None and not energy_manager.can_travel(self, lane):
+            energy_manager.strand(self)
+            return
+
+        # A refused request leaves us queued; release_lane calls back once the lane is ours
+        if traffic_manager.request_lane_async(self, lane, self.on_lane_granted):
+            self._finish_wait(simulator.now, lane)
+            self.enter_lane(lane)
+        else:
+            self.status = "waiting"
+            if self.wait_started is None:
+                self.wait_started = simulator.now
+            self.fleet_manager.robot_blocked(self, lane)
+
+    def on_lane_granted(self, lane):
+        self._finish_wait(self.fleet_manager.simulator.now, lane)
+        self.current_lane = lane
+        self.pending_event = self.fleet_manager.simulator.schedule(0, self.enter_lane, lane)
+
+    def _finish_wait(self, now, lane):
+        if self.wait_started is not None:
+            waited = now - self.wait_started
+            self.wait_time += waited
+            self.wait_started = None
+            telemetry = self.fleet_manager.telemetry
+            if telemetry is not None and telemetry.enabled:
+                telemetry.record_wait(self.fleet_manager.traffic_manager.get_lane_key(lane), waited)
+        self.lane_granted_at = now
+        if self.fleet_manager.open_deadlocks:
+            self.fleet_manager.lane_granted(self)
+        journal = self.fleet_manager.journal
+        if journal is not None:
+            journal.record("lane_granted", self.id, lane[0], lane[1])
+
+    def total_wait(self, now):
+        # Includes a wait still open at now, which wait_time only takes in once the robot moves on
+        if self.wait_started is None:
+            return self.wait_time
+        return self.wait_time + now - self.wait_started
+
+    def enter_lane(self, lane):
+        self.status = "moving"
+        self.current_lane = lane
+
+        nav_graph = self.fleet_manager.nav_graph
+        current_vertex = nav_graph.get_vertex_by_id(lane[0])
+        next_vertex = nav_graph.get_vertex_by_id(lane[1])
+
+        self.move_between_vertices(current_vertex, next_vertex)
+
     def move_between_vertices(self, start_vertex, end_vertex):
         start_x, start_y = start_vertex["x"], start_vertex["y"]
         end_x, end_y = end_vertex["x"], end_vertex["y"]
-        
+
         distance = math.sqrt((end_x - start_x)**2 + (end_y - start_y)**2)
         total_time = distance / self.move_speed
-        
-        steps = max(int(total_time * 30), 1)
-        
-        for step in range(1, steps + 1):
-            if self.stop_thread:
-                break
-                
-            progress = step / steps
-            self.x = start_x + (end_x - start_x) * progress
-            self.y = start_y + (end_y - start_y) * progress
-            
-            time.sleep(total_time / steps)
-    
+        if self.fleet_manager.energy_manager is not None:
+            self.fleet_manager.energy_manager.drain(self, distance)
+
+        simulator = self.fleet_manager.simulator
+        self.segment = (start_x, start_y, end_x, end_y, simulator.now, simulator.now + total_time)
+        # The fleet's motion table interpolates x and y each frame; arrival is an exact simulator event
+        self.fleet_manager.motion_table.begin(self, *self.segment)
+        self.pending_event = simulator.schedule(total_time, self.arrive, end_vertex)
+
+    def arrive(self, next_vertex):
+        lane = self.current_lane
+        self.pending_event = None
+        self.segment = None
+        self.fleet_manager.motion_table.end(self)
+        self.release_current_lane()
+
+        self.current_vertex = next_vertex
+        self.x = next_vertex["x"]
+        self.y = next_vertex["y"]
+        self.fleet_manager.update_robot_position(self)
+        self.path_index += 1
+
+        self.fleet_manager.log(f"Robot {self.id} moved to {next_vertex['name']}", "arrive", self.id, next_vertex["id"], lane)
+        self.start_movement()
+
+    def complete_task(self):
+        self.status = "idle"
+        if self.current_vertex.get("is_charger", False):
+            self.status = "charging"
+
+        self.target_vertex = None
+        self.current_lane = None
+        self.tasks_completed += 1
+        self.fleet_manager.log(f"Robot {self.id} completed task at {self.current_vertex['name']}", "task_completed", self.id,
+                               self.current_vertex["id"])
+        self.fleet_manager.task_completed(self)
+
+    def release_current_lane(self):
+        if self.current_lane is None:
+            return
+
+        journal = self.fleet_manager.journal
+        if journal is not None:
+            # Before the release, which may hand the lane straight to the next robot in line
+            journal.record("lane_released", self.id, self.current_lane[0], self.current_lane[1])
+        self.fleet_manager.traffic_manager.release_lane(self, self.current_lane)
+        self.fleet_manager.record_lane_usage(self.current_lane, self.fleet_manager.simulator.now - self.lane_granted_at)
+        self.current_lane = None
+        self.lane_granted_at = None
+
+    def back_off(self, delay):
+        # Withdraw the queued lane request and ask for the same lane again later
+        simulator = self.fleet_manager.simulator
+        self.fleet_manager.traffic_manager.cancel_requests(self)
+        simulator.cancel(self.pending_event)
+        self.pending_event = simulator.schedule(delay, self.start_movement)
+
+    def _keep_vertex_slot(self, lane):
+        traffic_manager = self.fleet_manager.traffic_manager
+        if traffic_manager.get_robot_vertex(self) != lane[1]:
+            return True
+        return traffic_manager.place_robot(self, lane[0])
+
+    def reroute(self, path):
+        # Replace the rest of the route while waiting at path[0], the current vertex
+        self.fleet_manager.traffic_manager.cancel_requests(self)
+        self.fleet_manager.simulator.cancel(self.pending_event)
+        self.pending_event = None
+        self.path = path
+        self.path_index = 0
+        self.departures = None
+        self.start_movement()
+
     def stop_movement(self):
-        self.stop_thread = True
-        if self.move_thread and self.move_thread.is_alive():
-            self.move_thread.join(timeout=1)
-        self.status = "idle"
\ No newline at end of file
+        traffic_manager = self.fleet_manager.traffic_manager
+        self.fleet_manager.simulator.cancel(self.pending_event)
+        self.pending_event = None
+        traffic_manager.cancel_requests(self)
+        self.wait_started = None
+
+        # A robot stopped part-way along a lane finishes at the lane's far end. One only granted a lane stays
+        # where it is, unless its vertex slot has already moved to the far end and the one it left is taken
+        lane = self.current_lane
+        if lane is not None and (self.segment is not None or not self._keep_vertex_slot(lane)):
+            self.current_vertex = self.fleet_manager.nav_graph.get_vertex_by_id(self.current_lane[1])
+            self.x = self.current_vertex["x"]
+            self.y = self.current_vertex["y"]
+            self.fleet_manager.update_robot_position(self)
+        self.release_current_lane()
+
+        self.segment = None
+        self.fleet_manager.motion_table.end(self)
+        self.target_vertex = None
+        self.path = []
+        self.departures = None
+        self.status = "idle"
+        self.fleet_manager.robot_stopped(self)
\ No newline at end of file
@@ -0,0 +1,179 @@
+from array import array
+
+VERTEX_KEYS = ("id", "x", "y", "name", "is_charger", "capacity")
+
+
+class VertexView:
+    # A vertex is just an index into the store; fields are read from the parallel arrays on access
+    __slots__ = ("store", "id")
+
+    def __init__(self, store, vertex_id):
+        self.store = store
+        self.id = vertex_id
+
+    def __getitem__(self, key):
+        store = self.store
+        if key == "x":
+            return store.xs[self.id]
+        if key == "y":
+            return store.ys[self.id]
+        if key == "id":
+            return self.id
+        if key == "name":
+            return store.name_of(self.id)
+        if key == "is_charger":
+            return bool(store.chargers[self.id])
+        if key == "capacity":
+            return store.capacities[self.id]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in VERTEX_KEYS
+
+    def __iter__(self):
+        return iter(VERTEX_KEYS)
+
+    def __len__(self):
+        return len(VERTEX_KEYS)
+
+    def keys(self):
+        return VERTEX_KEYS
+
+    def values(self):
+        return [self[key] for key in VERTEX_KEYS]
+
+    def items(self):
+        return [(key, self[key]) for key in VERTEX_KEYS]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, VertexView):
+            return self.store is other.store and self.id == other.id
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self.store), self.id))
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class VertexIndex:
+    # Read-only id -> vertex mapping over the store, standing in for the old dict of vertex dicts
+    __slots__ = ("store",)
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, vertex_id):
+        if not self.store.has(vertex_id):
+            raise KeyError(vertex_id)
+        return VertexView(self.store, vertex_id)
+
+    def get(self, vertex_id, default=None):
+        if not self.store.has(vertex_id):
+            return default
+        return VertexView(self.store, vertex_id)
+
+    def __contains__(self, vertex_id):
+        return self.store.has(vertex_id)
+
+    def __iter__(self):
+        return iter(range(len(self.store)))
+
+    def __len__(self):
+        return len(self.store)
+
+    def keys(self):
+        return range(len(self.store))
+
+    def values(self):
+        return iter(self.store)
+
+    def items(self):
+        return ((vertex.id, vertex) for vertex in self.store)
+
+
+class VertexStore:
+    def __init__(self):
+        self.xs = array('d')
+        self.ys = array('d')
+        self.chargers = array('b')
+        # How many robots may stand on the vertex at once (multi-slot chargers, parking bays)
+        self.capacities = array('H')
+        # Names are packed into one UTF-8 buffer; vertex i owns name_data[name_offsets[i]:name_offsets[i + 1]]
+        self.name_data = bytearray()
+        self.name_offsets = array('I', [0])
+        self.name_lookup = None
+        self.buffer = None
+        self.index = VertexIndex(self)
+
+    @classmethod
+    def from_columns(cls, xs, ys, chargers, capacities, name_offsets, name_data, buffer=None):
+        # Wraps existing columns (e.g. views into a memory-mapped file); such stores are read-only
+        store = cls()
+        store.xs = xs
+        store.ys = ys
+        store.chargers = chargers
+        store.capacities = capacities
+        store.name_offsets = name_offsets
+        store.name_data = name_data
+        store.buffer = buffer
+        return store
+
+    def append(self, x, y, name=None, is_charger=False, capacity=1):
+        vertex_id = len(self.xs)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.chargers.append(1 if is_charger else 0)
+        self.capacities.append(capacity)
+
+        # Default names are derived from the id on demand instead of being stored
+        if name is not None and name != f"V{vertex_id}":
+            self.name_data += name.encode()
+        self.name_offsets.append(len(self.name_data))
+        self.name_lookup = None
+        return vertex_id
+
+    def has(self, vertex_id):
+        return isinstance(vertex_id, int) and 0 <= vertex_id < len(self.xs)
+
+    def name_of(self, vertex_id):
+        start, end = self.name_offsets[vertex_id], self.name_offsets[vertex_id + 1]
+        if start == end:
+            return f"V{vertex_id}"
+        return str(self.name_data[start:end], "utf-8")
+
+    def find_by_name(self, name):
+        # Name lookups are rare (CLI input, tests), so the reverse map is only built when first needed
+        if self.name_lookup is None:
+            self.name_lookup = {}
+            for vertex_id in range(len(self.xs) - 1, -1, -1):
+                self.name_lookup[self.name_of(vertex_id)] = vertex_id
+        return self.name_lookup.get(name)
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [VertexView(self, vertex_id) for vertex_id in range(len(self.xs))[idx]]
+        if idx < 0:
+            idx += len(self.xs)
+        if not self.has(idx):
+            raise IndexError("vertex index out of range")
+        return VertexView(self, idx)
+
+    def __iter__(self):
+        for vertex_id in range(len(self.xs)):
+            yield VertexView(self, vertex_id)
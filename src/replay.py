@@ -0,0 +1,143 @@
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.models.nav_graph import NavGraph
+from src.sim import write_report
+from src.utils.checkpoint import save_checkpoint
+from src.utils.event_journal import JournalVerifier, is_input, iter_records, read_journal
+
+
+class JournalReplay:
+    # Replays a journal headless, as fast as the simulation runs. The run restarts from the journal's checkpoint
+    # and each outside command goes back in between the same two events it originally arrived between; the
+    # simulation reproduces everything else by itself, and the verifier checks that record by record
+    def __init__(self, filename, nav_graph, log_file=None):
+        self.nav_graph = nav_graph
+        self.root, body = read_journal(filename, nav_graph)
+        self.fleet_manager = getattr(self.root, "fleet_manager", self.root)
+        self.simulator = self.fleet_manager.simulator
+        # A session recorded in real time does not wait on the wall clock when replayed
+        self.simulator.realtime = False
+        if log_file is None:
+            log_file = os.path.splitext(filename)[0] + ".replay.log"
+        self.fleet_manager.open_log(log_file)
+        self.records = list(iter_records(body))
+        self.verifier = JournalVerifier(self.simulator, body)
+        self.fleet_manager.journal = self.verifier
+        self.inputs_replayed = 0
+        self.wall_time = 0.0
+
+    def run(self, until=None):
+        started = time.perf_counter()
+        simulator = self.simulator
+        with simulator.lock:
+            for record in self.records:
+                if until is not None and record.time > until:
+                    break
+                if is_input(record):
+                    self._run_to(record)
+                    self.apply(record)
+                    self.inputs_replayed += 1
+
+            last = self.records[-1] if self.records else None
+            if until is None and last is not None:
+                self._run_to(last)
+                if last.kind == "end":
+                    self.verifier.record("end")
+            else:
+                simulator.run(until)
+        self.wall_time = time.perf_counter() - started
+        return self.report()
+
+    def _run_to(self, record):
+        simulator = self.simulator
+        while simulator.events_processed < record.events and simulator.step():
+            pass
+        # A real-time clock moves on between events, so a command may have come in after the last one
+        simulator.now = max(simulator.now, record.time)
+
+    def apply(self, record):
+        fleet_manager = self.fleet_manager
+        get_vertex = self.nav_graph.get_vertex_by_id
+        kind = record.kind
+        if kind == "spawn":
+            fleet_manager.spawn_robot(get_vertex(record.a))
+        elif kind == "assign":
+            fleet_manager.assign_task(fleet_manager.robots[record.robot], get_vertex(record.a))
+        elif kind == "stop_all":
+            fleet_manager.stop_all_robots()
+        elif kind == "order":
+            self.root.dispatcher.submit(get_vertex(record.a), get_vertex(record.b) if record.b >= 0 else None)
+        elif kind == "set_lane_cost":
+            fleet_manager.set_lane_cost(record.a, record.b, None if math.isnan(record.value) else record.value)
+        elif kind in ("block_vertex", "unblock_vertex"):
+            getattr(fleet_manager, kind)(record.a)
+        else:
+            getattr(fleet_manager, kind)(record.a, record.b)
+
+    def report(self):
+        divergence = self.verifier.divergence
+        robots = self.fleet_manager.robots.values()
+        if hasattr(self.root, "report"):
+            run_report = self.root.report(self.wall_time)
+        else:
+            run_report = {
+                "robots": len(self.fleet_manager.robots),
+                "tasks_completed": sum(robot.tasks_completed for robot in robots),
+                "total_wait_time": sum(robot.total_wait(self.simulator.now) for robot in robots),
+                "deadlocks": self.fleet_manager.deadlocks_resolved,
+                "deadlocks_detected": self.fleet_manager.deadlocks_detected
+            }
+        return {
+            "records": len(self.records),
+            "records_matched": self.verifier.records_matched,
+            "inputs_replayed": self.inputs_replayed,
+            "diverged": divergence is not None,
+            "expected": divergence[0]._asdict() if divergence is not None and divergence[0] is not None else None,
+            "actual": divergence[1]._asdict() if divergence is not None else None,
+            "time": self.simulator.now,
+            "events_processed": self.simulator.events_processed,
+            "wall_time": self.wall_time,
+            "run": run_report
+        }
+
+    def close(self):
+        self.fleet_manager.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a fleet journal headless and check it reproduces the run.")
+    parser.add_argument("journal", help="journal written by src.sim --journal or the GUI")
+    parser.add_argument("--graph", default=os.path.join(os.path.dirname(__file__), '..', 'data', 'nav_graph.json'),
+                        help="navigation graph file the journal was recorded on")
+    parser.add_argument("--until", type=float, default=None,
+                        help="stop at this simulated time instead of at the end of the journal")
+    parser.add_argument("--checkpoint", default=None,
+                        help="save the simulation state here when the replay stops; a checkpoint of a src.sim run "
+                             "resumes with src.sim --resume")
+    parser.add_argument("--log", default=None, help="fleet log file for the replay (defaults to next to the journal)")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    nav_graph = NavGraph.from_file(args.graph)
+    replay = JournalReplay(args.journal, nav_graph, log_file=args.log)
+    report = replay.run(args.until)
+    if args.checkpoint:
+        save_checkpoint(args.checkpoint, replay.root, nav_graph)
+    replay.close()
+    write_report(report, args.output)
+    # A non-zero exit lets a bisection script tell a diverging build from a good one
+    if report["diverged"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
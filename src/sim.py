@@ -0,0 +1,419 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.models.nav_graph import NavGraph
+from src.controllers.fleet_manager import FleetManager
+from src.controllers.traffic_manager import TrafficManager
+from src.controllers.simulator import Simulator
+from src.controllers.task_dispatcher import TaskDispatcher
+from src.controllers.zone_worker import load_graph, run_zone_worker
+from src.utils.checkpoint import load_checkpoint, save_checkpoint
+from src.utils.event_journal import EventJournal
+from src.utils.graph_partition import partition_vertices
+from src.utils.telemetry import Telemetry
+
+
+def load_records(filename):
+    if filename.lower().endswith(".csv"):
+        with open(filename, newline='') as file:
+            return list(csv.DictReader(file))
+
+    with open(filename, 'r') as file:
+        data = json.load(file)
+    if isinstance(data, dict):
+        data = data.get("robots", data.get("tasks", []))
+    return data
+
+
+def resolve_vertex(nav_graph, ref):
+    if isinstance(ref, dict):
+        ref = ref.get("vertex")
+    if isinstance(ref, str) and not ref.isdigit():
+        vertex = nav_graph.get_vertex_by_name(ref)
+        if vertex is None:
+            raise ValueError(f"Unknown vertex: {ref}")
+        return vertex
+
+    vertex = nav_graph.get_vertex_by_id(int(ref))
+    if vertex is None:
+        raise ValueError(f"Unknown vertex: {ref}")
+    return vertex
+
+
+class BatchRunner:
+    def __init__(self, graph_data, spawns, tasks, log_file=None, structured_logs=False, reservations=False,
+                 deadlock_policy="replan", vertex_occupancy=False, dispatch_interval=TaskDispatcher.DEFAULT_INTERVAL,
+                 max_chain=1, battery=False, telemetry=None):
+        self.nav_graph = graph_data if isinstance(graph_data, NavGraph) else NavGraph(graph_data)
+        self.simulator = Simulator(realtime=False)
+        self.fleet_manager = FleetManager(self.nav_graph, TrafficManager(), self.simulator,
+                                          log_file=log_file, structured_logs=structured_logs,
+                                          reservations=reservations, deadlock_policy=deadlock_policy,
+                                          vertex_occupancy=vertex_occupancy, battery=battery,
+                                          telemetry=telemetry)
+        self.fleet_manager.task_listeners.append(self.on_task_completed)
+        self.fleet_manager.stop_listeners.append(self.on_robot_stopped)
+        if self.fleet_manager.energy_manager is not None:
+            self.fleet_manager.energy_manager.charge_listeners.append(self.on_robot_charged)
+        # Tasks without a robot go through the dispatcher, which batches them onto the best placed robots
+        self.dispatcher = TaskDispatcher(self.fleet_manager, dispatch_interval, max_chain=max_chain)
+
+        self.backlog = {}
+        self.tasks_submitted = 0
+        self.tasks_rejected = 0
+        self.last_completion = 0.0
+
+        for spawn in spawns:
+            vertex = resolve_vertex(self.nav_graph, spawn)
+            if self.fleet_manager.spawn_robot(vertex) is None:
+                raise ValueError(f"Vertex {vertex['name']} has no room for another robot")
+
+        for task in tasks:
+            submit_time = float(task.get("time", 0))
+            if task.get("robot") in (None, ""):
+                pickup = resolve_vertex(self.nav_graph, task.get("pickup", task.get("target")))
+                dropoff = None
+                if task.get("dropoff") not in (None, ""):
+                    dropoff = resolve_vertex(self.nav_graph, task["dropoff"])
+                self.simulator.schedule_at(submit_time, self.submit_order, pickup, dropoff)
+                continue
+
+            robot_id = int(task["robot"])
+            if robot_id not in self.fleet_manager.robots:
+                raise ValueError(f"Task refers to unknown robot {robot_id}")
+            target = resolve_vertex(self.nav_graph, task["target"])
+            self.simulator.schedule_at(submit_time, self.submit_task, robot_id, target)
+
+    def submit_task(self, robot_id, target):
+        self.tasks_submitted += 1
+        self.backlog.setdefault(robot_id, []).append(target)
+        robot = self.fleet_manager.robots[robot_id]
+        if robot.status not in ("moving", "waiting"):
+            self.dispatch(robot)
+
+    def submit_order(self, pickup, dropoff):
+        self.tasks_submitted += 1
+        self.dispatcher.submit(pickup, dropoff)
+
+    def on_task_completed(self, robot):
+        self.last_completion = self.simulator.now
+        # Defer so the robot has fully settled before it is handed its next task
+        self.simulator.schedule(0, self.dispatch, robot)
+
+    def on_robot_stopped(self, robot):
+        # A robot that abandoned its task moves on to the next one
+        self.simulator.schedule(0, self.dispatch, robot)
+
+    def on_robot_charged(self, robot):
+        self.simulator.schedule(0, self.dispatch, robot)
+
+    def dispatch(self, robot):
+        queue = self.backlog.get(robot.id)
+        while queue and robot.status not in ("moving", "waiting"):
+            target = queue.pop(0)
+            success, message = self.fleet_manager.assign_task(robot, target)
+            if message == "Battery too low":
+                # Off to charge; the task waits for the robot
+                queue.insert(0, target)
+                break
+            if not success:
+                self.tasks_rejected += 1
+
+    @classmethod
+    def resume(cls, filename, nav_graph, log_file=None):
+        # Warm start from a checkpoint; the log carries on where the checkpointed run's left off unless moved
+        runner = load_checkpoint(filename, nav_graph)
+        if log_file is not None:
+            runner.fleet_manager.open_log(log_file, append=True)
+        return runner
+
+    def save_checkpoint(self, filename):
+        with self.simulator.lock:
+            return save_checkpoint(filename, self, self.nav_graph)
+
+    def start_journal(self, filename):
+        return EventJournal(filename, self, self.nav_graph)
+
+    def run(self, until=None, checkpoint_file=None, checkpoint_at=None):
+        started = time.perf_counter()
+        if checkpoint_file is not None:
+            # Stopping between two events leaves nothing half done, so resuming the checkpoint carries on
+            # exactly like this run does
+            self.simulator.run(checkpoint_at if until is None or checkpoint_at is None else min(checkpoint_at, until))
+            self.save_checkpoint(checkpoint_file)
+        self.simulator.run(until)
+        self.fleet_manager.close()
+        return self.report(time.perf_counter() - started)
+
+    def report(self, wall_time):
+        robots = self.fleet_manager.robots.values()
+        now = self.simulator.now
+        makespan = self.last_completion
+        tasks_completed = sum(robot.tasks_completed for robot in robots)
+
+        return {
+            "robots": len(self.fleet_manager.robots),
+            "tasks_submitted": self.tasks_submitted,
+            "tasks_completed": tasks_completed,
+            "tasks_rejected": self.tasks_rejected,
+            "makespan": makespan,
+            "throughput_per_hour": tasks_completed * 3600 / makespan if makespan > 0 else 0.0,
+            "total_wait_time": sum(robot.total_wait(now) for robot in robots),
+            "robot_wait_time": {str(robot.id): robot.total_wait(now) for robot in robots},
+            "lane_utilization": {
+                f"{start}-{end}": busy / makespan if makespan > 0 else 0.0
+                for (start, end), busy in sorted(self.fleet_manager.lane_busy_time.items())
+            },
+            "deadlocks": self.fleet_manager.deadlocks_resolved,
+            "deadlocks_detected": self.fleet_manager.deadlocks_detected,
+            "dispatcher": self.dispatcher.stats(),
+            "energy": self.fleet_manager.energy_manager.stats() if self.fleet_manager.energy_manager else None,
+            "telemetry": self.fleet_manager.telemetry.snapshot() if self.fleet_manager.telemetry else None,
+            "events_processed": self.simulator.events_processed,
+            "wall_time": wall_time
+        }
+
+
+class ShardedRunner:
+    # Splits the graph into spatial zones, each simulated by its own worker process with its own lane table.
+    # Workers run in lockstep windows of simulated time and swap the robots crossing a zone boundary in between
+    DEFAULT_SYNC_INTERVAL = 0.5
+
+    def __init__(self, graph_source, spawns, tasks, workers, sync_interval=DEFAULT_SYNC_INTERVAL, log_file=None,
+                 structured_logs=False, deadlock_policy="replan"):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.graph_source = graph_source
+        self.nav_graph = load_graph(graph_source)
+        self.workers = workers
+        self.sync_interval = sync_interval
+        self.log_file = log_file if log_file is not None else FleetManager.DEFAULT_LOG_FILE
+        self.structured_logs = structured_logs
+        self.deadlock_policy = deadlock_policy
+        self.zones = partition_vertices(self.nav_graph, workers)
+        self.windows = 0
+
+        spawn_ids = [resolve_vertex(self.nav_graph, spawn)["id"] for spawn in spawns]
+        backlogs = {robot_id: [] for robot_id in range(1, len(spawn_ids) + 1)}
+        self.task_times = []
+        for task in tasks:
+            if task.get("robot") in (None, ""):
+                raise ValueError("Sharded runs need a robot on every task; orders go through the single-process dispatcher")
+            robot_id = int(task["robot"])
+            if robot_id not in backlogs:
+                raise ValueError(f"Task refers to unknown robot {robot_id}")
+            submit_time = float(task.get("time", 0))
+            backlogs[robot_id].append((submit_time, resolve_vertex(self.nav_graph, task["target"])["id"]))
+            self.task_times.append(submit_time)
+
+        # Each robot starts in the zone it spawns in and carries its own task script from zone to zone
+        self.zone_robots = [[] for _ in range(workers)]
+        for robot_id, vertex_id in enumerate(spawn_ids, 1):
+            backlog = sorted(backlogs[robot_id], key=lambda entry: entry[0])
+            self.zone_robots[self.zones[vertex_id]].append((robot_id, vertex_id, backlog))
+
+    def zone_log_file(self, zone_id):
+        root, ext = os.path.splitext(self.log_file)
+        return f"{root}.zone{zone_id}{ext}"
+
+    def run(self, until=None):
+        started = time.perf_counter()
+        context = multiprocessing.get_context()
+        connections = []
+        processes = []
+        for zone_id in range(self.workers):
+            connection, worker_connection = context.Pipe()
+            process = context.Process(target=run_zone_worker,
+                                      args=(worker_connection, zone_id, self.graph_source, self.zones,
+                                            self.zone_robots[zone_id], self.zone_log_file(zone_id),
+                                            self.structured_logs, self.deadlock_policy))
+            process.daemon = True
+            process.start()
+            worker_connection.close()
+            connections.append(connection)
+            processes.append(process)
+
+        try:
+            now = self._run_windows(connections, until)
+            for connection in connections:
+                connection.send(("report",))
+            reports = [connection.recv() for connection in connections]
+            for connection in connections:
+                connection.send(("stop",))
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        return self.report(reports, now, until, time.perf_counter() - started)
+
+    def _run_windows(self, connections, until):
+        now = 0.0
+        skip_to = None
+        inboxes = [[] for _ in connections]
+        while True:
+            target = now + self.sync_interval
+            if skip_to is not None:
+                target = max(target, skip_to)
+            if until is not None:
+                target = min(target, until)
+
+            for zone_id, connection in enumerate(connections):
+                connection.send(("advance", target, inboxes[zone_id]))
+            inboxes = [[] for _ in connections]
+            next_times = []
+            for connection in connections:
+                outbox, next_time = connection.recv()
+                for owner, state in outbox:
+                    inboxes[owner].append(state)
+                if next_time is not None:
+                    next_times.append(next_time)
+            self.windows += 1
+            now = target
+
+            in_flight = any(inboxes)
+            # Robots crossing a boundary at the cut-off are delivered in one more window at the same time, so
+            # the report still finds them in a zone
+            if not in_flight and ((until is not None and now >= until) or not next_times):
+                return now
+            # With nobody crossing a boundary, every worker can jump straight to the earliest pending event
+            skip_to = None if in_flight else min(next_times)
+
+    def report(self, reports, now, until, wall_time):
+        robots = {}
+        lane_busy_time = {}
+        for zone_report in reports:
+            robots.update(zone_report["robots"])
+            # Each lane is owned by one zone, so no lane is counted twice
+            lane_busy_time.update(zone_report["lane_busy_time"])
+        makespan = max(zone_report["last_completion"] for zone_report in reports)
+        tasks_completed = sum(completed for _, completed in robots.values())
+
+        return {
+            "robots": len(robots),
+            "tasks_submitted": sum(1 for submit_time in self.task_times if until is None or submit_time <= now),
+            "tasks_completed": tasks_completed,
+            "tasks_rejected": sum(zone_report["tasks_rejected"] for zone_report in reports),
+            "makespan": makespan,
+            "throughput_per_hour": tasks_completed * 3600 / makespan if makespan > 0 else 0.0,
+            "total_wait_time": sum(wait for wait, _ in robots.values()),
+            "robot_wait_time": {str(robot_id): robots[robot_id][0] for robot_id in sorted(robots)},
+            "lane_utilization": {
+                f"{start}-{end}": busy / makespan if makespan > 0 else 0.0
+                for (start, end), busy in sorted(lane_busy_time.items())
+            },
+            "deadlocks": sum(zone_report["deadlocks"] for zone_report in reports),
+            "deadlocks_detected": sum(zone_report["deadlocks_detected"] for zone_report in reports),
+            "workers": self.workers,
+            "handoffs": sum(zone_report["handoffs_sent"] for zone_report in reports),
+            "sync_windows": self.windows,
+            "events_processed": sum(zone_report["events_processed"] for zone_report in reports),
+            "wall_time": wall_time
+        }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the fleet simulation headless and report performance metrics.")
+    parser.add_argument("--graph", default=os.path.join(os.path.dirname(__file__), '..', 'data', 'nav_graph.json'),
+                        help="navigation graph file (JSON, or binary compiled with src.utils.graph_io)")
+    parser.add_argument("--robots", help="robot spawn list (JSON or CSV with a 'vertex' column)")
+    parser.add_argument("--tasks",
+                        help="task script (JSON or CSV with time, robot, target columns; "
+                             "rows without a robot are dispatcher orders with pickup and dropoff)")
+    parser.add_argument("--until", type=float, default=None, help="stop after this much simulated time")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    parser.add_argument("--log", default=None, help="fleet log file (defaults to logs/fleet_logs.txt in the repository)")
+    parser.add_argument("--json-log", action="store_true", help="write the fleet log as JSON lines")
+    parser.add_argument("--reservations", action="store_true",
+                        help="plan each task around the routes other robots have already booked")
+    parser.add_argument("--deadlock-policy", choices=FleetManager.DEADLOCK_POLICIES, default="replan",
+                        help="how the youngest robot in a wait-for cycle yields")
+    parser.add_argument("--dispatch-interval", type=float, default=TaskDispatcher.DEFAULT_INTERVAL,
+                        help="seconds of simulated time between batch assignments of tasks without a robot")
+    parser.add_argument("--max-chain", type=int, default=1,
+                        help="tasks a busy robot may have lined up behind its current one")
+    parser.add_argument("--battery", action="store_true",
+                        help="drain robot batteries with travel and send low robots to charge")
+    parser.add_argument("--vertex-occupancy", action="store_true",
+                        help="limit how many robots may stand on each vertex (its 'capacity' attribute, default 1)")
+    parser.add_argument("--metrics", default=None,
+                        help="collect telemetry and export it here while running (JSON if the name ends in .json, "
+                             "Prometheus text otherwise)")
+    parser.add_argument("--metrics-interval", type=float, default=5.0,
+                        help="wall-clock seconds between telemetry exports")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="split the graph into this many zones, each simulated in its own process")
+    parser.add_argument("--sync-interval", type=float, default=ShardedRunner.DEFAULT_SYNC_INTERVAL,
+                        help="seconds of simulated time between zone handoffs when running with --workers")
+    parser.add_argument("--journal", default=None,
+                        help="record spawns, task assignments and lane grants and releases here for src.replay")
+    parser.add_argument("--checkpoint", default=None,
+                        help="save the whole simulation state here, at --checkpoint-at or when the run ends")
+    parser.add_argument("--checkpoint-at", type=float, default=None,
+                        help="simulated time at which to write --checkpoint")
+    parser.add_argument("--resume", default=None,
+                        help="carry on from a checkpoint instead of starting from --robots and --tasks; it needs "
+                             "the --graph it was taken on and keeps that run's other settings")
+    args = parser.parse_args(argv)
+    if args.resume is None and (args.robots is None or args.tasks is None):
+        parser.error("--robots and --tasks are required unless resuming from a checkpoint")
+    if args.workers > 1 and (args.journal or args.checkpoint or args.resume):
+        parser.error("--workers cannot be combined with --journal, --checkpoint or --resume")
+    if args.workers > 1 and (args.reservations or args.battery or args.vertex_occupancy or args.metrics):
+        parser.error("--workers cannot be combined with --reservations, --battery, --vertex-occupancy or --metrics")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.workers > 1:
+        runner = ShardedRunner(args.graph, load_records(args.robots), load_records(args.tasks), args.workers,
+                               args.sync_interval, log_file=args.log, structured_logs=args.json_log,
+                               deadlock_policy=args.deadlock_policy)
+        report = runner.run(args.until)
+        write_report(report, args.output)
+        return
+
+    telemetry = Telemetry() if args.metrics else None
+    if args.resume:
+        runner = BatchRunner.resume(args.resume, NavGraph.from_file(args.graph), log_file=args.log)
+        # Metrics are not part of a checkpoint; a resumed run counts from here on
+        if telemetry is not None:
+            runner.fleet_manager.telemetry = telemetry
+            runner.fleet_manager.traffic_manager.telemetry = telemetry
+            runner.nav_graph.planner.telemetry = telemetry
+    else:
+        runner = BatchRunner(NavGraph.from_file(args.graph), load_records(args.robots), load_records(args.tasks),
+                             log_file=args.log, structured_logs=args.json_log, reservations=args.reservations,
+                             deadlock_policy=args.deadlock_policy, vertex_occupancy=args.vertex_occupancy,
+                             dispatch_interval=args.dispatch_interval, max_chain=args.max_chain,
+                             battery=args.battery, telemetry=telemetry)
+    if args.journal:
+        runner.start_journal(args.journal)
+    if telemetry is not None:
+        # The fleet manager stops the exporter when it closes, which writes the final numbers
+        telemetry.start_export(args.metrics, args.metrics_interval)
+    report = runner.run(args.until, args.checkpoint, args.checkpoint_at)
+    write_report(report, args.output)
+
+
+def write_report(report, filename=None):
+    output = json.dumps(report, indent=2)
+    if filename:
+        with open(filename, 'w') as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    # Run the importable copy of this module, so checkpoints refer to src.sim.BatchRunner rather than __main__
+    from src.sim import main as sim_main
+    sim_main()
\ No newline at end of file
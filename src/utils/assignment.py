@@ -0,0 +1,77 @@
+import math
+
+
+def solve_assignment(costs):
+    # Minimum total cost matching of rows to distinct columns (Hungarian method with shortest augmenting
+    # paths, O(n^2 m) for n <= m). Returns the column picked for each row, or None for rows left over when
+    # there are more rows than columns. Pairs with an infinite cost are never returned
+    row_count = len(costs)
+    column_count = len(costs[0]) if row_count else 0
+    if row_count == 0 or column_count == 0:
+        return [None] * row_count
+
+    if row_count > column_count:
+        rows_for_columns = solve_assignment([list(column) for column in zip(*costs)])
+        result = [None] * row_count
+        for column, row in enumerate(rows_for_columns):
+            if row is not None:
+                result[row] = column
+        return result
+
+    # Infinite entries become a penalty larger than any complete finite assignment
+    largest = max((abs(cost) for row in costs for cost in row if cost != math.inf), default=0.0)
+    penalty = (largest + 1.0) * (row_count + 1)
+    matrix = [[penalty if cost == math.inf else cost for cost in row] for row in costs]
+
+    # Potentials and matching are 1-based; column 0 is a virtual column holding the row being inserted
+    u = [0.0] * (row_count + 1)
+    v = [0.0] * (column_count + 1)
+    match = [0] * (column_count + 1)
+    way = [0] * (column_count + 1)
+
+    for row in range(1, row_count + 1):
+        match[0] = row
+        column = 0
+        min_slack = [math.inf] * (column_count + 1)
+        free_columns = list(range(1, column_count + 1))
+        used_columns = [0]
+
+        while True:
+            current_row = match[column]
+            costs_row = matrix[current_row - 1]
+            u_row = u[current_row]
+            delta = math.inf
+            next_column = 0
+            for j in free_columns:
+                slack = costs_row[j - 1] - u_row - v[j]
+                if slack < min_slack[j]:
+                    min_slack[j] = slack
+                    way[j] = column
+                if min_slack[j] < delta:
+                    delta = min_slack[j]
+                    next_column = j
+
+            for j in used_columns:
+                u[match[j]] += delta
+                v[j] -= delta
+            for j in free_columns:
+                min_slack[j] -= delta
+
+            column = next_column
+            free_columns.remove(column)
+            used_columns.append(column)
+            if match[column] == 0:
+                break
+
+        # Flip the augmenting path back to the virtual column
+        while column:
+            previous = way[column]
+            match[column] = match[previous]
+            column = previous
+
+    result = [None] * row_count
+    for column in range(1, column_count + 1):
+        row = match[column]
+        if row and costs[row - 1][column - 1] != math.inf:
+            result[row - 1] = column - 1
+    return result
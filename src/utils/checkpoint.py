@@ -0,0 +1,85 @@
+import hashlib
+import io
+import math
+import pickle
+import struct
+import zlib
+from array import array
+
+CHECKPOINT_MAGIC = b"FLTCKPT2"
+# Magic, then the vertex count and a SHA-256 of the coordinates and lanes of the graph the checkpoint was taken on
+HEADER = struct.Struct("<8sI32s")
+
+
+class _CheckpointPickler(pickle.Pickler):
+    # The graph is loaded from its own file on restore, so it is written as a reference instead of a copy
+    def __init__(self, file, nav_graph):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.shared = {id(nav_graph): "graph", id(nav_graph.vertex_store): "vertex_store",
+                       id(nav_graph.planner): "planner"}
+
+    def persistent_id(self, obj):
+        return self.shared.get(id(obj))
+
+
+class _CheckpointUnpickler(pickle.Unpickler):
+    def __init__(self, file, nav_graph):
+        super().__init__(file)
+        self.shared = {"graph": nav_graph, "vertex_store": nav_graph.vertex_store, "planner": nav_graph.planner}
+
+    def persistent_load(self, pid):
+        return self.shared[pid]
+
+
+def graph_digest(vertex_store, lanes):
+    # Lanes are hashed in list order with their custom cost (NaN for none), as the planners see them
+    digest = hashlib.sha256()
+    digest.update(vertex_store.xs)
+    digest.update(vertex_store.ys)
+    digest.update(array('q', [lane["start"] for lane in lanes]))
+    digest.update(array('q', [lane["end"] for lane in lanes]))
+    digest.update(array('d', [math.nan if lane["cost"] is None else lane["cost"] for lane in lanes]))
+    return digest.digest()
+
+
+def dumps_checkpoint(root, nav_graph):
+    # root is whatever owns the simulation (a BatchRunner, or a bare FleetManager); take it between events, with
+    # the simulator lock held, so nothing is half done. The map edits are pickled ahead of the fleet so a
+    # checkpoint can be checked against the graph before any of the fleet is rebuilt
+    buffer = io.BytesIO()
+    pickler = _CheckpointPickler(buffer, nav_graph)
+    pickler.dump(nav_graph.runtime_state())
+    pickler.dump(root)
+    header = HEADER.pack(CHECKPOINT_MAGIC, len(nav_graph.vertex_store),
+                         graph_digest(nav_graph.vertex_store, nav_graph.lanes))
+    return header + zlib.compress(buffer.getvalue())
+
+
+def loads_checkpoint(data, nav_graph):
+    # nav_graph must be freshly loaded from the file the checkpointed run used; map edits are reapplied to it
+    magic, vertex_count, digest = HEADER.unpack_from(data)
+    if magic != CHECKPOINT_MAGIC:
+        raise ValueError("Not a fleet checkpoint")
+    if vertex_count != len(nav_graph.vertex_store):
+        raise ValueError(f"Checkpoint was taken on a graph with {vertex_count} vertices, "
+                         f"not {len(nav_graph.vertex_store)}")
+    payload = zlib.decompress(data[HEADER.size:])
+    unpickler = _CheckpointUnpickler(io.BytesIO(payload), nav_graph)
+    graph_state = unpickler.load()
+    lanes = graph_state["lanes"] if graph_state is not None else nav_graph.lanes
+    if graph_digest(nav_graph.vertex_store, lanes) != digest:
+        raise ValueError("Checkpoint was taken on a graph with different vertex positions or lanes")
+    nav_graph.restore_runtime_state(graph_state)
+    return unpickler.load()
+
+
+def save_checkpoint(filename, root, nav_graph):
+    data = dumps_checkpoint(root, nav_graph)
+    with open(filename, 'wb') as file:
+        file.write(data)
+    return len(data)
+
+
+def load_checkpoint(filename, nav_graph):
+    with open(filename, 'rb') as file:
+        return loads_checkpoint(file.read(), nav_graph)
@@ -0,0 +1,114 @@
+import math
+import struct
+from collections import namedtuple
+
+from src.utils.checkpoint import dumps_checkpoint, loads_checkpoint
+
+JOURNAL_MAGIC = b"FLTJRNL1"
+# Magic, then the size of the checkpoint the journal starts from
+HEADER = struct.Struct("<8sQ")
+# kind, external, simulated time, events processed before it, robot, two ids (vertices or a lane's ends), a value
+RECORD = struct.Struct("<B?dqiiid")
+
+KINDS = ("spawn", "assign", "stop_all", "block_lane", "unblock_lane", "block_vertex", "unblock_vertex",
+         "set_lane_cost", "order", "lane_granted", "lane_released", "task_completed", "end")
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+# Commands a replay feeds back in when they came from outside the simulation (the GUI, a script); the same
+# commands issued from inside an event are reproduced by the simulation itself
+INPUT_KINDS = frozenset(KINDS[:9])
+
+JournalRecord = namedtuple("JournalRecord", ("kind", "external", "time", "events", "robot", "a", "b", "value"))
+
+
+def pack_record(simulator, kind, robot=-1, a=-1, b=-1, value=0.0):
+    return RECORD.pack(KIND_CODES[kind], not simulator.dispatching, simulator.now, simulator.events_processed,
+                       robot, a, b, math.nan if value is None else value)
+
+
+def unpack_record(data, offset=0):
+    code, *fields = RECORD.unpack_from(data, offset)
+    return JournalRecord(KINDS[code], *fields)
+
+
+def is_input(record):
+    return record.external and record.kind in INPUT_KINDS
+
+
+class EventJournal:
+    # Append-only binary journal of a fleet: a checkpoint of where it started, then one fixed-size record per
+    # command, task completion and lane grant or release. Every record carries the number of events processed
+    # before it, so a replay can feed each outside command back in between exactly the same two events
+    def __init__(self, filename, root, nav_graph):
+        self.filename = filename
+        self.fleet_manager = getattr(root, "fleet_manager", root)
+        self.simulator = self.fleet_manager.simulator
+        self.records_written = 0
+        with self.simulator.lock:
+            checkpoint = dumps_checkpoint(root, nav_graph)
+            self.file = open(filename, 'wb')
+            self.file.write(HEADER.pack(JOURNAL_MAGIC, len(checkpoint)))
+            self.file.write(checkpoint)
+            self.fleet_manager.journal = self
+
+    def record(self, kind, robot=-1, a=-1, b=-1, value=0.0):
+        if self.file is None:
+            return
+        self.file.write(pack_record(self.simulator, kind, robot, a, b, value))
+        self.records_written += 1
+        if kind in INPUT_KINDS and not self.simulator.dispatching:
+            # Outside commands are rare; flushing them keeps a crashed session replayable up to its last one
+            self.file.flush()
+
+    def close(self):
+        if self.file is None:
+            return
+        with self.simulator.lock:
+            self.record("end")
+            self.file.close()
+            self.file = None
+            if self.fleet_manager.journal is self:
+                self.fleet_manager.journal = None
+
+
+def read_journal(filename, nav_graph):
+    # Returns the restored root object and the raw records; a journal cut short by a crash ends in a partial
+    # record, and everything before it is still good
+    with open(filename, 'rb') as file:
+        data = file.read()
+    magic, checkpoint_size = HEADER.unpack_from(data)
+    if magic != JOURNAL_MAGIC:
+        raise ValueError(f"{filename} is not a fleet journal")
+    start = HEADER.size + checkpoint_size
+    root = loads_checkpoint(data[HEADER.size:start], nav_graph)
+    body = data[start:]
+    return root, body[:len(body) - len(body) % RECORD.size]
+
+
+def iter_records(body):
+    for offset in range(0, len(body), RECORD.size):
+        yield unpack_record(body, offset)
+
+
+class JournalVerifier:
+    # Takes the journal's place during a replay and checks each record against the one written originally; the
+    # first mismatch is where the replay stopped reproducing the recorded run
+    def __init__(self, simulator, body):
+        self.simulator = simulator
+        self.body = body
+        self.offset = 0
+        self.records_matched = 0
+        self.divergence = None
+
+    def record(self, kind, robot=-1, a=-1, b=-1, value=0.0):
+        if self.divergence is not None:
+            return
+        packed = pack_record(self.simulator, kind, robot, a, b, value)
+        expected = self.body[self.offset:self.offset + RECORD.size]
+        self.offset += RECORD.size
+        if packed == expected:
+            self.records_matched += 1
+        else:
+            self.divergence = (unpack_record(expected) if expected else None, unpack_record(packed))
+
+    def close(self):
+        pass
@@ -0,0 +1,124 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+
+class FleetLogger:
+    def __init__(self, path, structured=False, batch_size=256, flush_interval=0.5,
+                 max_bytes=10 * 1024 * 1024, backup_count=3, append=False):
+        self.path = path
+        self.structured = structured
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        # SimpleQueue.put never blocks, so robot callbacks only pay for an append
+        self.records = queue.SimpleQueue()
+        self.closed = False
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Appending continues the log of a run restored from a checkpoint
+        self.file = open(path, 'a' if append else 'w')
+        if not structured and not append:
+            self.file.write(f"=== Fleet Management System Log - {datetime.now()} ===\n")
+        self.file.flush()
+
+        self.writer = threading.Thread(target=self._run)
+        self.writer.daemon = True
+        self.writer.start()
+        atexit.register(self.close)
+
+    def log(self, message, event=None, robot=None, vertex=None, lane=None):
+        self.records.put((time.time(), time.monotonic(), message, event, robot, vertex, lane))
+
+    def flush(self):
+        if self.closed:
+            return
+        done = threading.Event()
+        self.records.put(done)
+        done.wait()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        # The exit hook holds a reference; dropping it lets closed loggers be freed
+        atexit.unregister(self.close)
+        self.records.put(None)
+        self.writer.join()
+        self.file.close()
+
+    def _run(self):
+        batch = []
+        last_flush = time.monotonic()
+
+        while True:
+            timeout = max(self.flush_interval - (time.monotonic() - last_flush), 0.0)
+            try:
+                item = self.records.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+
+            stop = item is None
+            flush_requested = isinstance(item, threading.Event)
+            if item and not flush_requested:
+                batch.append(item)
+                # Drain whatever else is already queued without blocking
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self.records.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None or isinstance(item, threading.Event):
+                        stop = item is None
+                        flush_requested = not stop
+                        break
+                    batch.append(item)
+
+            due = time.monotonic() - last_flush >= self.flush_interval
+            if batch and (len(batch) >= self.batch_size or due or stop or flush_requested):
+                self._write(batch)
+                batch = []
+            if due or stop or flush_requested:
+                self.file.flush()
+                last_flush = time.monotonic()
+            if flush_requested:
+                item.set()
+            if stop:
+                return
+
+    def _write(self, batch):
+        self.file.write("".join(self._format(record) for record in batch))
+        if self.max_bytes and self.file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _format(self, record):
+        wall_time, monotonic_time, message, event, robot, vertex, lane = record
+        if self.structured:
+            return json.dumps({
+                "time": datetime.fromtimestamp(wall_time).isoformat(timespec="milliseconds"),
+                "monotonic": monotonic_time,
+                "event": event,
+                "robot": robot,
+                "vertex": vertex,
+                "lane": list(lane) if lane is not None else None,
+                "message": message
+            }) + "\n"
+
+        timestamp = datetime.fromtimestamp(wall_time).strftime("%H:%M:%S.%f")[:-3]
+        return f"[{timestamp}] {message}\n"
+
+    def _rotate(self):
+        self.file.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        self.file = open(self.path, 'w')
\ No newline at end of file
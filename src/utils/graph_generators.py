@@ -0,0 +1,86 @@
+import math
+import random
+
+from src.utils.spatial_index import GridIndex
+
+
+def grid_graph(columns, rows, spacing=100, lane_removal=0.0, charger_every=50, seed=0):
+    rng = random.Random(seed)
+    vertices = []
+    lanes = []
+
+    for row in range(rows):
+        for column in range(columns):
+            idx = row * columns + column
+            attrs = {"name": f"G{row}_{column}"}
+            if charger_every and idx % charger_every == 0:
+                attrs["is_charger"] = True
+            vertices.append([column * spacing, row * spacing, attrs])
+
+            if column + 1 < columns and rng.random() >= lane_removal:
+                lanes.append([idx, idx + 1])
+            if row + 1 < rows and rng.random() >= lane_removal:
+                lanes.append([idx, idx + columns])
+
+    return {"vertices": vertices, "lanes": lanes}
+
+
+def random_geometric_graph(vertex_count, spacing=100, radius=None, charger_every=50, seed=0):
+    rng = random.Random(seed)
+    side = math.sqrt(vertex_count) * spacing
+    radius = radius if radius is not None else 1.6 * spacing
+
+    vertices = []
+    index = GridIndex(radius)
+    for idx in range(vertex_count):
+        x, y = rng.uniform(0, side), rng.uniform(0, side)
+        attrs = {"name": f"R{idx}"}
+        if charger_every and idx % charger_every == 0:
+            attrs["is_charger"] = True
+        vertices.append([x, y, attrs])
+        index.insert(idx, x, y)
+
+    lanes = []
+    for idx, (x, y, _) in enumerate(vertices):
+        for neighbor in index.query_radius(x, y, radius):
+            if neighbor > idx:
+                lanes.append([idx, neighbor])
+
+    return {"vertices": vertices, "lanes": lanes}
+
+
+def warehouse_graph(aisles, aisle_length, spacing=100, cross_aisle_every=10, charger_every=4):
+    # Vertical storage aisles joined by cross aisles at both ends and every few slots
+    vertices = []
+    lanes = []
+
+    def vertex_id(aisle, slot):
+        return aisle * aisle_length + slot
+
+    for aisle in range(aisles):
+        for slot in range(aisle_length):
+            attrs = {"name": f"W{aisle}_{slot}"}
+            if slot == 0 and charger_every and aisle % charger_every == 0:
+                attrs["is_charger"] = True
+            vertices.append([aisle * spacing * 2, slot * spacing, attrs])
+
+            if slot + 1 < aisle_length:
+                lanes.append([vertex_id(aisle, slot), vertex_id(aisle, slot + 1)])
+
+            is_cross = slot == 0 or slot == aisle_length - 1 or (cross_aisle_every and slot % cross_aisle_every == 0)
+            if is_cross and aisle + 1 < aisles:
+                lanes.append([vertex_id(aisle, slot), vertex_id(aisle + 1, slot)])
+
+    return {"vertices": vertices, "lanes": lanes}
+
+
+def make_graph(kind, vertex_count, seed=0):
+    if kind == "grid":
+        side = max(int(math.sqrt(vertex_count)), 2)
+        return grid_graph(side, side, lane_removal=0.1, seed=seed)
+    if kind == "random":
+        return random_geometric_graph(vertex_count, seed=seed)
+    if kind == "warehouse":
+        aisle_length = max(int(math.sqrt(vertex_count / 2)), 2)
+        return warehouse_graph(max(vertex_count // aisle_length, 2), aisle_length)
+    raise ValueError(f"Unknown graph kind: {kind}")
\ No newline at end of file
@@ -0,0 +1,220 @@
+import argparse
+import json
+import math
+import mmap
+import re
+import struct
+import sys
+from array import array
+
+from src.models.vertex_store import VertexStore
+
+BINARY_MAGIC = b"NAVGRAPH"
+BINARY_VERSION = 2
+# magic, format version, byte order (1 little / 2 big), vertex count, lane count, name bytes
+BINARY_HEADER = struct.Struct("<8sIIQQQ")
+BYTE_ORDER_CODES = {"little": 1, "big": 2}
+WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+
+class _JsonStream:
+    # Decodes one JSON value at a time from a file, keeping only the unread tail of the current chunk in memory
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Malformed graph file: expected {char!r} near offset {self.pos}")
+        self.pos += 1
+
+    def delimiter(self, close):
+        # Consume a ',' or the closing bracket; True once the container is finished
+        char = self.peek()
+        self.pos += 1
+        if char == close:
+            return True
+        if char != ",":
+            raise ValueError(f"Malformed graph file: expected ',' or {close!r} near offset {self.pos}")
+        return False
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A bare number at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_graph_json(filename, chunk_size=1 << 16):
+    # Yields ("vertex", record) and ("lane", record) in file order without materializing the whole document
+    with open(filename, 'r') as file:
+        stream = _JsonStream(file, chunk_size)
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+
+        while True:
+            key = stream.value()
+            stream.expect(":")
+            if key in ("vertices", "lanes"):
+                kind = "vertex" if key == "vertices" else "lane"
+                stream.expect("[")
+                if stream.peek() == "]":
+                    stream.pos += 1
+                else:
+                    while True:
+                        yield kind, stream.value()
+                        if stream.delimiter("]"):
+                            break
+            else:
+                stream.value()
+
+            if stream.delimiter("}"):
+                return
+
+
+def is_graph_binary(filename):
+    with open(filename, 'rb') as file:
+        return file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def _aligned(offset, alignment=8):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _layout(vertex_count, lane_count, name_bytes):
+    # 8-byte columns first so every cast view starts on a suitable boundary
+    sections = [
+        ("xs", 'd', vertex_count),
+        ("ys", 'd', vertex_count),
+        ("lane_costs", 'd', lane_count),
+        ("name_offsets", 'I', vertex_count + 1),
+        ("lane_starts", 'i', lane_count),
+        ("lane_ends", 'i', lane_count),
+        ("capacities", 'H', vertex_count),
+        ("chargers", 'b', vertex_count),
+        ("name_data", 'B', name_bytes),
+    ]
+    layout = {}
+    offset = BINARY_HEADER.size
+    for name, typecode, count in sections:
+        offset = _aligned(offset)
+        size = array(typecode).itemsize * count
+        layout[name] = (offset, size, typecode)
+        offset += size
+    return layout, offset
+
+
+def write_graph_binary(filename, vertex_store, lanes):
+    lane_starts = array('i')
+    lane_ends = array('i')
+    lane_costs = array('d')
+    for start, end, cost in lanes:
+        lane_starts.append(start)
+        lane_ends.append(end)
+        # NaN marks a lane whose cost is its length
+        lane_costs.append(math.nan if cost is None else cost)
+
+    vertex_count = len(vertex_store)
+    name_data = bytes(vertex_store.name_data)
+    layout, total = _layout(vertex_count, len(lane_starts), len(name_data))
+    columns = {
+        "xs": vertex_store.xs,
+        "ys": vertex_store.ys,
+        "lane_costs": lane_costs,
+        "name_offsets": vertex_store.name_offsets,
+        "lane_starts": lane_starts,
+        "lane_ends": lane_ends,
+        "chargers": vertex_store.chargers,
+        "capacities": vertex_store.capacities,
+    }
+
+    with open(filename, 'wb') as file:
+        file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, BYTE_ORDER_CODES[sys.byteorder],
+                                      vertex_count, len(lane_starts), len(name_data)))
+        for name, (offset, _, _) in layout.items():
+            file.write(b"\0" * (offset - file.tell()))
+            file.write(name_data if name == "name_data" else memoryview(columns[name]).tobytes())
+        file.write(b"\0" * (total - file.tell()))
+
+
+def read_graph_binary(filename):
+    with open(filename, 'rb') as file:
+        header = file.read(BINARY_HEADER.size)
+        magic, version, byte_order, vertex_count, lane_count, name_bytes = BINARY_HEADER.unpack(header)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            raise ValueError(f"{filename} is not a version {BINARY_VERSION} binary nav graph")
+        if byte_order != BYTE_ORDER_CODES[sys.byteorder]:
+            raise ValueError(f"{filename} was written on a machine with a different byte order")
+        # The mapping is shared through the page cache, so every process opening the file reuses the same memory
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    layout, _ = _layout(vertex_count, lane_count, name_bytes)
+    view = memoryview(mapping)
+    columns = {}
+    for name, (offset, size, typecode) in layout.items():
+        columns[name] = view[offset:offset + size].cast(typecode)
+
+    vertex_store = VertexStore.from_columns(columns["xs"], columns["ys"], columns["chargers"],
+                                            columns["capacities"], columns["name_offsets"], columns["name_data"], mapping)
+    return vertex_store, columns["lane_starts"], columns["lane_ends"], columns["lane_costs"]
+
+
+def compile_graph(source, target):
+    vertex_store = VertexStore()
+    lanes = []
+    for kind, record in iter_graph_json(source):
+        if kind == "vertex":
+            x, y, attrs = record
+            vertex_store.append(x, y, attrs.get("name"), attrs.get("is_charger", False), attrs.get("capacity", 1))
+        else:
+            attrs = record[2] if len(record) > 2 else {}
+            lanes.append((record[0], record[1], attrs.get("cost")))
+    write_graph_binary(target, vertex_store, lanes)
+    return len(vertex_store), len(lanes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile a JSON nav graph into the memory-mapped binary format.")
+    parser.add_argument("source", help="nav graph JSON file")
+    parser.add_argument("target", help="binary graph file to write")
+    args = parser.parse_args(argv)
+
+    vertex_count, lane_count = compile_graph(args.source, args.target)
+    print(f"Wrote {vertex_count} vertices and {lane_count} lanes to {args.target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+from array import array
+
+
+def partition_vertices(nav_graph, zone_count):
+    # Recursive coordinate bisection: split the wider side at the vertex that balances the zone counts, so zones
+    # stay compact and hold about the same number of vertices
+    if zone_count < 1:
+        raise ValueError("zone_count must be at least 1")
+    xs, ys = nav_graph.vertex_store.xs, nav_graph.vertex_store.ys
+    zones = array('i', [0]) * len(xs)
+
+    pending = [(list(range(len(xs))), 0, zone_count)]
+    while pending:
+        vertex_ids, first_zone, count = pending.pop()
+        if count == 1 or len(vertex_ids) <= 1:
+            for vertex_id in vertex_ids:
+                zones[vertex_id] = first_zone
+            continue
+
+        width = max(xs[vid] for vid in vertex_ids) - min(xs[vid] for vid in vertex_ids)
+        height = max(ys[vid] for vid in vertex_ids) - min(ys[vid] for vid in vertex_ids)
+        coords = xs if width >= height else ys
+        vertex_ids.sort(key=lambda vid: (coords[vid], vid))
+
+        low_count = count // 2
+        split = len(vertex_ids) * low_count // count
+        pending.append((vertex_ids[:split], first_zone, low_count))
+        pending.append((vertex_ids[split:], first_zone + low_count, count - low_count))
+    return zones
+
+
+def lane_owner(zones, start_id, end_id):
+    # Every lane belongs to exactly one zone, so its reservation lives in exactly one table
+    return min(zones[start_id], zones[end_id])
+
+
+def boundary_lanes(nav_graph, zones):
+    return [key for key in nav_graph.lane_index if zones[key[0]] != zones[key[1]]]
@@ -0,0 +1,195 @@
+import math
+import threading
+
+
+class GridIndex:
+    def __init__(self, cell_size):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = float(cell_size)
+        self.cells = {}
+        self.positions = {}
+        self.cell_bounds = None
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_points(cls, points, target_per_cell=2.0):
+        points = list(points)
+        cell_size = 1.0
+        if len(points) > 1:
+            min_x = min(p[1] for p in points)
+            max_x = max(p[1] for p in points)
+            min_y = min(p[2] for p in points)
+            max_y = max(p[2] for p in points)
+            area = max(max_x - min_x, 1.0) * max(max_y - min_y, 1.0)
+            cell_size = math.sqrt(area * target_per_cell / len(points))
+
+        index = cls(cell_size)
+        for item, x, y in points:
+            index.insert(item, x, y)
+        return index
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def insert(self, item, x, y):
+        with self.lock:
+            if item in self.positions:
+                self._discard(item)
+            self._add(item, x, y)
+
+    def remove(self, item):
+        with self.lock:
+            if item not in self.positions:
+                return False
+            self._discard(item)
+            return True
+
+    def update(self, item, x, y):
+        with self.lock:
+            old = self.positions.get(item)
+            if old is not None and self._cell(old[0], old[1]) == self._cell(x, y):
+                self.positions[item] = (x, y)
+                return
+            if old is not None:
+                self._discard(item)
+            self._add(item, x, y)
+
+    def update_many(self, items, xs, ys, moved=None):
+        # One lock round for a whole batch. moved lists the indexes into items whose cell may have changed, when the
+        # caller already knows; every other item only needs its stored position refreshed
+        with self.lock:
+            positions = self.positions
+            if moved is None:
+                moved = [idx for idx, item in enumerate(items)
+                         if item not in positions or self._cell(*positions[item]) != self._cell(xs[idx], ys[idx])]
+            for idx in moved:
+                item = items[idx]
+                if item in positions:
+                    self._discard(item)
+                self._add(item, xs[idx], ys[idx])
+            positions.update(zip(items, zip(xs, ys)))
+
+    def position(self, item):
+        return self.positions.get(item)
+
+    def _add(self, item, x, y):
+        self.positions[item] = (x, y)
+        cell = self._cell(x, y)
+        self.cells.setdefault(cell, set()).add(item)
+
+        # Bounds only grow; a stale extent just makes nearest() search a little wider
+        if self.cell_bounds is None:
+            self.cell_bounds = [cell[0], cell[1], cell[0], cell[1]]
+        else:
+            bounds = self.cell_bounds
+            bounds[0] = min(bounds[0], cell[0])
+            bounds[1] = min(bounds[1], cell[1])
+            bounds[2] = max(bounds[2], cell[0])
+            bounds[3] = max(bounds[3], cell[1])
+
+    def _discard(self, item):
+        x, y = self.positions.pop(item)
+        cell = self._cell(x, y)
+        bucket = self.cells[cell]
+        bucket.discard(item)
+        if not bucket:
+            del self.cells[cell]
+
+    def query_box(self, min_x, min_y, max_x, max_y):
+        results = []
+        with self.lock:
+            min_cx, min_cy = self._cell(min_x, min_y)
+            max_cx, max_cy = self._cell(max_x, max_y)
+
+            # Sparse maps: walking the occupied cells beats walking the box
+            if (max_cx - min_cx + 1) * (max_cy - min_cy + 1) > len(self.cells):
+                candidates = (
+                    bucket for (cx, cy), bucket in self.cells.items()
+                    if min_cx <= cx <= max_cx and min_cy <= cy <= max_cy
+                )
+            else:
+                candidates = (
+                    self.cells[(cx, cy)]
+                    for cx in range(min_cx, max_cx + 1)
+                    for cy in range(min_cy, max_cy + 1)
+                    if (cx, cy) in self.cells
+                )
+
+            for bucket in candidates:
+                for item in bucket:
+                    x, y = self.positions[item]
+                    if min_x <= x <= max_x and min_y <= y <= max_y:
+                        results.append(item)
+        return results
+
+    def query_radius(self, x, y, radius):
+        radius_sq = radius * radius
+        results = []
+        for item in self.query_box(x - radius, y - radius, x + radius, y + radius):
+            ix, iy = self.positions.get(item, (math.inf, math.inf))
+            if (ix - x) ** 2 + (iy - y) ** 2 <= radius_sq:
+                results.append(item)
+        return results
+
+    def nearest(self, x, y, max_distance=math.inf):
+        with self.lock:
+            if not self.positions:
+                return None
+
+            center_x, center_y = self._cell(x, y)
+            max_ring = self._max_ring(center_x, center_y)
+            if max_distance != math.inf:
+                max_ring = min(max_ring, int(max_distance / self.cell_size) + 1)
+
+            best_item = None
+            best_dist_sq = max_distance * max_distance
+
+            for ring in range(max_ring + 1):
+                # Every cell in this ring is at least (ring - 1) cells away
+                if best_item is not None and ((ring - 1) * self.cell_size) ** 2 > best_dist_sq:
+                    break
+
+                for cell in self._ring_cells(center_x, center_y, ring):
+                    bucket = self.cells.get(cell)
+                    if not bucket:
+                        continue
+                    for item in bucket:
+                        ix, iy = self.positions[item]
+                        dist_sq = (ix - x) ** 2 + (iy - y) ** 2
+                        if dist_sq <= best_dist_sq:
+                            best_item = item
+                            best_dist_sq = dist_sq
+
+            return best_item
+
+    def _max_ring(self, center_x, center_y):
+        min_cx, min_cy, max_cx, max_cy = self.cell_bounds
+        return max(abs(center_x - min_cx), abs(center_x - max_cx), abs(center_y - min_cy), abs(center_y - max_cy))
+
+    def _ring_cells(self, center_x, center_y, ring):
+        if ring == 0:
+            yield (center_x, center_y)
+            return
+
+        for cx in range(center_x - ring, center_x + ring + 1):
+            yield (cx, center_y - ring)
+            yield (cx, center_y + ring)
+        for cy in range(center_y - ring + 1, center_y + ring):
+            yield (center_x - ring, cy)
+            yield (center_x + ring, cy)
\ No newline at end of file
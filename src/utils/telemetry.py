@@ -0,0 +1,227 @@
+import json
+import os
+import threading
+from bisect import bisect_left
+
+# Upper bucket bounds. Path searches take tens of microseconds to tens of milliseconds, GUI frames a few
+# milliseconds, and lane waits are simulated seconds
+LATENCY_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+WAIT_BUCKETS = (0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+DEPTH_BUCKETS = (1, 2, 3, 4, 6, 8, 12, 16, 32, 64)
+
+
+class Counter:
+    kind = "counter"
+    __slots__ = ("name", "help", "value")
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def reset(self):
+        self.value = 0
+
+    def to_dict(self):
+        return self.value
+
+
+class Gauge:
+    kind = "gauge"
+    __slots__ = ("name", "help", "value")
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def set_max(self, value):
+        if value > self.value:
+            self.value = value
+
+    def reset(self):
+        self.value = 0
+
+    def to_dict(self):
+        return self.value
+
+
+class Histogram:
+    kind = "histogram"
+    __slots__ = ("name", "help", "bounds", "counts", "sum", "count")
+
+    def __init__(self, name, help="", buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.bounds = tuple(buckets)
+        # One slot per bound plus an overflow slot; bisect_left puts a value equal to a bound in that bound's bucket
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation; exact enough to spot a slow tail
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {str(bound): count for bound, count in zip(self.bounds, self.counts)},
+            "overflow": self.counts[-1]
+        }
+
+
+class Telemetry:
+    PREFIX = "fleet_"
+
+    def __init__(self, enabled=True):
+        # Hot paths check enabled before touching a metric, so a disabled instance costs one attribute test
+        self.enabled = enabled
+        self.metrics = {}
+        self.lane_wait = {}
+        self.export_thread = None
+        self.export_stop = None
+        self.export_path = None
+        self.export_format = None
+
+        self.path_search = self.histogram("path_search_seconds", "Wall time of one path search")
+        self.robot_wait = self.histogram("robot_wait_seconds", "Simulated time a robot waited before entering a lane",
+                                         WAIT_BUCKETS)
+        self.lane_queue_depth = self.histogram("lane_queue_depth", "Queue length behind a lane when a robot joins it",
+                                               DEPTH_BUCKETS)
+        self.max_lane_queue = self.gauge("lane_queue_depth_max", "Longest lane queue seen")
+        self.gui_frame = self.histogram("gui_frame_seconds", "Wall time spent redrawing one GUI frame")
+        self.tasks_completed = self.counter("tasks_completed_total", "Tasks completed")
+        self.deadlocks = self.counter("deadlocks_total", "Wait-for cycles resolved")
+
+    def _register(self, cls, name, *args):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, *args)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name, help=""):
+        return self._register(Counter, name, help)
+
+    def gauge(self, name, help=""):
+        return self._register(Gauge, name, help)
+
+    def histogram(self, name, help="", buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, help, buckets)
+
+    def record_wait(self, lane_key, seconds):
+        self.robot_wait.observe(seconds)
+        self.lane_wait[lane_key] = self.lane_wait.get(lane_key, 0.0) + seconds
+
+    def lane_congestion(self):
+        # Per-lane waiting time scaled to 0..1 against the most congested lane, for heatmaps
+        if not self.lane_wait:
+            return {}
+        peak = max(self.lane_wait.values())
+        if peak <= 0:
+            return {}
+        return {lane_key: seconds / peak for lane_key, seconds in self.lane_wait.items()}
+
+    def reset(self):
+        for metric in self.metrics.values():
+            metric.reset()
+        self.lane_wait = {}
+
+    def snapshot(self):
+        # The export thread reads while the simulation writes, so dicts are copied before iterating
+        return {
+            "metrics": {name: metric.to_dict() for name, metric in list(self.metrics.items())},
+            "lane_wait": {f"{start}-{end}": seconds for (start, end), seconds in sorted(list(self.lane_wait.items()))}
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        lines = []
+        for name, metric in list(self.metrics.items()):
+            full_name = self.PREFIX + name
+            if metric.help:
+                lines.append(f"# HELP {full_name} {metric.help}")
+            lines.append(f"# TYPE {full_name} {metric.kind}")
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                for bound, count in zip(metric.bounds, metric.counts):
+                    cumulative += count
+                    lines.append(f'{full_name}_bucket{{le="{bound:g}"}} {cumulative}')
+                lines.append(f'{full_name}_bucket{{le="+Inf"}} {metric.count}')
+                lines.append(f"{full_name}_sum {metric.sum!r}")
+                lines.append(f"{full_name}_count {metric.count}")
+            else:
+                lines.append(f"{full_name} {metric.value!r}")
+
+        if self.lane_wait:
+            full_name = self.PREFIX + "lane_wait_seconds_total"
+            lines.append(f"# HELP {full_name} Simulated time robots spent waiting to enter each lane")
+            lines.append(f"# TYPE {full_name} counter")
+            for (start, end), seconds in sorted(list(self.lane_wait.items())):
+                lines.append(f'{full_name}{{start="{start}",end="{end}"}} {seconds!r}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, fmt=None):
+        # Written to a temporary file and renamed, so a scraper never reads half a file
+        fmt = fmt or ("json" if path.endswith(".json") else "prometheus")
+        content = self.to_json() if fmt == "json" else self.to_prometheus()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w') as file:
+            file.write(content)
+        os.replace(temporary, path)
+
+    def start_export(self, path, interval=5.0, fmt=None):
+        self.stop_export()
+        self.export_path = path
+        self.export_format = fmt
+        self.export_stop = threading.Event()
+        self.export_thread = threading.Thread(target=self._export_loop, args=(interval, self.export_stop))
+        self.export_thread.daemon = True
+        self.export_thread.start()
+
+    def stop_export(self):
+        # Writes one last time so the file ends up with the final numbers
+        if self.export_thread is None:
+            return
+        self.export_stop.set()
+        self.export_thread.join()
+        self.export_thread = None
+        self.write(self.export_path, self.export_format)
+
+    def _export_loop(self, interval, stop):
+        while not stop.wait(interval):
+            self.write(self.export_path, self.export_format)
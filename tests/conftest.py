@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.controllers.fleet_manager import FleetManager
+from src.controllers.simulator import Simulator
+from src.controllers.traffic_manager import TrafficManager
+from src.models.nav_graph import NavGraph
+
+
+@pytest.fixture
+def make_fleet(tmp_path):
+    # Builds headless fleets on a graph (a NavGraph or its JSON data) and closes their loggers on teardown, even
+    # when the test fails
+    fleets = []
+
+    def make(graph, **options):
+        nav_graph = graph if isinstance(graph, NavGraph) else NavGraph(graph)
+        fleet_manager = FleetManager(nav_graph, TrafficManager(), Simulator(realtime=False),
+                                     log_file=str(tmp_path / f"fleet{len(fleets)}.log"), **options)
+        fleets.append(fleet_manager)
+        return fleet_manager
+
+    yield make
+    for fleet_manager in fleets:
+        fleet_manager.close()
@@ -0,0 +1,23 @@
+from src.sim import BatchRunner
+
+# Lane B-C is 1000 long, so it stays held for 20 seconds
+LONG_LANE = {"vertices": [[0, 0, {"name": "A"}], [100, 0, {"name": "B"}], [1100, 0, {"name": "C"}]],
+             "lanes": [[0, 1], [1, 2]]}
+
+
+def test_report_counts_waits_still_open_at_the_cut_off(tmp_path):
+    runner = BatchRunner(LONG_LANE, ["A", "B"], [{"time": 0, "robot": 1, "target": "C"},
+                                                 {"time": 0, "robot": 2, "target": "C"}],
+                         log_file=str(tmp_path / "fleet.log"))
+    # Robot 1 reaches B after 2 seconds and waits there for robot 2 to clear B-C
+    report = runner.run(until=10)
+    assert runner.fleet_manager.robots[1].status == "waiting"
+    assert report["robot_wait_time"] == {"1": 8.0, "2": 0.0}
+    assert report["total_wait_time"] == 8.0
+
+    runner = BatchRunner(LONG_LANE, ["A", "B"], [{"time": 0, "robot": 1, "target": "C"},
+                                                 {"time": 0, "robot": 2, "target": "C"}],
+                         log_file=str(tmp_path / "full.log"))
+    report = runner.run()
+    assert report["robot_wait_time"] == {"1": 18.0, "2": 0.0}
+    assert report["tasks_completed"] == 2
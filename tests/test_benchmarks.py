@@ -0,0 +1,22 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+import run_benchmarks
+
+
+def test_relative_output_and_baseline_stay_in_the_working_directory(tmp_path, monkeypatch):
+    for name in dir(run_benchmarks):
+        if name.startswith("bench_"):
+            monkeypatch.setattr(run_benchmarks, name, lambda results, *args, **kwargs: None)
+    monkeypatch.chdir(tmp_path)
+
+    assert run_benchmarks.main(["--output", "results.json", "--baseline", "baseline.json",
+                                "--update-baseline"]) == 0
+    assert os.getcwd() == str(tmp_path)
+    assert json.loads((tmp_path / "results.json").read_text())["results"] == {}
+    assert (tmp_path / "baseline.json").exists()
+    # Fleet logs go to an explicit file rather than to wherever the benchmarks happen to run
+    assert os.path.isabs(run_benchmarks.LOG_FILE)
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from src.models.nav_graph import NavGraph
+from src.replay import JournalReplay
+from src.sim import BatchRunner, load_records
+from src.utils.checkpoint import load_checkpoint
+
+DATA = os.path.join(os.path.dirname(__file__), '..', 'data')
+GRAPH = os.path.join(DATA, 'nav_graph.json')
+# Robot tasks from the sample, plus dispatcher orders for any robot
+ORDERS = [{"time": 1, "pickup": "H", "dropoff": "A"}, {"time": 3, "pickup": "D", "dropoff": "F"},
+          {"time": 4, "pickup": "B"}]
+
+
+def make_runner(tmp_path, name="run"):
+    return BatchRunner(NavGraph.from_file(GRAPH), load_records(os.path.join(DATA, 'sample_robots.json')),
+                       load_records(os.path.join(DATA, 'sample_tasks.json')) + ORDERS,
+                       log_file=str(tmp_path / f"{name}.log"), vertex_occupancy=True)
+
+
+def outcome(report):
+    return {key: report[key] for key in ("robots", "tasks_submitted", "tasks_completed", "tasks_rejected", "makespan",
+                                         "robot_wait_time", "lane_utilization", "deadlocks", "events_processed")}
+
+
+def edit_map(runner):
+    # Outside commands, as the GUI would send them between two events
+    fleet_manager = runner.fleet_manager
+    fleet_manager.block_lane(0, 4)
+    fleet_manager.set_lane_cost(1, 5, 400.0)
+    runner.dispatcher.submit(fleet_manager.nav_graph.get_vertex_by_name("G"))
+
+
+def test_resumed_run_finishes_like_the_uninterrupted_one(tmp_path):
+    uninterrupted = make_runner(tmp_path, "uninterrupted")
+    uninterrupted.simulator.run(2.5)
+    edit_map(uninterrupted)
+    expected = outcome(uninterrupted.run())
+
+    runner = make_runner(tmp_path)
+    runner.simulator.run(2.5)
+    edit_map(runner)
+    checkpoint = str(tmp_path / "warm.ckpt")
+    runner.run(checkpoint_file=checkpoint, checkpoint_at=4.0)
+
+    resumed = BatchRunner.resume(checkpoint, NavGraph.from_file(GRAPH), log_file=str(tmp_path / "resumed.log"))
+    assert resumed.nav_graph.is_lane_blocked(0, 4)
+    assert outcome(resumed.run()) == expected
+
+
+def test_checkpoint_refuses_a_different_graph(tmp_path):
+    runner = make_runner(tmp_path)
+    runner.simulator.run(2.0)
+    checkpoint = str(tmp_path / "warm.ckpt")
+    runner.save_checkpoint(checkpoint)
+    runner.fleet_manager.close()
+
+    moved = NavGraph.from_file(GRAPH)
+    moved.vertex_store.xs[7] += 10
+    with pytest.raises(ValueError, match="different vertex positions or lanes"):
+        load_checkpoint(checkpoint, moved)
+    repriced = NavGraph.from_file(GRAPH)
+    repriced.lanes[0]["cost"] = 5.0
+    with pytest.raises(ValueError, match="different vertex positions or lanes"):
+        load_checkpoint(checkpoint, repriced)
+
+
+def test_journal_replays_the_recorded_run(tmp_path):
+    runner = make_runner(tmp_path)
+    journal_file = str(tmp_path / "run.bin")
+    journal = runner.start_journal(journal_file)
+    runner.simulator.run(2.5)
+    edit_map(runner)
+    expected = outcome(runner.run())
+    assert journal.file is None and journal.records_written > 0
+
+    replay = JournalReplay(journal_file, NavGraph.from_file(GRAPH), log_file=str(tmp_path / "replay.log"))
+    report = replay.run()
+    replay.close()
+    assert not report["diverged"]
+    assert report["records_matched"] == report["records"] == journal.records_written
+    assert report["inputs_replayed"] == 3
+    assert outcome(report["run"]) == expected
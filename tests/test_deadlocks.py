@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from src.controllers.fleet_manager import FleetManager
+from src.sim import BatchRunner
+from src.utils.graph_generators import warehouse_graph
+
+# A row A-B-C-D, with E above B-C as the only way round that lane
+LOOP = {"vertices": [[0, 0, {"name": "A"}], [100, 0, {"name": "B"}], [200, 0, {"name": "C"}], [300, 0, {"name": "D"}],
+                     [150, 100, {"name": "E"}]],
+        "lanes": [[0, 1], [1, 2], [2, 3], [1, 4], [4, 2]]}
+
+
+def assign(fleet_manager, robot, vertex_id):
+    return fleet_manager.assign_task(robot, fleet_manager.nav_graph.get_vertex_by_id(vertex_id))
+
+
+@pytest.mark.parametrize("policy", FleetManager.DEADLOCK_POLICIES)
+def test_head_on_cycle_is_counted_once(make_fleet, policy):
+    fleet_manager = make_fleet(LOOP, vertex_occupancy=True, deadlock_policy=policy)
+    vertex = fleet_manager.nav_graph.get_vertex_by_id
+    first, second = fleet_manager.spawn_robot(vertex(0)), fleet_manager.spawn_robot(vertex(3))
+    # Both reach the ends of B-C at the same time, each wanting the vertex the other stands on
+    assert assign(fleet_manager, first, 2)[0]
+    assert assign(fleet_manager, second, 1)[0]
+
+    fleet_manager.simulator.run()
+    assert (first.current_vertex["id"], second.current_vertex["id"]) == (2, 1)
+    assert first.tasks_completed == second.tasks_completed == 1
+    # Backing off finds the same cycle again on every retry, but it is still one deadlock
+    assert fleet_manager.deadlocks_detected == 1
+    assert fleet_manager.deadlocks_resolved == 1
+    assert fleet_manager.open_deadlocks == set()
+
+
+@pytest.mark.parametrize("policy", FleetManager.DEADLOCK_POLICIES)
+def test_warehouse_run_with_head_on_aisles_finishes(tmp_path, policy):
+    # Single-lane aisles with robots queued behind both ends of a head-on pair used to trade places forever
+    graph_data = warehouse_graph(6, 12)
+    vertex_count = len(graph_data["vertices"])
+    rng = random.Random(0)
+    spawns = rng.sample(range(vertex_count), 12)
+    tasks = [{"time": step * 5.0, "robot": robot_id, "target": rng.randrange(vertex_count)}
+             for robot_id in range(1, 13) for step in range(5)]
+    runner = BatchRunner(graph_data, spawns, tasks, log_file=str(tmp_path / "fleet.log"), deadlock_policy=policy,
+                         vertex_occupancy=True)
+
+    report = runner.run(until=5000)
+    assert runner.simulator.pending() == 0
+    assert all(robot.status in ("idle", "charging") for robot in runner.fleet_manager.robots.values())
+    assert report["deadlocks"] <= report["deadlocks_detected"] < 200
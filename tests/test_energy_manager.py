@@ -0,0 +1,26 @@
+# The lane to the far charger is long but marked cheap to route along; the near charger is 100 away
+CHARGERS = {
+    "vertices": [[0, 0, {"name": "Start"}], [1000, 0, {"name": "Far", "is_charger": True}],
+                 [0, 100, {"name": "Near", "is_charger": True}]],
+    "lanes": [[0, 1, {"cost": 1}], [0, 2]]}
+
+
+def test_charger_field_measures_distance_not_lane_cost(make_fleet):
+    fleet_manager = make_fleet(CHARGERS, battery=True)
+    energy_manager = fleet_manager.energy_manager
+    distances, nearest = energy_manager.charger_field()
+    assert (distances[0], nearest[0]) == (100, 2)
+    assert energy_manager.distance_to_charger(0) == 100
+
+
+def test_busy_charger_search_measures_distance(make_fleet):
+    fleet_manager = make_fleet(CHARGERS, battery=True)
+    robot = fleet_manager.spawn_robot(fleet_manager.nav_graph.get_vertex_by_id(0))
+    # Three percent covers the 100 to the near charger but not the 1000 to the far one
+    robot.battery = 3.0
+    assert fleet_manager.energy_manager._pick_charger(robot) == 2
+
+    fleet_manager.energy_manager.request_charge(robot)
+    fleet_manager.simulator.run()
+    assert robot.current_vertex["id"] == 2
+    assert robot.id not in fleet_manager.energy_manager.stranded
@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+from src.gui.fleet_gui import FleetGUI
+
+
+class ViewStub:
+    # Just the view state culling reads; a real FleetGUI needs a display
+    canvas_to_world = FleetGUI.canvas_to_world
+    visible_world_box = FleetGUI.visible_world_box
+    on_canvas_resize = FleetGUI.on_canvas_resize
+
+    def __init__(self):
+        self.canvas_width = 800
+        self.canvas_height = 600
+        self.scale_factor = 2.0
+        self.canvas_offset_x = 0.0
+        self.canvas_offset_y = 0.0
+        self.transform_dirty = False
+
+
+def test_culling_follows_the_resized_canvas():
+    view = ViewStub()
+    assert view.visible_world_box(margin=0) == (0, 0, 400, 300)
+
+    view.on_canvas_resize(SimpleNamespace(width=1600, height=1000))
+    assert view.transform_dirty
+    assert view.visible_world_box(margin=0) == (0, 0, 800, 500)
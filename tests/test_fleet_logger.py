@@ -0,0 +1,29 @@
+import gc
+import json
+import weakref
+
+from src.utils.fleet_logger import FleetLogger
+
+
+def test_closed_logger_is_freed(tmp_path):
+    logger = FleetLogger(str(tmp_path / "fleet.log"))
+    logger.log("hello")
+    logger.close()
+    reference = weakref.ref(logger)
+    del logger
+    gc.collect()
+    assert reference() is None
+
+
+def test_structured_records_and_append(tmp_path):
+    path = tmp_path / "fleet.jsonl"
+    logger = FleetLogger(str(path), structured=True)
+    logger.log("first", "spawn", 1, 2)
+    logger.close()
+    logger = FleetLogger(str(path), structured=True, append=True)
+    logger.log("second", "arrive", 1, 3, (2, 3))
+    logger.close()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["message"] for record in records] == ["first", "second"]
+    assert records[1]["lane"] == [2, 3]
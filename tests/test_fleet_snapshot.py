@@ -0,0 +1,49 @@
+import pytest
+
+# Three vertices in a row, 100 apart: two seconds per lane at the default speed
+ROW = {"vertices": [[0, 0, {"name": "A"}], [100, 0, {"name": "B"}], [200, 0, {"name": "C"}]],
+       "lanes": [[0, 1], [1, 2]]}
+
+
+def test_published_snapshot_is_read_only(make_fleet):
+    fleet_manager = make_fleet(ROW)
+    robot = fleet_manager.spawn_robot(fleet_manager.nav_graph.get_vertex_by_id(0))
+    snapshot = fleet_manager.publish_snapshot()
+    idx = snapshot.index_of(robot.id)
+
+    for view in (snapshot.xs, snapshot.ys, snapshot.robot_ids, snapshot.status_codes, snapshot.current_vertices,
+                 snapshot.target_vertices, snapshot.batteries):
+        assert view.readonly
+        with pytest.raises(TypeError):
+            view[idx] = view[idx]
+    with pytest.raises(AttributeError):
+        snapshot.occupied_lanes.add((0, 1))
+    with pytest.raises(AttributeError):
+        snapshot.extra = 1
+
+
+def test_old_snapshots_do_not_follow_the_fleet(make_fleet):
+    fleet_manager = make_fleet(ROW)
+    robot = fleet_manager.spawn_robot(fleet_manager.nav_graph.get_vertex_by_id(0))
+    before = fleet_manager.publish_snapshot()
+    idx = before.index_of(robot.id)
+
+    fleet_manager.assign_task(robot, fleet_manager.nav_graph.get_vertex_by_id(2))
+    fleet_manager.simulator.run(1.0)
+    fleet_manager.update_positions(fleet_manager.simulator.now)
+    during = fleet_manager.publish_snapshot()
+    assert during.version == before.version + 1
+    assert (during.xs[idx], during.status(idx), during.target_vertices[idx]) == (50, "moving", 2)
+    assert during.occupied_lanes == frozenset({(0, 1)})
+    # The earlier snapshot still shows the robot parked at A
+    assert (before.xs[idx], before.status(idx), before.current_vertices[idx]) == (0, "idle", 0)
+    assert before.occupied_lanes == frozenset()
+
+
+def test_unchanged_fleet_keeps_its_snapshot(make_fleet):
+    fleet_manager = make_fleet(ROW)
+    fleet_manager.spawn_robot(fleet_manager.nav_graph.get_vertex_by_id(1))
+    first = fleet_manager.publish_snapshot()
+    # Nothing moved, so readers keep the same version and can skip the redraw
+    assert fleet_manager.publish_snapshot() is first
+    assert len(first) == 1 and first.index_of(99) is None
@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+from src.models.nav_graph import NavGraph
+from src.utils import graph_io
+
+DATA = os.path.join(os.path.dirname(__file__), '..', 'data')
+GRAPH = os.path.join(DATA, 'nav_graph.json')
+# Lanes ahead of vertices, an unrelated key, escapes, non-ASCII names and numbers in every JSON spelling
+AWKWARD = ('{"lanes": [[0, 1, {"cost": 2.5e2}], [1, 2]], "meta": {"note": "a \\"quoted\\" ] } string", "n": [1, {}]},\n'
+           ' "vertices": [[0, 0, {"name": "Dock \\u00e9"}], [-1.5E2, 10, {"is_charger": true, "capacity": 3}],\n'
+           '              [3, -0.25, {"name": "Bay\\n3", "extra": null}]]}')
+
+
+def graph_state(nav_graph):
+    return ([vertex.to_dict() for vertex in nav_graph.vertices], nav_graph.lanes,
+            nav_graph.adjacency, nav_graph.adjacency_costs)
+
+
+@pytest.mark.parametrize("chunk_size", (1, 7, 1 << 16))
+def test_streamed_json_matches_a_full_parse(tmp_path, chunk_size):
+    filename = tmp_path / "graph.json"
+    filename.write_text(AWKWARD, encoding="utf-8")
+    records = list(graph_io.iter_graph_json(filename, chunk_size))
+    document = json.loads(AWKWARD)
+    assert records == [("lane", lane) for lane in document["lanes"]] + \
+        [("vertex", vertex) for vertex in document["vertices"]]
+
+    streamed = NavGraph({"vertices": [], "lanes": []})
+    streamed.load_records(iter(records))
+    assert graph_state(streamed) == graph_state(NavGraph(document))
+    assert streamed.get_lane_cost(0, 1) == 250
+
+
+@pytest.mark.parametrize("source", ("sample", "awkward"))
+def test_binary_round_trip(tmp_path, source):
+    if source == "sample":
+        json_file = GRAPH
+    else:
+        json_file = tmp_path / "graph.json"
+        json_file.write_text(AWKWARD, encoding="utf-8")
+    binary_file = str(tmp_path / "graph.navg")
+    original = NavGraph.from_file(json_file)
+
+    assert graph_io.compile_graph(json_file, binary_file) == (len(original.vertices), len(original.lanes))
+    assert graph_io.is_graph_binary(binary_file)
+    loaded = NavGraph.from_file(binary_file)
+    assert graph_state(loaded) == graph_state(original)
+
+    # Saving a graph read from a binary file writes the same bytes back
+    resaved = str(tmp_path / "resaved.navg")
+    loaded.save_binary(resaved)
+    with open(binary_file, 'rb') as first, open(resaved, 'rb') as second:
+        assert first.read() == second.read()
+
+
+def test_binary_reader_rejects_other_files(tmp_path):
+    assert not graph_io.is_graph_binary(GRAPH)
+    stale = tmp_path / "stale.navg"
+    NavGraph.from_file(GRAPH).save_binary(str(stale))
+    data = bytearray(stale.read_bytes())
+    data[8] = graph_io.BINARY_VERSION + 1
+    stale.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        graph_io.read_graph_binary(str(stale))
@@ -0,0 +1,89 @@
+import math
+import random
+
+import pytest
+
+from src.models import motion_table
+from src.models.motion_table import MotionTable
+
+
+class FakeRobot:
+    def __init__(self, robot_id):
+        self.id = robot_id
+        self.x = 0.0
+        self.y = 0.0
+
+
+@pytest.fixture(params=("numpy", "python"))
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if motion_table.np is None:
+            pytest.skip("NumPy is not installed")
+    else:
+        monkeypatch.setattr(motion_table, "np", None)
+    return request.param
+
+
+def expected_position(segment, now):
+    start_x, start_y, end_x, end_y, start_time, end_time = segment
+    if end_time <= start_time:
+        return end_x, end_y
+    progress = min(max((now - start_time) / (end_time - start_time), 0.0), 1.0)
+    return start_x + (end_x - start_x) * progress, start_y + (end_y - start_y) * progress
+
+
+def test_random_begin_end_and_advance_match_a_plain_model(backend):
+    # Starts small so rows are swapped and the columns regrow many times over
+    table = MotionTable(cell_size=25, capacity=2)
+    rng = random.Random(7)
+    robots = [FakeRobot(robot_id) for robot_id in range(40)]
+    segments = {}
+    cells = {}
+    now = 0.0
+
+    for _ in range(2000):
+        robot = rng.choice(robots)
+        action = rng.random()
+        if action < 0.4:
+            start_x, start_y = rng.uniform(-300, 300), rng.uniform(-300, 300)
+            robot.x, robot.y = start_x, start_y
+            segment = (start_x, start_y, start_x + rng.uniform(-100, 100), start_y + rng.uniform(-100, 100),
+                       now, now + rng.choice((0.0, rng.uniform(0.5, 5))))
+            table.begin(robot, *segment)
+            segments[robot.id] = segment
+            cells[robot.id] = (math.floor(start_x / 25), math.floor(start_y / 25))
+        elif action < 0.7:
+            assert table.end(robot) == (robot.id in segments)
+            segments.pop(robot.id, None)
+        else:
+            now += rng.uniform(0, 1)
+            listed, xs, ys, moved = table.advance(now)
+            assert len(listed) == len(table) == len(segments)
+            assert {robot.id for robot in listed} == set(segments)
+            expected_moved = []
+            for row, (listed_robot, x, y) in enumerate(zip(listed, xs, ys)):
+                expected_x, expected_y = expected_position(segments[listed_robot.id], now)
+                assert math.isclose(x, expected_x, abs_tol=1e-9) and math.isclose(y, expected_y, abs_tol=1e-9)
+                cell = (math.floor(x / 25), math.floor(y / 25))
+                if cell != cells[listed_robot.id]:
+                    expected_moved.append(row)
+                    cells[listed_robot.id] = cell
+            assert moved == expected_moved
+
+        for robot_id in segments:
+            assert table.robots[table.rows[robot_id]].id == robot_id
+        assert len(table.rows) == len(table.robots)
+
+
+def test_begin_again_replaces_the_segment(backend):
+    table = MotionTable(cell_size=10)
+    robot = FakeRobot(1)
+    table.begin(robot, 0, 0, 100, 0, 0.0, 10.0)
+    table.begin(robot, 100, 0, 100, 50, 10.0, 15.0)
+    assert len(table) == 1 and robot in table
+    _, xs, ys, _ = table.advance(12.5)
+    assert (xs, ys) == ([100.0], [25.0])
+
+    assert table.end(robot) and not table.end(robot)
+    assert robot not in table
+    assert table.advance(20.0) == ([], [], [], [])
@@ -0,0 +1,61 @@
+import math
+import random
+
+import pytest
+
+from src.models.nav_graph import NavGraph
+from src.utils.graph_generators import grid_graph
+
+
+def random_pairs(nav_graph, count, seed):
+    rng = random.Random(seed)
+    vertex_count = len(nav_graph.vertex_store)
+    return [(rng.randrange(vertex_count), rng.randrange(vertex_count)) for _ in range(count)]
+
+
+def check_path(nav_graph, path, start_id, end_id):
+    assert path[0] == start_id and path[-1] == end_id
+    for lane_start, lane_end in zip(path, path[1:]):
+        assert nav_graph.get_lane(lane_start, lane_end) is not None
+
+
+def test_planners_agree_on_uniform_lanes():
+    # Every lane is 100 long, so the fewest hops is also the cheapest route and BFS has to match
+    nav_graph = NavGraph(grid_graph(12, 12, lane_removal=0.2, seed=1))
+    for start_id, end_id in random_pairs(nav_graph, 200, 1):
+        costs = set()
+        for mode in ("bfs", "dijkstra", "astar"):
+            path, cost = nav_graph.planner.plan(start_id, end_id, mode)
+            if path is None:
+                assert cost == math.inf
+            else:
+                check_path(nav_graph, path, start_id, end_id)
+                assert math.isclose(cost, nav_graph.get_path_cost(path))
+            costs.add(round(cost, 6))
+        assert len(costs) == 1, (start_id, end_id, costs)
+
+
+def test_astar_matches_dijkstra_with_cost_overrides():
+    nav_graph = NavGraph(grid_graph(12, 12, lane_removal=0.1, seed=2))
+    rng = random.Random(2)
+    # Some lanes cheaper than their length, which A* has to allow for in its heuristic
+    for lane in rng.sample(nav_graph.lanes, len(nav_graph.lanes) // 3):
+        nav_graph.set_lane_cost(lane["start"], lane["end"], rng.uniform(20, 400))
+    assert nav_graph.min_cost_ratio < 1.0
+
+    for start_id, end_id in random_pairs(nav_graph, 200, 2):
+        _, dijkstra_cost = nav_graph.planner.plan(start_id, end_id, "dijkstra")
+        astar_path, astar_cost = nav_graph.planner.plan(start_id, end_id, "astar")
+        if astar_path is not None:
+            check_path(nav_graph, astar_path, start_id, end_id)
+        assert math.isclose(astar_cost, dijkstra_cost) or astar_cost == dijkstra_cost == math.inf
+
+
+@pytest.mark.parametrize("mode", ("bfs", "dijkstra", "astar"))
+def test_avoided_lanes_and_vertices_are_never_used(mode):
+    nav_graph = NavGraph(grid_graph(3, 3))
+    # Corner to corner with the centre and the top row's first lane ruled out
+    path = nav_graph.find_path(0, 8, mode, avoid={(0, 1)}, avoid_vertices={4})
+    assert path == [0, 3, 6, 7, 8]
+    assert nav_graph.find_path(0, 8, mode, avoid={(0, 1), (0, 3)}) is None
+    assert nav_graph.find_path(0, 4, mode, avoid_vertices={4}) in ([0, 1, 4], [0, 3, 4])
@@ -0,0 +1,48 @@
+import os
+
+from src.controllers.reservation_planner import ReservationPlanner
+from src.models.nav_graph import NavGraph
+
+DATA = os.path.join(os.path.dirname(__file__), '..', 'data')
+GRAPH = os.path.join(DATA, 'nav_graph.json')
+
+
+def lane_bookings(planner, lane_key):
+    return [(start, end, robot_id) for start, end, robot_id in planner.table.lane_slots.get(lane_key, ())]
+
+
+def test_bookings_on_a_lane_never_overlap():
+    planner = ReservationPlanner(NavGraph.from_file(GRAPH))
+    # Head-on over A-B: the second robot must wait for the lane rather than share it
+    first, _ = planner.plan(1, 0, 1, 0.0, 10.0)
+    second, _ = planner.plan(2, 1, 0, 0.0, 10.0)
+    assert first == [0, 1]
+    # Going round through E beats waiting ten seconds for A-B
+    assert second == [1, 4, 0]
+
+    for lane_key, slots in planner.table.lane_slots.items():
+        for (start, end, _), (next_start, _, _) in zip(slots, slots[1:]):
+            assert end <= next_start, lane_key
+
+
+def test_search_follows_lane_costs():
+    nav_graph = NavGraph.from_file(GRAPH)
+    nav_graph.set_lane_cost(0, 1, 10000)
+    planner = ReservationPlanner(nav_graph)
+
+    path, _ = planner.plan(1, 0, 1, 0.0, 10.0)
+    assert path == nav_graph.find_path(0, 1) == [0, 4, 1]
+    # Bookings still follow lane length, not cost
+    (start, end, robot_id), = lane_bookings(planner, (0, 4))
+    assert robot_id == 1 and end - start == nav_graph.get_lane_length(0, 4) / 10.0
+
+
+def test_costly_detour_waits_instead():
+    nav_graph = NavGraph.from_file(GRAPH)
+    planner = ReservationPlanner(nav_graph)
+    planner.plan(1, 0, 1, 0.0, 10.0)
+    # Waiting 10 seconds for A-B is cheaper than a detour made expensive through E
+    nav_graph.set_lane_cost(1, 4, 10000)
+    path, departures = planner.plan(2, 1, 0, 0.0, 10.0)
+    assert path == [1, 0]
+    assert departures == [10.0]
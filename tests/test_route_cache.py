@@ -0,0 +1,80 @@
+import math
+
+import pytest
+
+from src.controllers.route_cache import RouteCache
+from src.models.nav_graph import NavGraph
+from src.utils.graph_generators import grid_graph
+
+
+def fresh_cost(nav_graph, start_id, end_id):
+    _, cost = nav_graph.planner.plan(start_id, end_id, "dijkstra")
+    return cost
+
+
+def test_blocking_a_lane_drops_only_the_routes_through_it():
+    # 0 1 2
+    # 3 4 5
+    # 6 7 8
+    nav_graph = NavGraph(grid_graph(3, 3))
+    cache = RouteCache(nav_graph)
+    nav_graph.set_lane_cost(0, 1, 50)
+    through = cache.get_path(0, 2)
+    assert through == [0, 1, 2]
+    assert cache.get_path(6, 8) == [6, 7, 8]
+
+    nav_graph.block_lane(0, 1)
+    assert cache.get_path(6, 8) == [6, 7, 8]
+    stats = cache.stats()
+    assert (stats["partial_invalidations"], stats["routes_dropped"], stats["hits"]) == (1, 1, 1)
+    # The route over the blocked lane was dropped and is searched again
+    path = cache.get_path(0, 2)
+    assert path[0] == 0 and path[-1] == 2 and path[1] != 1
+    assert cache.get_cost(0, 2) == fresh_cost(nav_graph, 0, 2)
+
+
+def test_a_cheaper_lane_clears_the_whole_cache():
+    nav_graph = NavGraph(grid_graph(3, 3))
+    cache = RouteCache(nav_graph)
+    assert cache.get_cost(0, 8) == 400
+    assert cache.get_cost(2, 6) == 400
+    invalidations = cache.stats()["invalidations"]
+
+    # Cheaper lanes can improve routes that never used them, so nothing cached can be trusted
+    nav_graph.set_lane_cost(4, 5, 10)
+    assert cache.get_cost(0, 8) == fresh_cost(nav_graph, 0, 8) == 310
+    stats = cache.stats()
+    assert stats["invalidations"] == invalidations + 1
+    assert stats["size"] == 1
+
+
+@pytest.mark.parametrize("edit", ("block_lane", "unblock_lane", "set_lane_cost"))
+def test_eager_tables_are_rebuilt_after_an_edit(edit):
+    nav_graph = NavGraph(grid_graph(4, 4))
+    if edit == "unblock_lane":
+        nav_graph.block_lane(5, 6)
+    cache = RouteCache(nav_graph, eager=True)
+    assert cache.get_cost(0, 15) == fresh_cost(nav_graph, 0, 15)
+
+    if edit == "set_lane_cost":
+        nav_graph.set_lane_cost(5, 6, 1)
+    else:
+        getattr(nav_graph, edit)(5, 6)
+    for start_id in range(16):
+        path, cost = cache.get_route(start_id, 15)
+        expected = fresh_cost(nav_graph, start_id, 15)
+        assert math.isclose(cost, expected)
+        assert math.isclose(nav_graph.get_path_cost(path), expected)
+    assert cache.stats()["precomputed_hits"] >= 16
+
+
+def test_least_recently_used_route_is_evicted():
+    nav_graph = NavGraph(grid_graph(3, 3))
+    cache = RouteCache(nav_graph, max_size=2)
+    cache.get_route(0, 8)
+    cache.get_route(0, 2)
+    cache.get_route(0, 8)
+    cache.get_route(6, 8)
+    assert list(cache.routes) == [(0, 8), (6, 8)]
+    # The evicted route no longer shows up in the per-vertex index either
+    assert all((0, 2) not in keys for keys in cache.vertex_routes.values())
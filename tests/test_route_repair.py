@@ -0,0 +1,74 @@
+import math
+import random
+
+import pytest
+
+from src.models.nav_graph import NavGraph
+
+SIZE = 6
+
+
+def grid_graph():
+    # A SIZE x SIZE grid of vertices 100 apart, with a lane to each right and lower neighbour
+    vertices = [[x * 100, y * 100, {"name": f"{x},{y}"}] for y in range(SIZE) for x in range(SIZE)]
+    lanes = []
+    for y in range(SIZE):
+        for x in range(SIZE):
+            vertex_id = y * SIZE + x
+            if x + 1 < SIZE:
+                lanes.append([vertex_id, vertex_id + 1])
+            if y + 1 < SIZE:
+                lanes.append([vertex_id, vertex_id + SIZE])
+    return {"vertices": vertices, "lanes": lanes}
+
+
+def check_routes(fleet_manager):
+    nav_graph = fleet_manager.nav_graph
+    for robot in fleet_manager.robots.values():
+        if robot.status not in ("moving", "waiting") or robot.target_vertex is None:
+            continue
+        # Everything past the lane a robot may already be on must be open and as cheap as a fresh search
+        rest = robot.path[fleet_manager._replan_start(robot):]
+        assert rest[-1] == robot.target_vertex["id"]
+        for start_id, end_id in zip(rest, rest[1:]):
+            assert nav_graph.get_lane(start_id, end_id) is not None
+            assert nav_graph.is_lane_open(start_id, end_id)
+        best = nav_graph.find_path(rest[0], rest[-1], mode="dijkstra")
+        assert best is not None
+        assert math.isclose(nav_graph.get_path_cost(rest), nav_graph.get_path_cost(best))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_map_edits_repair_every_route_they_touch(make_fleet, seed):
+    rng = random.Random(seed)
+    nav_graph = NavGraph(grid_graph())
+    fleet_manager = make_fleet(nav_graph)
+    simulator = fleet_manager.simulator
+    vertex_count = SIZE * SIZE
+    robots = [fleet_manager.spawn_robot(nav_graph.get_vertex_by_id(vertex_id))
+              for vertex_id in rng.sample(range(vertex_count), 4)]
+
+    for _ in range(30):
+        for robot in robots:
+            if robot.status == "idle":
+                fleet_manager.assign_task(robot, nav_graph.get_vertex_by_id(rng.randrange(vertex_count)))
+        for _ in range(rng.randrange(1, 4)):
+            simulator.step()
+
+        # Only edits that make the map worse, which is when routes are repaired; robots' own vertices and
+        # targets stay open so the edit never strands one where it stands
+        busy = {robot.current_vertex["id"] for robot in robots}
+        busy.update(robot.target_vertex["id"] for robot in robots if robot.target_vertex is not None)
+        lane = rng.choice(list(nav_graph.lane_index))
+        edit = rng.random()
+        if edit < 0.4:
+            fleet_manager.block_lane(*lane)
+        elif edit < 0.5:
+            vertex_id = rng.randrange(vertex_count)
+            if vertex_id not in busy:
+                fleet_manager.block_vertex(vertex_id)
+        else:
+            fleet_manager.set_lane_cost(lane[0], lane[1], nav_graph.get_lane_cost(*lane) + rng.uniform(50, 300))
+        check_routes(fleet_manager)
+
+    assert fleet_manager.routes_repaired > 0
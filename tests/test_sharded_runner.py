@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from src.sim import BatchRunner, ShardedRunner, load_records
+from src.models.nav_graph import NavGraph
+
+DATA = os.path.join(os.path.dirname(__file__), '..', 'data')
+GRAPH = os.path.join(DATA, 'nav_graph.json')
+
+
+def run_sharded(tmp_path, until):
+    runner = ShardedRunner(GRAPH, load_records(os.path.join(DATA, 'sample_robots.json')),
+                           load_records(os.path.join(DATA, 'sample_tasks.json')), 2,
+                           log_file=str(tmp_path / "fleet.log"))
+    return runner.run(until)
+
+
+@pytest.mark.parametrize("until", [0.5, 1.5, 2, 5, 7])
+def test_robots_crossing_at_the_cut_off_are_reported(tmp_path, until):
+    report = run_sharded(tmp_path, until)
+    assert report["robots"] == 4
+
+
+def test_sharded_run_completes_the_sample_tasks(tmp_path):
+    report = run_sharded(tmp_path, None)
+    batch = BatchRunner(NavGraph.from_file(GRAPH), load_records(os.path.join(DATA, 'sample_robots.json')),
+                        load_records(os.path.join(DATA, 'sample_tasks.json')), log_file=str(tmp_path / "batch.log"))
+    batch_report = batch.run()
+    assert report["robots"] == 4
+    assert report["tasks_completed"] == batch_report["tasks_completed"] == 8
+    assert report["handoffs"] > 0
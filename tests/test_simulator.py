@@ -0,0 +1,70 @@
+import pytest
+
+from src.controllers.simulator import Simulator
+
+
+def test_events_run_in_time_then_schedule_order():
+    simulator = Simulator(realtime=False)
+    order = []
+    simulator.schedule(2.0, order.append, "late")
+    simulator.schedule(1.0, order.append, "first")
+    simulator.schedule_at(1.0, order.append, "second")
+    simulator.schedule(0.0, order.append, "now")
+    simulator.run()
+    assert order == ["now", "first", "second", "late"]
+    assert simulator.now == 2.0
+    assert simulator.events_processed == 4
+
+
+def test_events_scheduled_from_a_callback_keep_the_clock_monotonic():
+    simulator = Simulator(realtime=False)
+    seen = []
+
+    def chain(count):
+        seen.append(simulator.now)
+        assert simulator.dispatching
+        if count:
+            # Same-time follow-ups run after everything already queued for that time
+            simulator.schedule(0, chain, count - 1)
+            simulator.schedule_at(simulator.now - 5, seen.append, "past")
+
+    simulator.schedule(1.0, chain, 2)
+    simulator.schedule(1.0, seen.append, "queued")
+    simulator.run()
+    assert seen == [1.0, "queued", 1.0, "past", 1.0, "past"]
+    assert simulator.now == 1.0 and not simulator.dispatching
+
+
+def test_cancelled_events_never_run():
+    simulator = Simulator(realtime=False)
+    ran = []
+    simulator.schedule(1.0, ran.append, "kept")
+    dropped = simulator.schedule(0.5, ran.append, "dropped")
+    simulator.cancel(dropped)
+    simulator.cancel(None)
+    assert simulator.pending() == 1
+    # The cancelled head of the queue is skipped when peeking too
+    assert simulator.next_time() == 1.0
+
+    assert simulator.step()
+    assert ran == ["kept"] and simulator.now == 1.0
+    assert not simulator.step()
+    assert simulator.events_processed == 1
+
+
+def test_run_until_stops_between_events():
+    simulator = Simulator(realtime=False)
+    ran = []
+    for event_time in (1.0, 2.0, 3.0):
+        simulator.schedule_at(event_time, ran.append, event_time)
+    assert simulator.run(2.5) == 2.5
+    assert ran == [1.0, 2.0]
+    assert simulator.pending() == 1 and simulator.next_time() == 3.0
+    # An event due exactly at the cut-off still runs
+    assert simulator.run(3.0) == 3.0
+    assert ran == [1.0, 2.0, 3.0]
+
+
+def test_only_a_realtime_simulator_starts_a_thread():
+    with pytest.raises(RuntimeError):
+        Simulator(realtime=False).start()
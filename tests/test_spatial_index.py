@@ -0,0 +1,95 @@
+import math
+import random
+
+import pytest
+
+from src.utils.spatial_index import GridIndex
+
+
+def random_points(count, seed, spread=1000):
+    rng = random.Random(seed)
+    return [(item, rng.uniform(-spread, spread), rng.uniform(-spread, spread)) for item in range(count)]
+
+
+def brute_box(points, min_x, min_y, max_x, max_y):
+    return sorted(item for item, x, y in points if min_x <= x <= max_x and min_y <= y <= max_y)
+
+
+def brute_nearest_distance(points, x, y):
+    return min(math.hypot(px - x, py - y) for _, px, py in points)
+
+
+@pytest.mark.parametrize("cell_size", (7, 50, 5000))
+def test_queries_match_a_brute_force_scan(cell_size):
+    points = random_points(300, cell_size)
+    index = GridIndex(cell_size)
+    for item, x, y in points:
+        index.insert(item, x, y)
+    rng = random.Random(1)
+
+    # Small boxes walk the box's cells, big ones the occupied cells; both have to agree with a scan
+    for size in (5, 100, 3000):
+        for _ in range(20):
+            min_x, min_y = rng.uniform(-1200, 1200), rng.uniform(-1200, 1200)
+            box = (min_x, min_y, min_x + size, min_y + size)
+            assert sorted(index.query_box(*box)) == brute_box(points, *box)
+
+    for _ in range(20):
+        x, y, radius = rng.uniform(-1000, 1000), rng.uniform(-1000, 1000), rng.uniform(0, 300)
+        expected = sorted(item for item, px, py in points if (px - x) ** 2 + (py - y) ** 2 <= radius * radius)
+        assert sorted(index.query_radius(x, y, radius)) == expected
+
+        item = index.nearest(x, y)
+        px, py = index.position(item)
+        assert math.isclose(math.hypot(px - x, py - y), brute_nearest_distance(points, x, y))
+
+
+def test_nearest_respects_max_distance():
+    index = GridIndex(10)
+    assert index.nearest(0, 0) is None
+    index.insert("far", 100, 0)
+    assert index.nearest(0, 0, max_distance=50) is None
+    assert index.nearest(0, 0, max_distance=100) == "far"
+    index.insert("near", -30, 40)
+    assert index.nearest(0, 0, max_distance=100) == "near"
+
+
+def test_moves_and_removals_keep_cells_in_step():
+    points = random_points(100, 3)
+    index = GridIndex(25)
+    for item, x, y in points:
+        index.insert(item, x, y)
+    rng = random.Random(3)
+
+    moved = [(item, x + rng.uniform(-60, 60), y + rng.uniform(-60, 60)) for item, x, y in points]
+    for item, x, y in moved[:50]:
+        index.update(item, x, y)
+    items, xs, ys = zip(*moved[50:])
+    index.update_many(list(items), list(xs), list(ys))
+    assert index.remove(0) and not index.remove(0)
+    moved = moved[1:]
+
+    assert len(index) == 99 and 0 not in index
+    assert sorted(index.query_box(-2000, -2000, 2000, 2000)) == [item for item, _, _ in moved]
+    # Every item sits in exactly the cell its position maps to, and no empty cells are left behind
+    for cell, bucket in index.cells.items():
+        assert bucket
+        for item in bucket:
+            assert index._cell(*index.position(item)) == cell
+    assert sum(len(bucket) for bucket in index.cells.values()) == 99
+
+
+def test_update_many_with_known_movers():
+    index = GridIndex(10)
+    index.insert("a", 1, 1)
+    index.insert("b", 2, 2)
+    # Only "b" crosses a cell boundary; "a" just has its stored position refreshed
+    index.update_many(["a", "b"], [3, 25], [3, 2], moved=[1])
+    assert index.position("a") == (3, 3)
+    assert index.query_box(20, 0, 30, 10) == ["b"]
+    assert index.query_box(0, 0, 9, 9) == ["a"]
+
+
+def test_cell_size_must_be_positive():
+    with pytest.raises(ValueError):
+        GridIndex(0)
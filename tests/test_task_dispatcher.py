@@ -0,0 +1,39 @@
+from src.controllers.task_dispatcher import TaskDispatcher
+
+
+def vertex(fleet_manager, vertex_id):
+    return fleet_manager.nav_graph.get_vertex_by_id(vertex_id)
+
+
+def test_orders_go_to_the_nearest_idle_robots(make_fleet):
+    # A corridor of five vertices with a robot at each end
+    fleet_manager = make_fleet({"vertices": [[x, 0, {"name": str(x)}] for x in range(0, 500, 100)],
+                                "lanes": [[index, index + 1] for index in range(4)]})
+    dispatcher = TaskDispatcher(fleet_manager)
+    left, right = fleet_manager.spawn_robot(vertex(fleet_manager, 0)), fleet_manager.spawn_robot(vertex(fleet_manager, 4))
+    near_right, near_left = dispatcher.submit_many([(vertex(fleet_manager, 3), None), (vertex(fleet_manager, 1), None)])
+
+    fleet_manager.simulator.run()
+    assert (near_left.robot_id, near_right.robot_id) == (left.id, right.id)
+    assert (left.current_vertex["id"], right.current_vertex["id"]) == (1, 3)
+    stats = dispatcher.stats()
+    assert (stats["completed"], stats["pending"], stats["failed"]) == (2, 0, 0)
+
+
+def test_unreachable_orders_do_not_starve_reachable_ones(make_fleet):
+    # Vertex 2 has no lanes, so no robot can ever reach it
+    fleet_manager = make_fleet({"vertices": [[0, 0, {"name": "A"}], [100, 0, {"name": "B"}],
+                                             [300, 300, {"name": "Isolated"}]],
+                                "lanes": [[0, 1]]})
+    dispatcher = TaskDispatcher(fleet_manager)
+    robot = fleet_manager.spawn_robot(vertex(fleet_manager, 0))
+    isolated = vertex(fleet_manager, 2)
+    dispatcher.submit(isolated)
+    dispatcher.submit(isolated)
+    reachable = dispatcher.submit(vertex(fleet_manager, 1))
+
+    fleet_manager.simulator.run()
+    assert reachable.stage == "done" and reachable.robot_id == robot.id
+    stats = dispatcher.stats()
+    assert (stats["pending"], stats["failed"], stats["completed"]) == (0, 2, 1)
+    assert fleet_manager.simulator.pending() == 0
@@ -0,0 +1,27 @@
+import json
+
+from src.models.nav_graph import NavGraph
+from src.utils.telemetry import Telemetry
+
+
+def test_path_searches_are_timed_and_exported():
+    telemetry = Telemetry()
+    nav_graph = NavGraph({"vertices": [[0, 0, {"name": "A"}], [100, 0, {"name": "B"}]], "lanes": [[0, 1]]})
+    nav_graph.planner.telemetry = telemetry
+    assert nav_graph.find_path(0, 1) == [0, 1]
+    telemetry.record_wait((0, 1), 2.5)
+
+    snapshot = json.loads(telemetry.to_json())
+    assert snapshot["metrics"]["path_search_seconds"]["count"] == 1
+    assert snapshot["lane_wait"] == {"0-1": 2.5}
+    prometheus = telemetry.to_prometheus()
+    assert "fleet_path_search_seconds_count 1" in prometheus
+    assert 'fleet_lane_wait_seconds_total{start="0",end="1"} 2.5' in prometheus
+
+
+def test_disabled_telemetry_records_nothing():
+    telemetry = Telemetry(enabled=False)
+    nav_graph = NavGraph({"vertices": [[0, 0, {"name": "A"}], [100, 0, {"name": "B"}]], "lanes": [[0, 1]]})
+    nav_graph.planner.telemetry = telemetry
+    nav_graph.find_path(0, 1)
+    assert telemetry.path_search.count == 0
@@ -0,0 +1,147 @@
+import random
+import threading
+import time
+
+from src.controllers.traffic_manager import TrafficManager
+
+
+class FakeRobot:
+    def __init__(self, robot_id):
+        self.id = robot_id
+
+
+def queued_ids(traffic_manager, lane):
+    return [robot.id for robot in traffic_manager.lane_queue.get(traffic_manager.get_lane_key(lane), [])]
+
+
+def test_timed_out_robot_leaves_the_queue():
+    traffic_manager = TrafficManager()
+    holder, first, second = FakeRobot(1), FakeRobot(2), FakeRobot(3)
+    lane = (0, 1)
+    assert traffic_manager.acquire_lane(holder, lane)
+    assert not traffic_manager.acquire_lane(first, lane, timeout=0.01)
+    assert not traffic_manager.acquire_lane(second, lane, timeout=0.01)
+    assert queued_ids(traffic_manager, lane) == []
+
+    # A robot that stopped waiting is never handed the lane
+    traffic_manager.release_lane(holder, lane)
+    assert traffic_manager.snapshot() == {}
+    assert traffic_manager.acquire_lane(second, lane, timeout=0.01)
+
+
+def test_two_timeouts_then_cancel_leave_nothing_behind():
+    traffic_manager = TrafficManager()
+    holder, robot = FakeRobot(1), FakeRobot(2)
+    assert traffic_manager.acquire_lane(holder, (0, 1))
+    assert traffic_manager.acquire_lane(holder, (2, 3))
+    assert not traffic_manager.acquire_lane(robot, (0, 1), timeout=0.01)
+    assert not traffic_manager.acquire_lane(robot, (2, 3), timeout=0.01)
+    traffic_manager.cancel_requests(robot)
+
+    traffic_manager.release_lane(holder, (0, 1))
+    traffic_manager.release_lane(holder, (2, 3))
+    assert traffic_manager.snapshot() == {}
+    assert traffic_manager.lane_queue == {}
+    assert traffic_manager.waiting == {}
+
+
+def test_release_hands_the_lane_to_the_queue_head():
+    traffic_manager = TrafficManager()
+    holder, waiter = FakeRobot(1), FakeRobot(2)
+    lane = (3, 4)
+    assert traffic_manager.acquire_lane(holder, lane)
+    results = []
+    thread = threading.Thread(target=lambda: results.append(traffic_manager.acquire_lane(waiter, (4, 3))))
+    thread.start()
+    while not queued_ids(traffic_manager, lane):
+        time.sleep(0.001)
+    traffic_manager.release_lane(holder, lane)
+    thread.join(timeout=1)
+    assert results == [True]
+    assert traffic_manager.snapshot() == {(3, 4): 2}
+
+
+def test_cancel_requests_leaves_the_queue():
+    traffic_manager = TrafficManager()
+    holder, waiter = FakeRobot(1), FakeRobot(2)
+    lane = (0, 1)
+    traffic_manager.acquire_lane(holder, lane)
+    assert not traffic_manager.acquire_lane(waiter, lane, timeout=0.01)
+    traffic_manager.cancel_requests(waiter)
+    assert queued_ids(traffic_manager, lane) == []
+    traffic_manager.release_lane(holder, lane)
+    assert traffic_manager.snapshot() == {}
+
+
+def test_lanes_are_striped_by_their_undirected_key():
+    traffic_manager = TrafficManager(stripe_count=4)
+    robots = [FakeRobot(robot_id) for robot_id in range(1, 9)]
+    lanes = [(robot.id, robot.id + 10) for robot in robots]
+    for robot, (start_id, end_id) in zip(robots, lanes):
+        # Either direction reserves the same lane
+        assert traffic_manager.request_lane(robot, (end_id, start_id))
+        assert not traffic_manager.request_lane(FakeRobot(99), (start_id, end_id))
+
+    for stripe, stripe_lanes in enumerate(traffic_manager.stripe_lanes):
+        for lane_key in stripe_lanes:
+            assert traffic_manager._stripe(lane_key) == stripe
+    assert traffic_manager.snapshot() == {lane: robot.id for robot, lane in zip(robots, lanes)}
+
+
+def test_waiters_are_granted_in_queue_order():
+    traffic_manager = TrafficManager()
+    holder = FakeRobot(1)
+    lane = (5, 6)
+    assert traffic_manager.acquire_lane(holder, lane)
+    granted = []
+    waiters = [FakeRobot(robot_id) for robot_id in (2, 3, 4)]
+    for robot in waiters:
+        assert not traffic_manager.request_lane_async(robot, lane, lambda lane, robot=robot: granted.append(robot.id))
+    assert queued_ids(traffic_manager, lane) == [2, 3, 4]
+
+    previous = holder
+    for robot in waiters:
+        assert traffic_manager.release_lane(previous, lane)
+        assert granted[-1] == robot.id
+        assert traffic_manager.snapshot() == {(5, 6): robot.id}
+        previous = robot
+    assert traffic_manager.release_lane(previous, lane)
+    assert traffic_manager.snapshot() == {} and traffic_manager.waiting == {}
+
+
+def test_concurrent_robots_never_share_a_lane():
+    traffic_manager = TrafficManager(stripe_count=4)
+    lanes = [(start_id, start_id + 1) for start_id in range(6)]
+    inside = {traffic_manager.get_lane_key(lane): 0 for lane in lanes}
+    counter_lock = threading.Lock()
+    errors = []
+
+    def worker(robot_id):
+        robot = FakeRobot(robot_id)
+        rng = random.Random(robot_id)
+        # Each robot holds one lane at a time, so the wait-for graph can never close a cycle
+        for _ in range(300):
+            lane = rng.choice(lanes)
+            if rng.random() < 0.5:
+                lane = lane[::-1]
+            if not traffic_manager.acquire_lane(robot, lane, timeout=5):
+                errors.append((robot_id, lane))
+                return
+            lane_key = traffic_manager.get_lane_key(lane)
+            with counter_lock:
+                inside[lane_key] += 1
+                if inside[lane_key] != 1:
+                    errors.append(lane_key)
+            with counter_lock:
+                inside[lane_key] -= 1
+            traffic_manager.release_lane(robot, lane)
+
+    threads = [threading.Thread(target=worker, args=(robot_id,)) for robot_id in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert errors == []
+    assert traffic_manager.snapshot() == {}
+    assert traffic_manager.lane_queue == {}
+    assert traffic_manager.waiting == {}
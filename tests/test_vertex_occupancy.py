@@ -0,0 +1,88 @@
+# Three vertices in a row, 100 apart: two seconds per lane at the default speed
+ROW = {"vertices": [[0, 0, {"name": "A"}], [100, 0, {"name": "B"}], [200, 0, {"name": "C"}]],
+       "lanes": [[0, 1], [1, 2]]}
+
+
+def spawn(fleet_manager, vertex_id):
+    return fleet_manager.spawn_robot(fleet_manager.nav_graph.get_vertex_by_id(vertex_id))
+
+
+def assign(fleet_manager, robot, vertex_id):
+    return fleet_manager.assign_task(robot, fleet_manager.nav_graph.get_vertex_by_id(vertex_id))
+
+
+class Holder:
+    # Holds a lane from outside the fleet, with no vertex slot of its own
+    id = 99
+
+
+def queue_behind_full_vertex(fleet_manager):
+    # The second robot waits on B for a held lane, so B stays full while the first robot queues for it
+    traffic_manager = fleet_manager.traffic_manager
+    first, second = spawn(fleet_manager, 0), spawn(fleet_manager, 1)
+    assert traffic_manager.acquire_lane(Holder, (1, 2))
+    assert assign(fleet_manager, second, 2)[0]
+    assert assign(fleet_manager, first, 1)[0]
+    assert (first.status, second.status) == ("waiting", "waiting")
+    assert traffic_manager.snapshot() == {(1, 2): Holder.id}
+    # Handing the lane over moves the second robot's slot onto C, which frees B for the first robot
+    traffic_manager.release_lane(Holder, (1, 2))
+    return first, second
+
+
+def test_full_vertex_is_handed_over_when_its_occupant_leaves(make_fleet):
+    fleet_manager = make_fleet(ROW, vertex_occupancy=True)
+    traffic_manager = fleet_manager.traffic_manager
+    first, second = queue_behind_full_vertex(fleet_manager)
+    assert spawn(fleet_manager, 1) is None
+    assert traffic_manager.get_robot_vertex(first) == 1
+    assert traffic_manager.get_robot_vertex(second) == 2
+
+    fleet_manager.simulator.run()
+    assert (first.current_vertex["id"], second.current_vertex["id"]) == (1, 2)
+    assert traffic_manager.get_vertex_occupants(1) == {first.id}
+    assert traffic_manager.get_vertex_occupants(2) == {second.id}
+    assert traffic_manager.snapshot() == {}
+
+
+def test_robot_stopped_before_entering_a_granted_lane_stays_put(make_fleet):
+    fleet_manager = make_fleet(ROW, vertex_occupancy=True)
+    traffic_manager = fleet_manager.traffic_manager
+    first, second = queue_behind_full_vertex(fleet_manager)
+    # Granted lane (0, 1) and the slot on B, but still standing on A
+    assert first.current_lane == (0, 1) and first.segment is None
+
+    fleet_manager.stop_all_robots()
+    assert (first.current_vertex["id"], first.x, first.y) == (0, 0, 0)
+    assert traffic_manager.get_robot_vertex(first) == 0
+    assert (second.current_vertex["id"], second.x) == (1, 100)
+    assert traffic_manager.get_robot_vertex(second) == 1
+    assert traffic_manager.snapshot() == {}
+
+
+def test_robot_stopped_part_way_along_a_lane_finishes_at_its_far_end(make_fleet):
+    fleet_manager = make_fleet(ROW)
+    robot = spawn(fleet_manager, 0)
+    assign(fleet_manager, robot, 2)
+    fleet_manager.simulator.run(1.0)
+
+    fleet_manager.stop_all_robots()
+    assert (robot.current_vertex["id"], robot.x, robot.y) == (1, 100, 0)
+    assert robot.status == "idle"
+    assert fleet_manager.traffic_manager.snapshot() == {}
+
+
+def test_granted_lane_without_occupancy_does_not_move_the_robot(make_fleet):
+    fleet_manager = make_fleet(ROW)
+    simulator = fleet_manager.simulator
+    first, second = spawn(fleet_manager, 0), spawn(fleet_manager, 1)
+    assign(fleet_manager, second, 0)
+    assign(fleet_manager, first, 1)
+    assert first.status == "waiting"
+    # The second robot's arrival hands the lane over; the first robot enters it on the next event
+    while first.current_lane is None:
+        simulator.step()
+
+    fleet_manager.stop_all_robots()
+    assert (first.current_vertex["id"], first.x, first.y) == (0, 0, 0)
+    assert fleet_manager.traffic_manager.snapshot() == {}
@@ -0,0 +1,59 @@
+import pytest
+
+from src.models.vertex_store import VERTEX_KEYS, VertexStore
+
+
+def make_store():
+    store = VertexStore()
+    store.append(0, 0, "Dock", is_charger=True, capacity=2)
+    store.append(100, 50)
+    store.append(-20.5, 7, "Bay 3")
+    return store
+
+
+def test_views_read_through_to_the_arrays():
+    store = make_store()
+    dock, plain, bay = store
+    assert dock.to_dict() == {"id": 0, "x": 0, "y": 0, "name": "Dock", "is_charger": True, "capacity": 2}
+    # A vertex without a name gets one from its id, without storing it
+    assert plain["name"] == "V1" and store.name_offsets[1] == store.name_offsets[2]
+    assert (bay["x"], bay["y"], bay["name"], bay["capacity"]) == (-20.5, 7, "Bay 3", 1)
+
+    store.xs[2] = 40
+    assert bay["x"] == 40
+    assert dict(bay)["x"] == bay.get("x") == 40
+
+
+def test_views_behave_like_the_old_vertex_dicts():
+    store = make_store()
+    dock = store[0]
+    assert list(dock) == list(VERTEX_KEYS) and len(dock) == len(VERTEX_KEYS)
+    assert "is_charger" in dock and "colour" not in dock
+    assert dock.get("colour", "none") == "none"
+    with pytest.raises(KeyError):
+        dock["colour"]
+    assert dock == dock.to_dict()
+    # Views of the same vertex are interchangeable, e.g. as dict keys
+    assert dock == store[0] and hash(dock) == hash(store[0])
+    assert dock != store[1] and dock != make_store()[0]
+    assert store[-1]["name"] == "Bay 3"
+    assert [vertex.id for vertex in store[1:]] == [1, 2]
+    with pytest.raises(IndexError):
+        store[3]
+
+
+def test_index_and_name_lookup():
+    store = make_store()
+    index = store.index
+    assert len(index) == 3 and list(index) == [0, 1, 2]
+    assert 2 in index and 3 not in index and "2" not in index
+    assert index[1] == store[1] and index.get(7) is None
+    with pytest.raises(KeyError):
+        index[3]
+    assert dict(index.items())[2]["name"] == "Bay 3"
+
+    assert store.find_by_name("Bay 3") == 2 and store.find_by_name("V1") == 1
+    # The lookup is rebuilt once a new vertex is added
+    assert store.find_by_name("Gate") is None
+    store.append(5, 5, "Gate")
+    assert store.find_by_name("Gate") == 3